@@ -6,6 +6,11 @@ import time
 from datetime import datetime
 import csv
 import os
+import sys
+
+# The binary wire protocol is shared with the server
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vmside"))
+from wire_protocol import JSON_PROTOCOL, decode_frame
 
 # Configure logging
 logging.basicConfig(
@@ -17,7 +22,7 @@ logger = logging.getLogger(__name__)
 class MT5WebSocketClient:
     def __init__(self, server_url="ws://34.126.166.132:8765", symbols=None, 
                  save_data=True, data_dir="price_data", save_trades=True, 
-                 trades_dir="trade_data"):
+                 trades_dir="trade_data", protocol=JSON_PROTOCOL):
         """
         Initialize MT5 WebSocket Client
         
@@ -28,6 +33,7 @@ class MT5WebSocketClient:
             data_dir: Directory to save price data
             save_trades: Whether to save trade data to CSV files
             trades_dir: Directory to save trade data
+            protocol: WebSocket wire protocol, "json" or "binary-v1"
         """
         self.server_url = server_url
         self.symbols = symbols or ["EURUSD", "GBPUSD", "USDTHB"]
@@ -35,6 +41,8 @@ class MT5WebSocketClient:
         self.data_dir = data_dir
         self.save_trades = save_trades
         self.trades_dir = trades_dir
+        self.protocol = protocol
+        self.symbol_names = {}  # Symbol id to name for binary frames
         self.is_running = False
         self.reconnect_delay = 5  # seconds
         self.max_reconnect_delay = 60  # maximum delay between reconnection attempts
@@ -200,6 +208,9 @@ class MT5WebSocketClient:
         # Track the last seen trade ID to request missed trades on reconnect
         last_trade_id = 0
         last_transaction_id = 0
+        # Sequence number of the last trade update, valid within one journal epoch
+        last_seq = None
+        journal_epoch = None
 
         while self.is_running:
             try:
@@ -219,6 +230,11 @@ class MT5WebSocketClient:
                         "last_trade_id": last_trade_id,         # Add these to request missed trades
                         "last_transaction_id": last_transaction_id
                     }
+                    if self.protocol != JSON_PROTOCOL:
+                        subscription["protocol"] = self.protocol
+                    if last_seq is not None:
+                        subscription["last_seq"] = last_seq
+                        subscription["journal_epoch"] = journal_epoch
 
                     await ws.send(json.dumps(subscription))
                     logger.info(f"Subscription request sent for symbols: {self.symbols} with trade updates")
@@ -232,6 +248,13 @@ class MT5WebSocketClient:
                             if not self.is_running:
                                 break
 
+                            if isinstance(message, bytes):
+                                # Binary frame with one or more price updates
+                                for update in decode_frame(message, self.symbol_names):
+                                    self.process_price_update(update["symbol"], update["bid"], update["ask"],
+                                                              update["spread"], update["timestamp"])
+                                continue
+
                             data = json.loads(message)
 
                             # Log raw message for debugging
@@ -258,6 +281,8 @@ class MT5WebSocketClient:
                                     last_trade_id = max(last_trade_id, int(data.get('trade_id')))
                                 elif data.get('update_type') == 'transaction' and data.get('transaction_id'):
                                     last_transaction_id = max(last_transaction_id, int(data.get('transaction_id')))
+                                if data.get('seq') is not None:
+                                    last_seq = data['seq']
 
                                 # Process trade data
                                 self.process_trade_update(data)
@@ -266,6 +291,13 @@ class MT5WebSocketClient:
                                 logger.info(f"Successfully subscribed to {data.get('symbols')}")
                                 if data.get('trades_included'):
                                     logger.info("Trade updates included in subscription")
+                                if data.get('journal_epoch') != journal_epoch:
+                                    # New server run: its sequence numbers start over
+                                    journal_epoch = data.get('journal_epoch')
+                                    last_seq = None
+
+                            elif data.get("type") == "symbol_table":
+                                self.symbol_names.update({symbol_id: symbol for symbol, symbol_id in data["symbols"].items()})
 
                             elif data.get("type") == "error":
                                 logger.error(f"Server error: {data.get('message')}")
@@ -395,6 +427,9 @@ async def main():
     
     # Ask to include trade data
     include_trades = input("Would you like to receive trade updates? (y/n): ").lower() == 'y'
+
+    # Ask for the wire protocol
+    protocol = "binary-v1" if input("Use the compact binary protocol for prices? (y/n): ").lower() == 'y' else JSON_PROTOCOL
     
     # Create and start the client
     client = MT5WebSocketClient(
@@ -403,7 +438,8 @@ async def main():
         save_data=True,
         data_dir="price_data",
         save_trades=include_trades,
-        trades_dir="trade_data"
+        trades_dir="trade_data",
+        protocol=protocol
     )
     
     try:
@@ -13,6 +13,8 @@ logger = logging.getLogger(__name__)
 from connectors.bigquery_client import BigQueryClient
 from processors.price_processor import process_price_update
 from processors.trade_processor import process_trade_update
+from processors.batch_processor import process_records
+from processors.payload_codec import decode_payload
 
 # Initialize BigQuery client with environment variables
 project_id = os.environ.get('PROJECT_ID')
@@ -27,17 +29,24 @@ def pubsub_function(cloud_event):
     try:
         logger.info(f"Received Pub/Sub event: {cloud_event.id}")
         
-        # Decode the Pub/Sub message
-        pubsub_message = base64.b64decode(cloud_event.data["message"]["data"]).decode("utf-8")
+        # Decode the Pub/Sub message, decompressing it if the publisher compressed it
+        message = cloud_event.data["message"]
+        payload = decode_payload(base64.b64decode(message["data"]), message.get("attributes") or {})
+        pubsub_message = payload.decode("utf-8")
         data = json.loads(pubsub_message)
         
         data_type = data.get('type')
         logger.info(f"Processing {data_type} message")
         
-        if data_type == 'price_update':
+        if data_type == 'envelope':
+            # Many records per message; one insert per table
+            result = process_records(data.get('records', []), bq_client)
+            
+        elif data_type == 'price_update':
             result = process_price_update(data, bq_client)
             
-        elif data_type == 'trade_update':
+        elif data_type == 'trade_update' or 'update_type' in data:
+            # Position and transaction updates carry the trade side in "type"
             result = process_trade_update(data, bq_client)
             
         else:
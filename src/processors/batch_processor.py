@@ -0,0 +1,59 @@
+import logging
+from collections import defaultdict
+
+from processors.price_processor import price_row
+from processors.trade_processor import trade_row
+
+logger = logging.getLogger(__name__)
+
+def record_row(record):
+    """
+    Build the BigQuery row for one price or trade update.
+
+    Trade updates are recognized by their update_type, since position and
+    transaction updates carry the trade side in their "type" field.
+
+    Returns:
+        tuple: (table_id, row), or (None, error message) if the record is invalid
+    """
+    if "update_type" in record:
+        return trade_row(record)
+    if record.get("type") == "price_update":
+        return price_row(record)
+    return None, f"Unknown data type: {record.get('type')}"
+
+def process_records(records, bq_client):
+    """
+    Insert the records of an envelope with one insert per table.
+
+    Invalid records are logged and skipped; the others are still inserted.
+
+    Args:
+        records (list): Price and trade update dicts
+        bq_client: BigQuery client instance
+
+    Returns:
+        str: Status message
+    """
+    rows_by_table = defaultdict(list)
+    skipped = 0
+    for record in records:
+        table_id, row = record_row(record)
+        if table_id is None:
+            logger.error(f"Skipping record: {row}")
+            skipped += 1
+            continue
+        rows_by_table[table_id].append(row)
+
+    failed_tables = []
+    for table_id, rows in rows_by_table.items():
+        errors = bq_client.insert_rows(table_id, rows)
+        if errors:
+            logger.error(f"Error inserting {len(rows)} rows into {table_id}: {errors}")
+            failed_tables.append(table_id)
+
+    inserted = {table_id: len(rows) for table_id, rows in rows_by_table.items() if table_id not in failed_tables}
+    logger.info(f"Inserted {inserted}, skipped {skipped} invalid records")
+    if failed_tables:
+        return f"Error inserting data into {', '.join(failed_tables)}"
+    return f"Inserted {sum(inserted.values())} rows, skipped {skipped}"
@@ -0,0 +1,60 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Only needed for messages published with the zstd encoding
+    zstandard = None
+
+# Message attributes set by the publisher's PayloadEncoder
+ENCODING_ATTRIBUTE = "encoding"
+DICTIONARY_ATTRIBUTE = "dictionary"
+
+# Preset dictionary shared with vmside/payload_codec.py; both must stay
+# byte-for-byte identical.
+DICTIONARY_ID = "1"
+DICTIONARY = (
+    b'{"type": "trade_update", "update_type": "position_delta", "timestamp": "2024-01-01T00:00:00.000000", '
+    b'"trade_id": 100000001, "symbol": "EURUSD", "changes": {"profit": -1.25, "sl": 0.0, "tp": 0.0}}'
+    b'{"type": "close_sell", "update_type": "transaction", "timestamp": "2024-01-01T00:00:00", '
+    b'"transaction_id": 200000003, "symbol": "USDJPY", "volume": 0.1, "price": 150.123, "profit": 12.5}'
+    b'{"type": "buy", "update_type": "position", "timestamp": "2024-01-01T00:00:00.000000", '
+    b'"trade_id": 100000002, "symbol": "XAUUSD", "volume": 0.01, "price": 2345.67, "profit": -3.2, "sl": 0.0, "tp": 0.0}'
+    b'{"type": "envelope", "version": 1, "records": ['
+    b'{"type": "price_update", "symbol": "GBPUSD", "bid": 1.27345, "ask": 1.27361, "spread": 0.00016000000000004899, '
+    b'"timestamp": "2024-01-01T00:00:00.123000+00:00"}, '
+    b'{"type": "price_update", "symbol": "EURUSD", "bid": 1.10234, "ask": 1.10254, "spread": 0.00019999999999997797, '
+    b'"timestamp": "2024-01-01T00:00:00.123000+00:00"}, '
+)
+
+def decode_payload(data, attributes):
+    """
+    Decompress Pub/Sub message data according to its message attributes.
+
+    Data without an encoding attribute is returned unchanged, so messages
+    from publishers that do not compress keep working.
+
+    Args:
+        data (bytes): Message data, already base64-decoded
+        attributes (dict): Pub/Sub message attributes
+
+    Returns:
+        bytes: The original message data
+
+    Raises:
+        ValueError: If the encoding or dictionary is unknown, or zstd is not installed
+    """
+    encoding = attributes.get(ENCODING_ATTRIBUTE)
+    if encoding is None:
+        return data
+    dictionary = attributes.get(DICTIONARY_ATTRIBUTE)
+    if dictionary not in (None, DICTIONARY_ID):
+        raise ValueError(f"Unknown compression dictionary {dictionary!r}")
+    if encoding == "zlib":
+        decompressor = zlib.decompressobj(zdict=DICTIONARY) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("The zstd encoding needs the zstandard package")
+        dict_data = zstandard.ZstdCompressionDict(DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    raise ValueError(f"Unknown encoding {encoding!r}")
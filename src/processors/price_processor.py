@@ -6,28 +6,36 @@ from config.settings import BQ_PRICES_TABLE
 
 logger = logging.getLogger(__name__)
 
+def price_row(data):
+    """
+    Build the BigQuery row for a price update.
+
+    Returns:
+        tuple: (table_id, row), or (None, error message) if the update is invalid
+    """
+    # Validate required fields
+    required_fields = ["timestamp", "symbol", "bid", "ask"]
+    for field in required_fields:
+        if field not in data:
+            return None, f"Missing required field: {field}"
+
+    # Create row for BigQuery, calculating spread if not provided
+    row = {
+        "timestamp": data["timestamp"],
+        "symbol": data["symbol"],
+        "bid": data["bid"],
+        "ask": data["ask"],
+        "spread": data.get("spread", data["ask"] - data["bid"])
+    }
+    return BQ_PRICES_TABLE, row
+
 def process_price_update(data, bq_client):
     """Process price update data from MT5"""
     try:
-        # Validate required fields
-        required_fields = ["timestamp", "symbol", "bid", "ask"]
-        for field in required_fields:
-            if field not in data:
-                logger.error(f"Missing required field: {field}")
-                return f"Missing required field: {field}"
-        
-        # Calculate spread if not provided
-        if "spread" not in data:
-            data["spread"] = data["ask"] - data["bid"]
-        
-        # Create row for BigQuery
-        row = {
-            "timestamp": data["timestamp"],
-            "symbol": data["symbol"],
-            "bid": data["bid"],
-            "ask": data["ask"],
-            "spread": data["spread"]
-        }
+        table_id, row = price_row(data)
+        if table_id is None:
+            logger.error(row)
+            return row
         
         # Insert data into BigQuery
         errors = bq_client.insert_rows(BQ_PRICES_TABLE, [row])
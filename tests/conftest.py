@@ -0,0 +1,18 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import pytest
+from mt5_session import MT5Session
+
+
+@pytest.fixture
+def mt5_env(monkeypatch, tmp_path):
+    """MT5 settings the server module reads, and a working directory for its log file"""
+    for name, value in (("MT5_USER", "1"), ("MT5_PASSWORD", "secret"), ("MT5_SERVER", "Demo"), ("MT5_PATH", "/fake")):
+        monkeypatch.setenv(name, value)
+    monkeypatch.chdir(tmp_path)  # The server module logs to a file in the working directory
+    yield
+    MT5Session._sessions.clear()
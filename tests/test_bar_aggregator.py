@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from bar_aggregator import BarAggregator
+
+
+def test_bars_follow_tick_time_and_close_on_next_bar():
+    bars = BarAggregator(update_interval=0, scan_interval=0)
+    bars.add("EURUSD", "1m")
+    # Tick times are far from the local clock, as with a broker in another timezone
+    for bid, time_msc in [(1.1, 60_500), (1.3, 61_000), (1.0, 90_000), (1.2, 119_999), (1.25, 120_000)]:
+        bars.update("EURUSD", bid, time_msc, now=1000.0)
+
+    closed = [bar.to_dict() for bar in bars.drain(now=1000.0) if bar.closed]
+    assert closed == [{
+        "symbol": "EURUSD", "timeframe": "1m", "time_msc": 60_000,
+        "open": 1.1, "high": 1.3, "low": 1.0, "close": 1.2, "tick_volume": 4, "closed": True,
+    }]
+    assert bars.current("EURUSD", "1m").open == 1.25
+
+
+def test_bars_in_progress_are_rate_limited_and_expire_on_broker_clock():
+    bars = BarAggregator(update_interval=1.0, close_delay=2.0, scan_interval=0)
+    bars.add("EURUSD", "1s")
+    bars.update("EURUSD", 1.1, 5_000, now=100.0)
+    assert [bar.closed for bar in bars.drain(now=100.0)] == [False]
+
+    bars.update("EURUSD", 1.2, 5_400, now=100.4)
+    assert bars.drain(now=100.5) == []
+    assert [bar.close for bar in bars.drain(now=101.0)] == [1.2]
+
+    # No further ticks: the bar closes once the broker clock is past 6_000 + 2s
+    assert bars.drain(now=102.9) == []
+    (bar,) = bars.drain(now=103.1)
+    assert bar.closed and bar.tick_volume == 2
+
+    # A late tick for the closed bar does not reopen it
+    bars.update("EURUSD", 1.3, 5_900, now=103.2)
+    assert bars.current("EURUSD", "1s") is None
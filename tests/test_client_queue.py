@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from client_queue import ClientConnection
+from wire_protocol import BINARY_PROTOCOL, decode_frame, encode_price_record
+
+
+class FakeWebSocket:
+    remote_address = ("127.0.0.1", 1234)
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def send(self, message):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = (code, reason)
+
+
+async def _drain():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_conflate_keeps_latest_price_per_symbol():
+    async def run():
+        ws = FakeWebSocket()
+        ws.release.clear()
+        client = ClientConnection(ws, max_queue=10, overflow_policy="conflate")
+        client.start()
+
+        for i in range(5):
+            client.send_price("EURUSD", f"eurusd-{i}")
+        client.send_price("GBPUSD", "gbpusd-0")
+        client.send_reliable("trade-1")
+        assert client.queue_depth == 3
+
+        ws.release.set()
+        await _drain()
+        await client.close()
+        return ws, client
+
+    ws, client = asyncio.run(run())
+    # The writer was already waiting on the first price when the queue filled up
+    assert ws.sent[-3:] == ["trade-1", "eurusd-4", "gbpusd-0"]
+    assert client.conflated >= 3
+    assert client.dropped == 0
+
+
+def test_drop_oldest_never_drops_trades():
+    async def run():
+        ws = FakeWebSocket()
+        ws.release.clear()
+        client = ClientConnection(ws, max_queue=2, overflow_policy="drop_oldest")
+        for i in range(5):
+            client.send_price("EURUSD", f"price-{i}")
+        for i in range(5):
+            client.send_reliable(f"trade-{i}")
+        client.start()
+        ws.release.set()
+        await _drain()
+        await client.close()
+        return ws, client
+
+    ws, client = asyncio.run(run())
+    assert ws.sent == [f"trade-{i}" for i in range(5)] + ["price-3", "price-4"]
+    assert client.dropped == 3
+    assert client.sent == 7
+
+
+def test_disconnect_policy_closes_slow_client():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, max_queue=2, overflow_policy="disconnect")
+        for i in range(3):
+            client.send_price("EURUSD", f"price-{i}")
+        await _drain()
+        return ws, client
+
+    ws, client = asyncio.run(run())
+    assert client.closed
+    assert ws.closed_with[0] == 1013
+
+
+def test_batch_client_gets_pending_prices_in_one_frame():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, max_queue=10, overflow_policy="conflate")
+        client.batch = True
+        client.send_price("EURUSD", '{"symbol": "EURUSD"}')
+        client.send_price("GBPUSD", '{"symbol": "GBPUSD"}')
+        client.start()
+        await _drain()
+        await client.close()
+        return ws
+
+    ws = asyncio.run(run())
+    assert len(ws.sent) == 1
+    assert json.loads(ws.sent[0]) == {
+        "type": "batch",
+        "events": [{"symbol": "EURUSD"}, {"symbol": "GBPUSD"}],
+    }
+
+
+def test_binary_records_stay_framed_when_switching_to_conflate():
+    async def run():
+        ws = FakeWebSocket()
+        ws.release.clear()
+        client = ClientConnection(ws, max_queue=10, overflow_policy="drop_oldest")
+        client.protocol = BINARY_PROTOCOL
+        client.start()
+        client.send_price("EURUSD", encode_price_record(1, 1.1, 1.1002, 1000))
+        await _drain()  # The writer now waits on its first frame
+        client.send_price("EURUSD", encode_price_record(1, 1.2, 1.2002, 2000))
+        client.send_price("GBPUSD", encode_price_record(2, 1.3, 1.3002, 3000))
+
+        client.set_overflow_policy("conflate")
+        client.send_price("EURUSD", encode_price_record(1, 1.4, 1.4002, 4000))
+        ws.release.set()
+        await _drain()
+        await client.close()
+        return ws
+
+    ws = asyncio.run(run())
+    symbols = {1: "EURUSD", 2: "GBPUSD"}
+    frames = [[(u["symbol"], u["bid"]) for u in decode_frame(frame, symbols)] for frame in ws.sent]
+    assert frames == [[("EURUSD", 1.1)], [("EURUSD", 1.2), ("GBPUSD", 1.3)], [("EURUSD", 1.4)]]
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from conflation import Conflator, parse_policies
+
+
+def quote(symbol, bid, spread=0.0002):
+    return {"type": "price_update", "symbol": symbol, "bid": bid, "ask": round(bid + spread, 5)}
+
+
+def test_bucket_and_min_move_policies_per_symbol():
+    conflator = Conflator(parse_policies("EURUSD=min-move:5, *=bucket:0.25"))
+
+    # bucket: the first quote of each aligned 250ms window
+    passed = [conflator.add(quote("GBPUSD", 1.3 + i / 1e5), now=t) is not None
+              for i, t in enumerate([10.0, 10.1, 10.24, 10.25, 10.6])]
+    assert passed == [True, False, False, True, True]
+
+    # min-move: 5 points of 0.00001, measured from the last quote that passed
+    assert conflator.add(quote("EURUSD", 1.10001), now=0) is not None
+    assert conflator.add(quote("EURUSD", 1.10004), now=1) is None
+    assert conflator.add(quote("EURUSD", 1.10006), now=2) is not None
+
+    assert conflator.symbol_stats() == {"GBPUSD": {"in": 5, "out": 3}, "EURUSD": {"in": 3, "out": 2}}
+    assert conflator.stats() == {"in": 8, "out": 5, "held": 0}
+
+    with pytest.raises(ValueError):
+        parse_policies("EURUSD=median:1")
+    with pytest.raises(ValueError):
+        parse_policies("*=bucket:0")
+
+
+def test_float_noise_in_prices_does_not_shrink_the_inferred_point():
+    conflator = Conflator(parse_policies("EURUSD=min-move:5"))
+    # Unrounded arithmetic, e.g. bid + spread, leaves noise far past the symbol's 5 digits
+    bid = 1.1 + 0.00001
+    noisy = {"type": "price_update", "symbol": "EURUSD", "bid": bid, "ask": bid + 0.0002}
+    assert repr(noisy["bid"]) == "1.1000100000000002"
+    assert conflator.add(noisy, now=0) is not None
+    assert conflator.add(quote("EURUSD", 1.10002), now=1) is None
+    assert conflator.add(quote("EURUSD", 1.10004), now=2) is None
+    assert conflator.add(quote("EURUSD", 1.10007), now=3) is not None
+
+
+def test_last_value_in_window_is_released_when_the_window_closes():
+    conflator = Conflator({"*": ("last", 0.5)})
+    assert conflator.due(now=0) is None
+
+    for bid, t in [(1.1, 10.1), (1.2, 10.2), (1.3, 10.4)]:
+        assert conflator.add(quote("EURUSD", bid), now=t) is None
+    conflator.add(quote("GBPUSD", 1.5), now=10.45)
+
+    assert abs(conflator.due(now=10.4) - 0.1) < 1e-9
+    assert conflator.flush(now=10.49) == []
+    assert [message["bid"] for message in conflator.flush(now=10.5)] == [1.3, 1.5]
+
+    conflator.add(quote("EURUSD", 1.4), now=10.7)
+    assert [message["bid"] for message in conflator.flush(now=10.8, force=True)] == [1.4]
+    assert conflator.stats() == {"in": 5, "out": 3, "held": 0}
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+import deal_cursor
+from deal_cursor import DealHistoryCursor
+
+
+def test_every_deal_is_returned_once_across_restarts(monkeypatch, tmp_path):
+    mt5.configure(symbols="EURUSD,GBPUSD", positions=4, trade_rate=2)
+    now = [mt5.EPOCH_MSC + 10_000]
+    monkeypatch.setattr(mt5, "_now_msc", lambda: now[0])
+    mt5.initialize()
+    state_file = str(tmp_path / "deal_cursor.json")
+
+    cursor = DealHistoryCursor(state_file=state_file)
+    assert cursor.fetch_new() == []  # A new cursor starts at the latest deal
+    start_msc = now[0]
+    returned = []
+    for _ in range(3):
+        now[0] += 1500
+        returned += cursor.fetch_new()
+
+    restarted = DealHistoryCursor(state_file=state_file)
+    assert restarted.fetch_new() == []
+    now[0] += 1500
+    returned += restarted.fetch_new()
+
+    expected = mt5.history_deals_get(start_msc / 1000 + 0.001, now[0] / 1000)
+    assert [d.ticket for d in returned] == [d.ticket for d in expected]
+    assert len(returned) > 4
+    closing = DealHistoryCursor.closing_deals(returned)
+    assert closing and restarted.closing_deal(closing[-1].position_id) == closing[-1]
+    mt5.shutdown()
+
+
+def test_deals_showing_up_late_within_the_overlap_are_not_skipped(monkeypatch):
+    history = [
+        mt5.TradeDeal(11, 11, 100, 100_000, 0, mt5.DEAL_ENTRY_IN, 0, 5, 0, 0.1, 1.1, 0, 0, 0, 0, "EURUSD", "", ""),
+        mt5.TradeDeal(13, 13, 101, 101_000, 0, mt5.DEAL_ENTRY_IN, 0, 6, 0, 0.1, 1.1, 0, 0, 0, 0, "EURUSD", "", ""),
+    ]
+    monkeypatch.setattr(deal_cursor.mt5, "history_deals_get", lambda date_from, date_to: tuple(history))
+
+    cursor = DealHistoryCursor(state_file=None, overlap_seconds=60)
+    cursor.cursor = (99_000, 0)
+    assert [d.ticket for d in cursor.fetch_new()] == [11, 13]
+    assert cursor.fetch_new() == []
+
+    # Booked after 13 was read, but dated before it
+    history.insert(1, mt5.TradeDeal(12, 12, 100, 100_500, 1, mt5.DEAL_ENTRY_OUT, 0, 5, 0, 0.1, 1.2, 0, 0, 5.0, 0,
+                                    "EURUSD", "", ""))
+    assert [d.ticket for d in cursor.fetch_new()] == [12]
+    assert cursor.closing_deal(5).ticket == 12
+    assert cursor.cursor == (101_000, 13)
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from envelope import EnvelopePacker
+from processors.batch_processor import process_records
+
+
+class RecordingBigQueryClient:
+    def __init__(self):
+        self.inserts = []
+
+    def insert_rows(self, table_id, rows):
+        self.inserts.append((table_id, rows))
+        return []
+
+
+def price(symbol, bid):
+    return {"type": "price_update", "timestamp": "2024-01-01T00:00:00", "symbol": symbol, "bid": bid, "ask": bid + 0.0002}
+
+
+def test_packer_closes_envelopes_by_count_and_by_age():
+    packer = EnvelopePacker(max_records=3, max_delay=0.1)
+    assert packer.due(now=0.0) is None
+    assert packer.add(json.dumps(price("EURUSD", 1.1)), now=10.0) is None
+    assert packer.add(json.dumps(price("GBPUSD", 1.3)), now=10.05) is None
+    assert abs(packer.due(now=10.05) - 0.05) < 1e-9
+
+    envelope = json.loads(packer.add(json.dumps(price("EURUSD", 1.2)), now=10.06))
+    assert envelope["type"] == "envelope"
+    assert [record["bid"] for record in envelope["records"]] == [1.1, 1.3, 1.2]
+
+    packer.add(json.dumps(price("EURUSD", 1.3)), now=11.0)
+    assert packer.due(now=11.2) == 0.0
+    assert len(json.loads(packer.flush())["records"]) == 1
+    assert (packer.envelopes, packer.packed, len(packer)) == (2, 4, 0)
+
+
+def test_envelope_records_are_inserted_once_per_table():
+    packer = EnvelopePacker(max_records=100)
+    records = [
+        price("EURUSD", 1.1),
+        # As sent by the server: the trade side overrides "type": "trade_update"
+        {"type": "buy", "update_type": "position", "timestamp": "2024-01-01T00:00:00", "trade_id": 5,
+         "symbol": "EURUSD", "volume": 1.0, "price": 1.1, "profit": 3.0, "sl": 0.0, "tp": 0.0},
+        price("GBPUSD", 1.3),
+        {"type": "close_buy", "update_type": "transaction", "timestamp": "2024-01-01T00:00:00",
+         "transaction_id": 9, "symbol": "EURUSD", "volume": 1.0, "price": 1.2, "profit": 5.0},
+        {"type": "price_update", "symbol": "EURUSD"},  # Invalid, skipped
+    ]
+    for record in records:
+        packer.add(json.dumps(record))
+    envelope = json.loads(packer.flush())
+
+    bq_client = RecordingBigQueryClient()
+    assert process_records(envelope["records"], bq_client) == "Inserted 4 rows, skipped 1"
+    inserted = {table_id: rows for table_id, rows in bq_client.inserts}
+    assert len(bq_client.inserts) == 3
+    assert [row["symbol"] for row in inserted["price_updates"]] == ["EURUSD", "GBPUSD"]
+    assert inserted["positions"][0]["type"] == "buy"
+    assert inserted["transactions"][0]["transaction_id"] == 9
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+
+
+def test_ticks_agree_between_calls(monkeypatch):
+    mt5.configure(symbols="EURUSD,GBPUSD", tick_rate=20)
+    now_msc = mt5.EPOCH_MSC + 60_000
+    monkeypatch.setattr(mt5, "_now_msc", lambda: now_msc)
+    assert mt5.symbol_info_tick("EURUSD") is None  # Not initialized
+
+    mt5.initialize()
+    ticks = mt5.copy_ticks_from("EURUSD", (now_msc - 2000) / 1000, 1000, mt5.COPY_TICKS_INFO)
+    assert len(ticks) == 41  # Every 50 ms, both ends included
+    assert (ticks["time_msc"][1:] > ticks["time_msc"][:-1]).all()
+    assert (ticks["ask"] > ticks["bid"]).all()
+
+    tick = mt5.symbol_info_tick("EURUSD")
+    assert (tick.time_msc, tick.bid, tick.ask) == (ticks["time_msc"][-1], ticks["bid"][-1], ticks["ask"][-1])
+    assert mt5.symbol_info_tick("XAUUSD") is None
+    mt5.shutdown()
+
+
+def test_positions_roll_over_with_closing_deals(monkeypatch):
+    mt5.configure(symbols=3, positions=4, trade_rate=2)
+    now = [mt5.EPOCH_MSC + 10_000]
+    monkeypatch.setattr(mt5, "_now_msc", lambda: now[0])
+    mt5.initialize()
+
+    before = {position.ticket: position for position in mt5.positions_get()}
+    assert len(before) == 4
+    now[0] += 1000
+    after = {position.ticket: position for position in mt5.positions_get()}
+    assert len(after) == 4
+    closed = set(before) - set(after)
+    assert len(closed) == 2
+
+    deals = mt5.history_deals_get((now[0] - 999) / 1000, now[0] / 1000 + 86400)
+    closing = {deal.position_id: deal for deal in deals if deal.entry == mt5.DEAL_ENTRY_OUT}
+    assert set(closing) == closed
+    opening = [deal.position_id for deal in deals if deal.entry == mt5.DEAL_ENTRY_IN]
+    assert sorted(opening) == sorted(set(after) - set(before))
+    assert [deal.time_msc for deal in deals] == sorted(deal.time_msc for deal in deals)
+    mt5.shutdown()
@@ -0,0 +1,121 @@
+import asyncio
+import importlib
+import json
+import os
+import queue
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import pytest
+from shm_ring import SharedRing
+
+
+@pytest.fixture
+def fanout(mt5_env):
+    return importlib.import_module("fanout")
+
+
+def position_message(ticket):
+    return json.dumps({"type": "buy", "update_type": "position", "trade_id": ticket, "symbol": "EURUSD", "seq": ticket})
+
+
+async def read_for(worker, seconds):
+    worker.running = True
+    task = asyncio.create_task(worker.read_ring())
+    await asyncio.sleep(seconds)
+    worker.running = False
+    await asyncio.wait_for(task, 5)
+
+
+def test_worker_started_after_the_ring_lapped_gets_the_current_state(fanout):
+    ring = SharedRing.create(capacity=32, slot_size=256)
+    control = queue.Queue()
+    capture = fanout.CaptureServer(ring, control, deal_cursor_file=None)
+    try:
+        capture.symbol_table.id_for("EURUSD")
+        for ticket in range(1, 21):
+            message = position_message(ticket)
+            capture._store_position(ticket, message)
+            ring.write(fanout.TRADE_EVENT.pack(fanout.EVENT_TRADE, -1, len(message)) + message.encode())
+        for _ in range(30):
+            ring.write(bytes([fanout.EVENT_ACCOUNT]) + b'{"balance": 10000.0}')
+
+        worker = fanout.FanoutWorker(0, ring, control, capture.trade_journal.epoch, deal_cursor_file=None)
+
+        async def run():
+            worker.running = True
+            task = asyncio.create_task(worker.read_ring())
+            await asyncio.sleep(0.05)
+            assert sorted(worker.position_messages) == [19, 20]  # Only what the ring still held
+            assert control.get_nowait() == ("sync", 0)
+            capture.handle_control(("sync", 0))
+            await asyncio.sleep(0.05)
+            worker.running = False
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(run())
+        assert sorted(worker.position_messages) == list(range(1, 21))
+        assert worker.symbol_names == {0: "EURUSD"}
+        assert not worker.journal_complete
+    finally:
+        capture.mt5_executor.shutdown()
+        ring.close()
+
+
+def test_worker_started_before_the_ring_lapped_needs_no_state(fanout):
+    ring = SharedRing.create(capacity=8, slot_size=256)
+    control = queue.Queue()
+    try:
+        message = position_message(1)
+        ring.write(fanout.TRADE_EVENT.pack(fanout.EVENT_TRADE, -1, len(message)) + message.encode())
+        worker = fanout.FanoutWorker(0, ring, control, 0, deal_cursor_file=None)
+        asyncio.run(read_for(worker, 0.05))
+        assert list(worker.position_messages) == [1]
+        assert control.empty() and worker.journal_complete
+    finally:
+        ring.close()
+
+
+def test_worker_that_falls_behind_mid_run_resyncs_symbols_and_positions(fanout):
+    ring = SharedRing.create(capacity=16, slot_size=256)
+    control = queue.Queue()
+    capture = fanout.CaptureServer(ring, control, deal_cursor_file=None)
+    try:
+        capture.symbol_table.id_for("EURUSD")
+        for ticket in (1, 2):
+            message = position_message(ticket)
+            capture._store_position(ticket, message)
+            ring.write(fanout.TRADE_EVENT.pack(fanout.EVENT_TRADE, -1, len(message)) + message.encode())
+        worker = fanout.FanoutWorker(0, ring, control, capture.trade_journal.epoch, deal_cursor_file=None)
+
+        async def run():
+            worker.running = True
+            task = asyncio.create_task(worker.read_ring())
+            await asyncio.sleep(0.05)
+            assert sorted(worker.position_messages) == [1, 2]
+            assert control.empty()
+
+            # While the worker is busy, a symbol is announced and a position closes,
+            # and then the ring laps it
+            capture.handle_control(("subscribe", 1, ["GBPUSD"]))
+            capture._position_closed(1)
+            for _ in range(20):
+                ring.write(bytes([fanout.EVENT_ACCOUNT]) + b'{"balance": 10000.0}')
+            await asyncio.sleep(0.05)
+            assert worker.position_messages.keys() == {1, 2}  # The close was lost
+            assert control.get_nowait() == ("sync", 0)
+
+            capture.handle_control(("sync", 0))
+            await asyncio.sleep(0.05)
+            worker.running = False
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(run())
+        assert list(worker.position_messages) == [2]
+        assert worker.symbol_names == {0: "EURUSD", 1: "GBPUSD"}
+        assert not worker.journal_complete
+    finally:
+        capture.mt5_executor.shutdown()
+        ring.close()
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from websockets.datastructures import Headers
+from websockets.http11 import Request
+
+from http_snapshot import SnapshotEndpoints
+
+
+def make_server():
+    return SimpleNamespace(
+        last_quotes={},
+        quotes_version=0,
+        position_messages={
+            5: json.dumps({"type": "buy", "trade_id": 5, "symbol": "EURUSD", "volume": 1.0}),
+            6: json.dumps({"type": "sell", "trade_id": 6, "symbol": "EURUSD", "volume": 0.4}),
+        },
+        positions_version=3,
+        account_info=None,
+        account_version=0,
+    )
+
+
+def get(endpoints, path, **headers):
+    return endpoints.process_request(None, Request(path, Headers(headers)))
+
+
+def test_etag_revalidation_and_version_changes():
+    server = make_server()
+    endpoints = SnapshotEndpoints(server)
+
+    response = get(endpoints, "/net_volume")
+    assert response.status_code == 200
+    assert json.loads(response.body) == {"net_volume": {"EURUSD": 0.6}}
+    etag = response.headers["ETag"]
+
+    assert get(endpoints, "/net_volume", **{"If-None-Match": etag}).status_code == 304
+
+    server.position_messages.pop(6)
+    server.positions_version += 1
+    response = get(endpoints, "/net_volume", **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert json.loads(response.body) == {"net_volume": {"EURUSD": 1.0}}
+
+
+def test_websocket_upgrades_and_unknown_paths_are_left_alone():
+    endpoints = SnapshotEndpoints(make_server())
+    assert get(endpoints, "/") is None
+    assert get(endpoints, "/prices", Upgrade="websocket") is None
+    assert get(endpoints, "/account").status_code == 503
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from metrics import MetricsRegistry
+
+
+def test_histogram_exposition_is_cumulative_with_const_labels():
+    registry = MetricsRegistry({"worker": "1"})
+    stage = registry.histogram("stage_seconds", "Stage time", ["stage"], buckets=(0.01, 0.1))
+    encode = stage.labels("encode")
+    assert stage.labels("encode") is encode
+
+    for value in (0.005, 0.05, 0.5):
+        encode.observe(value)
+
+    lines = registry.exposition().decode().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="encode",worker="1",le="0.01"} 1' in lines
+    assert 'stage_seconds_bucket{stage="encode",worker="1",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="encode",worker="1",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="encode",worker="1"} 0.555' in lines
+    assert 'stage_seconds_count{stage="encode",worker="1"} 3' in lines
+
+
+def test_counters_and_scrape_time_gauges():
+    clients = ["a", "b"]
+    registry = MetricsRegistry()
+    events = registry.counter("events_total", "Events", ["kind"])
+    events.labels("price").inc(3)
+    registry.gauge("connected_clients", "Clients", function=lambda: len(clients))
+
+    clients.append("c")
+    lines = registry.exposition().decode().splitlines()
+    assert 'events_total{kind="price"} 3' in lines
+    assert "connected_clients 3" in lines
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+import pytest
+from loop_monitor import EventLoopLagMonitor
+from mt5_executor import MT5Executor
+from mt5_session import MT5Session
+from mt5_trading import MT5Trading
+
+
+@pytest.fixture
+def client():
+    client = MT5Trading(user=1, password="secret", server="Demo", path="/fake", use_price_worker=False)
+    yield client
+    client.close()
+    MT5Session._sessions.clear()
+
+
+def test_calls_run_one_at_a_time_on_the_terminal_thread_without_blocking_the_loop(client):
+    executor = MT5Executor(client)
+    monitor = EventLoopLagMonitor(interval=0.01, log_interval=0)
+    running = []
+    threads = set()
+
+    def slow_call(n):
+        running.append(n)
+        assert len(running) == 1  # Never two MT5 calls at once
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        running.remove(n)
+        return n
+
+    async def main():
+        sampler = asyncio.create_task(monitor.run())
+        results = await asyncio.gather(*(executor.call(slow_call, n) for n in range(4)))
+        sampler.cancel()
+        return results
+
+    try:
+        assert asyncio.run(main()) == [0, 1, 2, 3]
+    finally:
+        executor.shutdown()
+    assert len(threads) == 1 and threads.pop().startswith("mt5")
+    assert monitor.samples and monitor.max_lag < 0.05  # The loop kept ticking during the 200 ms of calls
+
+
+def test_calls_fail_with_connection_error_when_the_terminal_is_unavailable(client, monkeypatch):
+    monkeypatch.setattr(mt5, "initialize", lambda path=None, **kwargs: False)
+    executor = MT5Executor(client)
+    try:
+        with pytest.raises(ConnectionError):
+            asyncio.run(executor.positions_get())
+    finally:
+        executor.shutdown()
+
+
+def test_lag_monitor_measures_a_blocked_loop():
+    monitor = EventLoopLagMonitor(interval=0.01, log_interval=0)
+
+    async def main():
+        sampler = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.03)
+        time.sleep(0.1)  # A blocking call on the loop
+        await asyncio.sleep(0.03)
+        sampler.cancel()
+
+    asyncio.run(main())
+    stats = monitor.stats()
+    assert monitor.max_lag >= 0.08
+    assert stats["max_ms"] == monitor.max_lag * 1000
+    assert stats["avg_ms"] <= stats["p99_ms"] <= stats["max_ms"]
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+import mt5_session
+from mt5_session import MT5Session
+
+
+def test_failed_connections_back_off_exponentially_until_one_succeeds(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mt5_session.time, "monotonic", lambda: now[0])
+    attempts = []
+    real_initialize = mt5.initialize
+
+    def initialize(path=None, **kwargs):
+        attempts.append(now[0])
+        return len(attempts) > 3 and real_initialize(path)
+
+    monkeypatch.setattr(mt5, "initialize", initialize)
+    session = MT5Session(1, "secret", "Demo", "/fake", base_backoff=1.0, max_backoff=3.0)
+
+    for _ in range(3):
+        assert not session.ensure()
+        assert not session.ensure()  # Still backing off: no new attempt
+        now[0] += 0.9
+        assert not session.ensure()
+        now[0] += session._next_attempt - now[0]
+    assert [t - attempts[0] for t in attempts] == [0.0, 1.0, 3.0]  # Delays of 1, 2, then capped at 3
+
+    assert session.ensure()
+    assert session.is_connected and session._failures == 0
+    session.shutdown()
+    assert not session.is_connected
+
+
+def test_lost_terminal_is_noticed_at_the_next_health_check_and_reconnected(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mt5_session.time, "monotonic", lambda: now[0])
+    session = MT5Session(1, "secret", "Demo", "/fake", health_check_interval=5.0)
+    assert session.ensure()
+
+    mt5.shutdown()  # The terminal goes away behind the session's back
+    now[0] += 1
+    assert session.ensure()  # Not checked again within the interval
+    assert mt5.terminal_info() is None
+
+    now[0] += 5
+    assert session.ensure()
+    assert mt5.terminal_info() is not None
+    session.shutdown()
+
+
+def test_sessions_are_shared_per_account_server_and_path():
+    first = MT5Session.get(7, "secret", "Demo", "/fake")
+    assert MT5Session.get(7, "other", "Demo", "/fake") is first
+    assert MT5Session.get(7, "secret", "Live", "/fake") is not first
+    MT5Session._sessions.clear()
@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import payload_codec
+from envelope import encode_envelope
+from processors import payload_codec as function_codec
+
+
+def price(n):
+    return json.dumps({"type": "price_update", "symbol": "EURUSD", "bid": 1.1 + n / 1e5, "ask": 1.1002 + n / 1e5,
+                       "spread": 0.0002, "timestamp": f"2024-01-01T00:00:{n % 60:02d}.000000+00:00"})
+
+
+def test_large_payloads_are_compressed_and_small_ones_sent_as_is():
+    encoder = payload_codec.PayloadEncoder("zlib", min_size=512)
+    envelope = encode_envelope([price(n) for n in range(50)])
+
+    data, attributes = encoder.encode(envelope)
+    assert attributes == {"encoding": "zlib", "dictionary": "1"}
+    assert len(data) * 5 < len(envelope)
+    # The Cloud Function decodes what the publisher encodes
+    assert function_codec.decode_payload(data, attributes) == envelope
+
+    single = price(1).encode()
+    assert encoder.encode(single) == (single, {})
+    assert function_codec.decode_payload(single, {}) == single
+    assert (encoder.stats()["compressed"], encoder.stats()["skipped"]) == (1, 1)
+
+
+def test_both_sides_share_the_dictionary_and_reject_unknown_encodings():
+    assert function_codec.DICTIONARY == payload_codec.DICTIONARY
+    assert function_codec.DICTIONARY_ID == payload_codec.DICTIONARY_ID
+
+    data, attributes = payload_codec.PayloadEncoder("zlib", min_size=0, use_dictionary=False).encode(b"{}")
+    assert attributes == {"encoding": "zlib"}
+    assert function_codec.decode_payload(data, attributes) == b"{}"
+
+    with pytest.raises(ValueError):
+        function_codec.decode_payload(data, {"encoding": "brotli"})
+    with pytest.raises(ValueError):
+        function_codec.decode_payload(data, {"encoding": "zlib", "dictionary": "2"})
+    with pytest.raises(ValueError):
+        payload_codec.PayloadEncoder("lz4")
@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from poll_scheduler import PollScheduler
+
+
+def test_busy_symbols_speed_up_and_quiet_symbols_back_off():
+    scheduler = PollScheduler(initial_interval=1.0, min_interval=0.1, max_interval=5.0)
+    now = 0.0
+    for _ in range(50):
+        for symbol in scheduler.due(["XAUUSD", "USDTRY"], now):
+            # XAUUSD has a new tick on every poll, USDTRY never does
+            scheduler.record(symbol, 1 if symbol == "XAUUSD" else 0, now)
+        now += scheduler.delay(["XAUUSD", "USDTRY"], now)
+
+    assert scheduler.intervals["XAUUSD"] < 0.5
+    assert scheduler.intervals["USDTRY"] == 5.0
+
+
+def test_fastest_subscriber_request_caps_the_interval():
+    scheduler = PollScheduler(initial_interval=1.0, min_interval=0.1, max_interval=5.0)
+    scheduler.record("USDTRY", 0, 0.0)
+    scheduler.record("USDTRY", 0, 1.0)
+    assert scheduler.intervals["USDTRY"] == 5.0
+
+    assert scheduler.request("USDTRY", "a", 0.5)
+    assert scheduler.request("USDTRY", "b", 0.25)
+    assert scheduler.due(["USDTRY"], 1.3) == ["USDTRY"]
+    scheduler.record("USDTRY", 0, 1.3)
+    assert scheduler.intervals["USDTRY"] == 0.25
+
+    assert scheduler.release("b") == ["USDTRY"]
+    assert scheduler.requested["USDTRY"] == 0.5
+    # Requests faster than min_interval are held to it
+    assert scheduler.request("USDTRY", "c", 0.01)
+    scheduler.record("USDTRY", 0, 2.0)
+    assert scheduler.intervals["USDTRY"] == 0.1
+
+
+def test_release_only_touches_the_clients_own_requests():
+    scheduler = PollScheduler()
+    scheduler.request("EURUSD", "a", 0.5)
+    scheduler.request("GBPUSD", "a", 0.5)
+    scheduler.request("GBPUSD", "b", 0.2)
+    scheduler.request("EURUSD", "a", None)
+
+    assert scheduler.requested_by_client == {"a": {"GBPUSD"}, "b": {"GBPUSD"}}
+    assert scheduler.release("a") == []  # b's faster request still holds
+    assert scheduler.release("a") == []
+    assert scheduler.release("b") == ["GBPUSD"]
+    assert scheduler.requests == scheduler.requested == scheduler.requested_by_client == {}
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+from position_diff import PositionDiffer
+
+
+def position(ticket, **fields):
+    values = dict(
+        ticket=ticket, time=0, time_msc=0, time_update=0, time_update_msc=0, type=0, magic=0,
+        identifier=ticket, reason=0, volume=1.0, price_open=1.1, sl=0.0, tp=0.0, price_current=1.1,
+        swap=0.0, profit=0.0, symbol="EURUSD", comment="", external_id="",
+    )
+    values.update(fields)
+    return mt5.TradePosition(**values)
+
+
+def test_new_changed_and_closed_positions_are_found_in_any_order():
+    differ = PositionDiffer(throttle_interval=0)
+    first = differ.update([position(3), position(1), position(2)])
+    assert [p.ticket for p in first.new] == [1, 2, 3] and not first.changed and not first.closed
+    assert not differ.update([position(1), position(2), position(3)])
+
+    diff = differ.update([position(4), position(2, sl=1.05), position(1, volume=0.5, profit=2.0)])
+    assert [p.ticket for p in diff.new] == [4]
+    assert diff.closed == [3]
+    assert [(p.ticket, changes) for p, changes in diff.changed] == [
+        (1, {"volume": 0.5, "profit": 2.0}),
+        (2, {"sl": 1.05}),
+    ]
+
+
+def test_profit_only_changes_are_reported_once_per_throttle_interval():
+    differ = PositionDiffer(throttle_interval=5.0)
+    differ.update([position(1), position(2)], now=100.0)
+    assert [p.ticket for p, _ in differ.update([position(1, profit=1.0), position(2)], now=101.0).changed] == [1]
+
+    # Within the interval only the stop-loss change goes out, with the profit it has by then
+    diff = differ.update([position(1, profit=2.0), position(2, profit=3.0, sl=1.0)], now=102.0)
+    assert [(p.ticket, changes) for p, changes in diff.changed] == [(2, {"profit": 3.0, "sl": 1.0})]
+    assert not differ.update([position(1, profit=2.0), position(2, profit=3.0, sl=1.0)], now=103.0)
+
+    # The held back change of position 1 is reported once the interval has passed
+    diff = differ.update([position(1, profit=2.5), position(2, profit=3.0, sl=1.0)], now=106.0)
+    assert [(p.ticket, changes) for p, changes in diff.changed] == [(1, {"profit": 2.5})]
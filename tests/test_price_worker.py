@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+from price_worker import PriceWorker
+
+
+def test_one_worker_answers_repeated_requests_for_several_symbols(monkeypatch):
+    mt5.configure(symbols="EURUSD,GBPUSD", tick_rate=20)
+    now_msc = mt5.EPOCH_MSC + 60_000
+    monkeypatch.setattr(mt5, "_now_msc", lambda: now_msc)
+
+    worker = PriceWorker(path="/fake", timeout=5)
+    try:
+        prices = worker.fetch(["EURUSD", "GBPUSD", "XAUUSD"])
+        pid = worker._process.pid
+        assert set(prices) == {"EURUSD", "GBPUSD"}  # Unknown symbols are left out
+
+        mt5.initialize()
+        tick = mt5.symbol_info_tick("EURUSD")
+        assert (prices["EURUSD"].bid, prices["EURUSD"].ask, prices["EURUSD"].time_msc) == (
+            tick.bid, tick.ask, tick.time_msc)
+        mt5.shutdown()
+
+        assert set(worker.fetch(["GBPUSD"])) == {"GBPUSD"}
+        assert worker._process.pid == pid  # Same process, no new session per request
+    finally:
+        worker.stop()
+    assert not worker.is_alive
+
+
+def test_failed_initialization_is_reported_and_retried_on_the_next_request(monkeypatch):
+    mt5.configure(symbols="EURUSD")
+    attempts = []
+
+    def initialize(path=None, **kwargs):
+        # Runs in the worker process: the first attempt fails, later ones succeed
+        attempts.append(path)
+        if len(attempts) == 1:
+            mt5._last_error = (mt5.RES_E_INTERNAL_FAIL, "Terminal not found")
+            return False
+        mt5._initialized = True
+        return True
+
+    monkeypatch.setattr(mt5, "initialize", initialize)
+    worker = PriceWorker(path="/fake", timeout=5)
+    try:
+        assert worker.fetch(["EURUSD"]) is None
+        assert worker.is_alive  # The worker survives and tries again
+        assert set(worker.fetch(["EURUSD"])) == {"EURUSD"}
+    finally:
+        worker.stop()
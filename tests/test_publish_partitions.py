@@ -0,0 +1,60 @@
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+import publish_partitions
+from publish_partitions import partition_publisher_kwargs, partition_symbols, run_partitions, symbol_partition
+
+
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "AUDUSD", "USDCHF", "USDCAD", "NZDUSD"]
+
+
+def test_every_symbol_belongs_to_exactly_one_stable_partition():
+    partitions = [partition_symbols(SYMBOLS, 3, partition) for partition in range(3)]
+    assert sorted(symbol for symbols in partitions for symbol in symbols) == sorted(SYMBOLS)
+    # CRC-32 based, so the same in every process and on every run
+    assert [symbol_partition(symbol, 3) for symbol in SYMBOLS] == [1, 2, 1, 2, 0, 0, 2, 1]
+    # A symbol's partition does not depend on the rest of the list
+    assert partition_symbols(["XAUUSD"], 3, 2) == ["XAUUSD"]
+
+
+def test_only_the_trade_partition_publishes_trades_and_each_gets_its_own_spool():
+    base = {"symbols": SYMBOLS, "topic_name": "mt5-trading-topic", "spool_dir": "spool"}
+    trade = partition_publisher_kwargs(base, 3, 1, trade_partition=1)
+    other = partition_publisher_kwargs(base, 3, 0, trade_partition=1)
+
+    assert trade["symbols"] == ["EURUSD", "USDJPY", "NZDUSD"] and trade["include_trades"]
+    assert other["symbols"] == ["AUDUSD", "USDCHF"] and not other["include_trades"]
+    assert (trade["spool_dir"], other["spool_dir"]) == (os.path.join("spool", "partition-1"),
+                                                        os.path.join("spool", "partition-0"))
+    assert other["topic_name"] == "mt5-trading-topic" and base["spool_dir"] == "spool"
+    assert partition_publisher_kwargs({"symbols": ["EURUSD"]}, 3, 0) is None
+
+
+def test_a_trade_partition_without_symbols_is_rejected_before_anything_starts(monkeypatch):
+    monkeypatch.setattr(publish_partitions.multiprocessing, "Process", None)  # Nothing may be started
+    assert not run_partitions(3, 0, {"symbols": ["XAUUSD"]})  # XAUUSD belongs to partition 2
+
+
+def _stopping_partition(partition, partitions, trade_partition, publisher_kwargs, stop_event):
+    # Ignores SIGTERM: only the shared event can stop it gracefully
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    if stop_event.wait(30):
+        open(os.path.join(publisher_kwargs["spool_dir"], f"stopped-{partition}"), "w").close()
+
+
+def test_supervisor_stops_publishers_through_the_shared_event(monkeypatch, tmp_path):
+    monkeypatch.setattr(publish_partitions, "_partition_main", _stopping_partition)
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    stopper = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+    stopper.start()
+    try:
+        assert run_partitions(3, 1, {"symbols": SYMBOLS, "spool_dir": str(tmp_path)})
+    finally:
+        stopper.cancel()
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+    assert sorted(os.listdir(tmp_path)) == ["stopped-0", "stopped-1", "stopped-2"]
@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from publish_spool import RECORD_HEADER, PublishSpool
+
+
+def message(n):
+    return f'{{"type": "price_update", "n": {n}}}'.encode()
+
+
+def test_failed_records_are_handed_out_again_in_order_and_acked_segments_deleted(tmp_path):
+    spool = PublishSpool(str(tmp_path), segment_size=200)
+    spool.open()
+    seqs = [spool.append(message(n), sending=n < 4) for n in range(8)]
+    assert seqs == list(range(8))
+    segment_files = sorted(name for name in os.listdir(tmp_path) if name.endswith(".seg"))
+    assert len(segment_files) > 1
+
+    spool.nack(1)  # Publishing failed; it goes back in line before the never-sent records
+    assert [seq for seq, _ in spool.take(3)] == [1, 4, 5]
+    assert spool.take(10) == [(6, message(6)), (7, message(7))]
+    assert spool.take(10) == []
+
+    for seq in range(8):
+        spool.ack(seq)
+    remaining = [name for name in os.listdir(tmp_path) if name.endswith(".seg")]
+    assert remaining == segment_files[-1:]  # Only the segment still being written to is kept
+    assert spool.stats()["unsent"] == spool.stats()["in_flight"] == 0
+    spool.close()
+
+
+def test_reopening_replays_unacknowledged_records_up_to_a_torn_write(tmp_path):
+    spool = PublishSpool(str(tmp_path), segment_size=4096)
+    spool.open()
+    for n in range(5):
+        spool.append(message(n), sending=True)
+    spool.ack(0)
+    spool.ack(1)
+    spool.ack(3)  # Acknowledged out of order: only 0 and 1 are below the watermark
+    spool.close()
+
+    # A crash in the middle of appending leaves a record whose payload does not match its checksum
+    path = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[0])
+    with open(path, "r+b") as f:
+        f.seek(sum(RECORD_HEADER.size + len(message(n)) for n in range(4)) + RECORD_HEADER.size)
+        f.write(b"#")
+
+    reopened = PublishSpool(str(tmp_path), segment_size=4096)
+    assert reopened.open() == 2
+    assert reopened.take(10) == [(2, message(2)), (3, message(3))]
+    assert reopened.append(message(5), sending=False) == 4  # Overwrites the torn record
+    reopened.close()
+
+
+def test_reopening_after_out_of_order_acks_replays_the_rest_without_reporting_a_gap(tmp_path, caplog):
+    spool = PublishSpool(str(tmp_path), segment_size=200)
+    spool.open()
+    for n in range(12):
+        spool.append(message(n), sending=True)
+    bases = sorted(int(name[:-len(".seg")]) for name in os.listdir(tmp_path) if name.endswith(".seg"))
+    assert len(bases) >= 3
+    for seq in range(bases[1], bases[2]):  # Every record of the middle segment
+        spool.ack(seq)
+    spool.ack(bases[0])
+    spool.close()
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".seg")]) == len(bases) - 1
+
+    reopened = PublishSpool(str(tmp_path), segment_size=200)
+    with caplog.at_level("WARNING"):
+        assert reopened.open() == 12 - (bases[2] - bases[1]) - 1
+    assert "Gap" not in caplog.text
+    replayed = [seq for seq, _ in reopened.take(20)]
+    assert replayed == [seq for seq in range(1, 12) if not bases[1] <= seq < bases[2]]
+    reopened.close()
+
+    # A segment cut short in the middle of the spool does lose records
+    first = os.path.join(tmp_path, f"{bases[0]:020d}.seg")
+    with open(first, "r+b") as f:
+        f.seek(RECORD_HEADER.size + len(message(0)) + RECORD_HEADER.size)
+        f.write(b"#")
+    damaged = PublishSpool(str(tmp_path), segment_size=200)
+    with caplog.at_level("WARNING"):
+        damaged.open()
+    assert "Gap in spool" in caplog.text
+    damaged.close()
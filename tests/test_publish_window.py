@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from publish_window import InFlightWindow
+
+
+def test_acquire_waits_only_while_the_window_is_full():
+    async def run():
+        window = InFlightWindow(max_messages=2, max_bytes=1000)
+        futures = []
+        for _ in range(2):
+            await window.acquire(10)
+            futures.append(Future())
+            window.track(futures[-1], 10)
+
+        third = asyncio.create_task(window.acquire(10))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+
+        # Acknowledgements arrive on another thread, as with the Pub/Sub client
+        await asyncio.to_thread(futures[0].set_result, "id-1")
+        await asyncio.wait_for(third, 1)
+        assert window.stats()["waits"] == 1
+        return window, futures
+
+    window, futures = asyncio.run(run())
+    assert (window.messages, window.published) == (2, 1)
+
+
+def test_failures_are_counted_and_drain_waits_for_all():
+    async def run():
+        window = InFlightWindow(max_messages=10, max_bytes=100)
+        outcomes = []
+        futures = [Future() for _ in range(3)]
+        for future in futures:
+            await window.acquire(40)  # The third only fits after one of the others completes
+            window.track(future, 40, outcomes.append)
+            if future is futures[1]:
+                futures[0].set_exception(RuntimeError("deadline exceeded"))
+        futures[1].set_result("id-2")
+        futures[2].set_result("id-3")
+
+        assert await window.drain(timeout=1)
+        return window, outcomes
+
+    window, outcomes = asyncio.run(run())
+    assert (window.published, window.failed, window.messages, window.bytes) == (2, 1, 0, 0)
+    assert len(outcomes) == 3
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+import pytest
+import websockets
+
+pytest.importorskip("google.cloud.pubsub_v1")
+
+from pubsub_publisher import MT5PubSubPublisher
+
+
+class FakePubSub:
+    """Publisher client that accepts messages up to max_bytes, like Pub/Sub's request size limit"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.published = []
+
+    def publish(self, topic, data, **attributes):
+        if len(data) > self.max_bytes:
+            raise ValueError("The message being published would produce too large a publish request")
+        future = Future()
+        future.set_result(str(len(self.published)))
+        self.published.append(data)
+        return future
+
+
+def test_a_message_pubsub_rejects_does_not_hold_back_the_spool(tmp_path):
+    publisher = MT5PubSubPublisher("ws://unused", "project", "topic", spool_dir=str(tmp_path), max_in_flight_bytes=64)
+    publisher.publisher = FakePubSub(max_bytes=100)
+    publisher.setup_spool()
+
+    async def run():
+        publisher.running = True
+        replay = asyncio.create_task(publisher.replay_spool())
+        await publisher.publish_message({"type": "price_update", "symbol": "EURUSD", "padding": "x" * 200})
+        await publisher.publish_message({"type": "price_update", "symbol": "GBPUSD"})
+        await asyncio.sleep(0.05)
+        publisher.running = False
+        replay.cancel()
+
+    asyncio.run(run())
+    assert [b"GBPUSD" in data for data in publisher.publisher.published] == [True]
+    assert publisher.spool.unsent == publisher.spool.in_flight == 0
+    assert not publisher.replay_failing
+    publisher.spool.close()
+
+
+def test_stopping_from_another_thread_wakes_a_publisher_with_no_messages_arriving():
+    subscribed = threading.Event()
+
+    async def quiet_server(websocket, path=None):
+        await websocket.recv()
+        subscribed.set()
+        await websocket.wait_closed()  # Not a single price update
+
+    async def run():
+        async with websockets.serve(quiet_server, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            publisher = MT5PubSubPublisher(f"ws://127.0.0.1:{port}", "project", "topic", stats_interval=60)
+            publisher.publisher = FakePubSub(max_bytes=100)
+            task = asyncio.create_task(publisher.connect_and_publish())
+            await asyncio.get_running_loop().run_in_executor(None, subscribed.wait, 5)
+            # As the partition supervisor does, from a thread of its own
+            threading.Thread(target=publisher.stop).start()
+            start = time.monotonic()
+            await asyncio.wait_for(task, 5)
+            return time.monotonic() - start
+
+    assert asyncio.run(run()) < 1
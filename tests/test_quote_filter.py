@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from quote_filter import QuoteFilter
+
+
+def test_exact_repeats_are_suppressed():
+    quotes = QuoteFilter()
+
+    assert quotes.should_emit("EURUSD", 1.1000, 1.1002, now=0)
+    assert not quotes.should_emit("EURUSD", 1.1000, 1.1002, now=1)
+    assert quotes.should_emit("EURUSD", 1.1001, 1.1002, now=2)
+    assert quotes.stats()["EURUSD"] == {"emitted": 2, "suppressed": 1}
+
+    quotes.forget("EURUSD")
+    assert quotes.stats() == {}
+    assert quotes.suppressed_total == 1  # Exported as a counter, so it never goes down
+
+
+def test_min_move_is_measured_from_last_emitted_quote():
+    quotes = QuoteFilter(min_move_points=5)
+    assert quotes.needs_point("EURUSD")
+    quotes.set_point("EURUSD", 0.00001)
+
+    assert quotes.should_emit("EURUSD", 1.10000, 1.10020, now=0)
+    assert not quotes.should_emit("EURUSD", 1.10003, 1.10023, now=1)
+    # Small moves add up against the last emitted quote, not the last seen one
+    assert quotes.should_emit("EURUSD", 1.10006, 1.10026, now=2)
+
+
+def test_heartbeat_resends_unchanged_quote():
+    quotes = QuoteFilter(heartbeat_interval=10)
+
+    assert quotes.should_emit("EURUSD", 1.1, 1.1002, now=0)
+    assert not quotes.should_emit("EURUSD", 1.1, 1.1002, now=5)
+    assert not quotes.heartbeat_due("EURUSD", now=9)
+    assert quotes.heartbeat_due("EURUSD", now=10)
+    assert quotes.should_emit("EURUSD", 1.1, 1.1002, now=10)
+
+    quotes.forget("EURUSD")
+    assert quotes.stats() == {}
+    assert quotes.should_emit("EURUSD", 1.1, 1.1002, now=11)
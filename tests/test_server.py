@@ -0,0 +1,179 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+import pytest
+from wire_protocol import BINARY_PROTOCOL, encode_price_record
+
+
+@pytest.fixture
+def make_server(mt5_env):
+    server_module = importlib.import_module("server")
+    servers = []
+
+    def make(**kwargs):
+        server = server_module.MT5WebSocketServer(deal_cursor_file=None, **kwargs)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.mt5_executor.shutdown()
+        server.mt5_client.close()
+
+
+async def run_for(coroutine_function, server, seconds):
+    server.running = True
+    task = asyncio.create_task(coroutine_function())
+    await asyncio.sleep(seconds)
+    server.running = False
+    await asyncio.wait_for(task, 5)
+
+
+def test_silent_symbols_get_heartbeats_in_ticks_mode(make_server, monkeypatch):
+    mt5.configure(symbols="EURUSD,GBPUSD", tick_rate=20)
+    monkeypatch.setattr(mt5, "_now_msc", lambda: mt5.EPOCH_MSC + 60_000)  # No new ticks arrive
+    server = make_server(capture_mode="ticks", heartbeat_interval=0.2, tick_idle_interval=0.02)
+    server.subscriptions.subscribe("client", ["EURUSD"])
+    sent = []
+    monkeypatch.setattr(server, "_fan_out_prices", lambda events, encode_start: sent.append(events))
+
+    asyncio.run(run_for(server.capture_ticks, server, 0.3))
+
+    quotes = [(symbol, record) for events in sent for symbol, _, record in events]
+    assert [symbol for symbol, _ in quotes] == ["EURUSD"] * 2  # The seed tick, then a heartbeat after 0.2 s
+    assert len(set(record for _, record in quotes)) == 1  # Always the same quote
+    assert server.quote_filter.stats()["EURUSD"]["emitted"] == 2
+
+    server.subscriptions.remove_client("client")
+    assert server.quote_filter.stats() == {}
+
+
+class FakeWebSocket:
+    remote_address = ("127.0.0.1", 1234)
+
+    def __init__(self):
+        self.sent = []
+        self.release = asyncio.Event()
+
+    async def send(self, message):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def test_switching_protocol_and_policy_drops_prices_queued_in_the_old_encoding(make_server):
+    server = make_server()
+
+    async def run():
+        ws = FakeWebSocket()
+        await server.register_client(ws)
+        await server.handle_subscription(ws, {"action": "subscribe", "symbols": ["EURUSD"], "protocol": BINARY_PROTOCOL,
+                                              "overflow_policy": "drop_oldest"})
+        await asyncio.sleep(0)
+        client = server.client_queues[ws]
+        client.send_price("EURUSD", encode_price_record(1, 1.1, 1.1002, 1000))
+        client.send_price("EURUSD", encode_price_record(1, 1.2, 1.2002, 2000))
+
+        await server.handle_subscription(ws, {"action": "subscribe", "symbols": ["EURUSD"], "protocol": "json",
+                                              "overflow_policy": "conflate"})
+        ws.release.set()
+        await asyncio.sleep(0.05)
+        await server.unregister_client(ws)
+        return ws.sent
+
+    sent = asyncio.run(run())
+    assert not any(isinstance(message, bytes) for message in sent)  # No binary price record or frame
+    assert [json.loads(message)["type"] for message in sent] == [
+        "subscription_confirmation", "symbol_table", "subscription_confirmation"]
+
+
+def server_quote(bid, ask):
+    return importlib.import_module("mt5_base").SymbolPrice(bid, ask, mt5.EPOCH_MSC)
+
+
+async def connect(server):
+    ws = FakeWebSocket()
+    ws.release.set()
+    await server.register_client(ws)
+    return ws
+
+
+async def disconnect(server, ws):
+    await asyncio.sleep(0.01)  # Let the writer send what is queued
+    await server.unregister_client(ws)
+    return [json.loads(message) for message in ws.sent]
+
+
+def test_snapshot_request_refreshes_positions_the_paused_trade_loop_left_stale(make_server, monkeypatch):
+    mt5.configure(symbols="EURUSD,GBPUSD", positions=4, trade_rate=0.5)
+    now = [mt5.EPOCH_MSC + 60_000]
+    monkeypatch.setattr(mt5, "_now_msc", lambda: now[0])
+    server = make_server()
+    server._cache_quote("EURUSD", server_quote(1.1, 1.1002))
+
+    async def run():
+        ws = await connect(server)
+        await server.handle_snapshot(ws, {"type": "snapshot", "symbols": ["EURUSD", "GBPUSD"]})
+        now[0] += 10_000  # Positions roll over while nobody subscribes to trades
+        server.positions_refreshed_at -= 10
+        await server.handle_snapshot(ws, {"type": "snapshot"})
+        return await disconnect(server, ws)
+
+    first, second = asyncio.run(run())
+    assert first["missing"] == ["GBPUSD"] and [p["symbol"] for p in first["prices"]] == ["EURUSD"]
+    assert not second["positions_stale"]
+    mt5.initialize()
+    assert sorted(p["trade_id"] for p in second["positions"]) == sorted(p.ticket for p in mt5.positions_get())
+    assert {p["trade_id"] for p in first["positions"]} != {p["trade_id"] for p in second["positions"]}
+
+
+def test_snapshot_says_when_positions_could_not_be_refreshed(make_server, monkeypatch):
+    monkeypatch.setattr(mt5, "initialize", lambda path=None, **kwargs: False)
+    server = make_server()
+
+    async def run():
+        ws = await connect(server)
+        await server.handle_snapshot(ws, {"type": "snapshot", "include_trades": True})
+        return await disconnect(server, ws)
+
+    (reply,) = asyncio.run(run())
+    assert reply["positions_stale"] and reply["positions"] == []
+
+
+def test_new_trade_subscriber_starts_from_current_positions_and_quotes(make_server, monkeypatch):
+    mt5.configure(symbols="EURUSD,GBPUSD", positions=3, trade_rate=0.5)
+    monkeypatch.setattr(mt5, "_now_msc", lambda: mt5.EPOCH_MSC + 60_000)
+    server = make_server()
+    server._cache_quote("EURUSD", server_quote(1.1, 1.1002))
+
+    async def run():
+        ws = await connect(server)
+        await server.handle_subscription(ws, {"action": "subscribe", "symbols": ["EURUSD"], "include_trades": True})
+        return await disconnect(server, ws)
+
+    messages = asyncio.run(run())
+    mt5.initialize()
+    tickets = sorted(p.ticket for p in mt5.positions_get())
+    assert [m.get("update_type", m["type"]) for m in messages] == [
+        "position"] * len(tickets) + ["subscription_confirmation", "price_update"]
+    assert sorted(m["trade_id"] for m in messages[:len(tickets)]) == tickets
+    assert messages[-1]["bid"] == 1.1
+
+
+def test_suppressed_counter_survives_the_last_subscriber_leaving(make_server):
+    server = make_server()
+    server.subscriptions.subscribe("client", ["EURUSD"])
+    for _ in range(3):
+        server.quote_filter.should_emit("EURUSD", 1.1, 1.1002)
+
+    server.subscriptions.remove_client("client")
+    assert "price_updates_suppressed_total 2" in server.metrics.registry.exposition().decode().splitlines()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from shm_ring import RingReader, SharedRing
+
+
+def test_readers_see_entries_in_order():
+    ring = SharedRing.create(capacity=4, slot_size=64)
+    try:
+        reader = RingReader(SharedRing.attach(ring.name))
+        ring.write(b"one")
+        ring.write(b"two")
+
+        assert reader.read() == ([b"one", b"two"], 0)
+        assert reader.read() == ([], 0)
+    finally:
+        reader.ring.close()
+        ring.close()
+
+
+def test_lapped_reader_skips_to_oldest_entry_and_counts_losses():
+    ring = SharedRing.create(capacity=4, slot_size=64)
+    try:
+        reader = RingReader(ring, from_oldest=False)
+        for i in range(10):
+            ring.write(str(i).encode())
+
+        entries, lost = reader.read()
+        assert entries == [b"6", b"7", b"8", b"9"]
+        assert lost == 6
+        assert reader.lost == 6
+    finally:
+        ring.close()
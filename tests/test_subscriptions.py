@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from subscriptions import SubscriptionRegistry
+
+
+def test_symbols_stay_active_until_last_subscriber_leaves():
+    deactivated = []
+    registry = SubscriptionRegistry(on_deactivate=deactivated.append)
+
+    assert registry.subscribe("a", ["EURUSD", "GBPUSD"]) == ["EURUSD", "GBPUSD"]
+    assert registry.subscribe("b", ["EURUSD"]) == []
+    assert registry.subscribers("EURUSD") == {"a", "b"}
+
+    assert registry.unsubscribe("a", ["EURUSD"]) == []
+    assert "EURUSD" in registry
+    assert registry.remove_client("b") == ["EURUSD"]
+    assert deactivated == ["EURUSD"]
+    assert registry.active_symbols() == ["GBPUSD"]
+
+
+def test_remove_client_only_touches_its_symbols():
+    registry = SubscriptionRegistry()
+    registry.subscribe("a", ["EURUSD"])
+    registry.subscribe("b", ["GBPUSD", "USDJPY"])
+
+    assert sorted(registry.remove_client("b")) == ["GBPUSD", "USDJPY"]
+    assert registry.symbols_of("b") == set()
+    assert registry.active_symbols() == ["EURUSD"]
+    assert registry.remove_client("unknown") == []
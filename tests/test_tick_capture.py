@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside", "fake_mt5"))
+
+import MetaTrader5 as mt5
+import numpy as np
+import tick_capture
+from tick_capture import TICK_DTYPE, TickCapture
+
+
+def ticks(*times_msc):
+    return np.array(
+        [(t // 1000, 1.1 + i * 1e-5, 1.1002 + i * 1e-5, 0.0, 0, t, 6, 0.0) for i, t in enumerate(times_msc)],
+        dtype=TICK_DTYPE,
+    )
+
+
+def test_every_tick_is_returned_once_including_ticks_sharing_a_millisecond(monkeypatch):
+    mt5.configure(symbols="EURUSD", tick_rate=20)
+    now = [mt5.EPOCH_MSC + 60_000]
+    monkeypatch.setattr(mt5, "_now_msc", lambda: now[0])
+    mt5.initialize()
+
+    capture = TickCapture()
+    seeded = capture.poll("EURUSD")
+    assert len(seeded) == 1 and capture.poll("EURUSD").size == 0
+
+    now[0] += 3000
+    first = capture.poll("EURUSD")
+    now[0] += 2000
+    second = capture.poll("EURUSD")
+    times = np.concatenate([seeded["time_msc"], first["time_msc"], second["time_msc"]])
+    expected = mt5.copy_ticks_from("EURUSD", seeded["time_msc"][0] / 1000, 1000, mt5.COPY_TICKS_INFO)["time_msc"]
+    assert times.tolist() == expected[expected >= seeded["time_msc"][0]].tolist()
+    mt5.shutdown()
+
+
+def test_ticks_arriving_later_in_the_cursor_millisecond_are_not_lost(monkeypatch):
+    history = [ticks(5000, 5000)]
+    monkeypatch.setattr(tick_capture.mt5, "copy_ticks_from", lambda *args: history[0])
+
+    capture = TickCapture()
+    capture.cursors["EURUSD"] = 4000
+    assert capture.poll("EURUSD")["time_msc"].tolist() == [5000, 5000]
+    assert capture.poll("EURUSD").size == 0  # Re-read second, nothing new
+
+    history[0] = ticks(5000, 5000, 5000, 5250)
+    new = capture.poll("EURUSD")
+    assert new["time_msc"].tolist() == [5000, 5250]
+    assert new["bid"][0] == history[0]["bid"][2]  # The third tick at 5000, not a repeat
+
+    capture.forget("EURUSD")
+    assert "EURUSD" not in capture.cursors
+
+
+def test_poll_many_leaves_out_symbols_without_new_ticks(monkeypatch):
+    monkeypatch.setattr(tick_capture.mt5, "copy_ticks_from",
+                        lambda symbol, *args: ticks(5000, 6000) if symbol == "EURUSD" else ticks(5000))
+    capture = TickCapture()
+    capture.cursors.update(EURUSD=5000, GBPUSD=5000)
+    capture._seen_at_cursor.update(EURUSD=1, GBPUSD=1)
+    assert list(capture.poll_many(["EURUSD", "GBPUSD"])) == ["EURUSD"]
@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from trade_journal import TradeJournal
+
+
+def _transaction(transaction_id):
+    return {"type": "trade_update", "update_type": "transaction", "transaction_id": transaction_id}
+
+
+def _position(trade_id):
+    return {"type": "trade_update", "update_type": "position", "trade_id": trade_id}
+
+
+def test_append_assigns_increasing_sequence_numbers():
+    journal = TradeJournal(capacity=10)
+    first = journal.append(_position(1))
+    second = journal.append(_transaction(100))
+
+    assert json.loads(first)["seq"] == 1
+    assert json.loads(second)["seq"] == 2
+    assert journal.next_seq == 3
+
+
+def test_since_seq_returns_only_missed_updates():
+    journal = TradeJournal(capacity=10)
+    for trade_id in range(1, 6):
+        journal.append(_position(trade_id))
+
+    missed = journal.since_seq(3)
+    assert [json.loads(m)["trade_id"] for m in missed] == [4, 5]
+    assert journal.since_seq(5) == []
+
+
+def test_since_seq_rejects_other_epochs():
+    journal = TradeJournal(capacity=10, epoch=2)
+    journal.append(_position(1))
+
+    assert journal.since_seq(0, epoch=2) is not None
+    assert journal.since_seq(0, epoch=1) is None
+    assert journal.since_seq(7) is None
+
+
+def test_since_seq_reports_gap_after_eviction():
+    journal = TradeJournal(capacity=3)
+    for trade_id in range(1, 6):
+        journal.append(_position(trade_id))
+
+    assert journal.first_seq == 3
+    assert journal.since_seq(1) is None
+    assert len(journal.since_seq(2)) == 3
+
+
+def test_transactions_since_uses_floor():
+    journal = TradeJournal(capacity=3)
+    assert journal.transactions_since(0) is None
+
+    journal.transaction_floor = 99
+    journal.append(_transaction(100))
+    journal.append(_position(1))
+    journal.append(_transaction(101))
+
+    missed = journal.transactions_since(100)
+    assert [json.loads(m)["transaction_id"] for m in missed] == [101]
+
+    # Position updates evict entries but not transactions
+    journal.append(_position(2))
+    journal.append(_position(3))
+    assert journal.transaction_floor == 99
+    assert len(journal.transactions_since(99)) == 2
+
+    # Evicting transaction 100 raises the floor, so older ids need MT5 history
+    journal.append(_transaction(102))
+    journal.append(_transaction(103))
+    assert journal.transaction_floor == 100
+    assert journal.transactions_since(99) is None
+    assert len(journal.transactions_since(100)) == 3
+
+
+def test_position_churn_does_not_push_transactions_out():
+    journal = TradeJournal(capacity=100, transaction_capacity=2)
+    journal.transaction_floor = 0
+    journal.append(_transaction(1))
+    for _ in range(1000):
+        journal.append(_position(7))
+
+    assert journal.transaction_floor == 0
+    assert [json.loads(m)["transaction_id"] for m in journal.transactions_since(0)] == [1]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vmside"))
+
+from wire_protocol import SymbolTable, decode_frame, encode_price_frame, encode_price_record
+
+
+def test_price_frame_round_trip():
+    table = SymbolTable()
+    assert table.message(["EURUSD", "GBPUSD"])["symbols"] == {"EURUSD": 0, "GBPUSD": 1}
+
+    frame = encode_price_frame([
+        encode_price_record(table.id_for("EURUSD"), 1.1, 1.1002, 1700000000123),
+        encode_price_record(table.id_for("GBPUSD"), 1.25, 1.2503, 1700000000456),
+    ])
+    updates = decode_frame(frame, {0: "EURUSD", 1: "GBPUSD"})
+
+    assert len(frame) == 6 + 2 * 26
+    assert [u["symbol"] for u in updates] == ["EURUSD", "GBPUSD"]
+    assert updates[0]["bid"] == 1.1 and updates[0]["ask"] == 1.1002
+    assert updates[1]["timestamp"] == "2023-11-14T22:13:20.456000+00:00"
+
+
+def test_truncated_frame_is_rejected():
+    frame = encode_price_frame([encode_price_record(0, 1.1, 1.1002, 0)])
+    with pytest.raises(ValueError):
+        decode_frame(frame[:-1], {0: "EURUSD"})
@@ -0,0 +1,159 @@
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# Supported bar timeframes and their length in milliseconds
+TIMEFRAMES = {
+    "1s": 1_000,
+    "5s": 5_000,
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+}
+
+
+class Bar:
+    """OHLC bar of one symbol and timeframe, built from bid prices like MT5's own bars"""
+
+    __slots__ = ("symbol", "timeframe", "start_msc", "end_msc", "open", "high", "low", "close",
+                 "tick_volume", "closed", "dirty", "sent_at")
+
+    def __init__(self, symbol: str, timeframe: str, start_msc: int, price: float):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.start_msc = start_msc
+        self.end_msc = start_msc + TIMEFRAMES[timeframe]
+        self.open = self.high = self.low = self.close = price
+        self.tick_volume = 1
+        self.closed = False
+        self.dirty = True  # Changed since it was last sent
+        self.sent_at = 0.0
+
+    def add(self, price: float) -> None:
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.tick_volume += 1
+        self.dirty = True
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "time_msc": self.start_msc,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "tick_volume": self.tick_volume,
+            "closed": self.closed,
+        }
+
+
+class BarAggregator:
+    """Incremental OHLC bars per symbol and timeframe
+
+    Each tick updates the open bar of every timeframe watched for its symbol
+    in constant time. Bars are bucketed by the tick's own time, so they line
+    up with the broker's bars whatever the local clock says. A bar closes
+    when a tick of a later bar arrives, or once the broker clock (estimated
+    from recent ticks) is ``close_delay`` past its end. Bars without ticks
+    are not produced, as in MT5.
+    """
+
+    def __init__(self, update_interval: float = 1.0, close_delay: float = 2.0, scan_interval: float = 0.1):
+        """
+        Args:
+            update_interval: Minimum seconds between two sends of the same bar in progress
+            close_delay: Seconds past a bar's end, on the broker clock, before it closes without a new tick
+            scan_interval: Minimum seconds between checks for due and expired bars
+        """
+        self.update_interval = update_interval
+        self.close_delay_msc = int(close_delay * 1000)
+        self.scan_interval = scan_interval
+        self.timeframes: Dict[str, Set[str]] = {}  # Symbol to its watched timeframes
+        self.bars: Dict[Tuple[str, str], Bar] = {}  # Open bar per (symbol, timeframe)
+        self.closed_until: Dict[Tuple[str, str], int] = {}  # End of the last closed bar
+        self.last_time_msc: Dict[str, int] = {}  # Newest tick time seen per symbol
+        self.clock_offset: Optional[int] = None  # Broker clock minus local clock, in ms
+        self.completed: List[Bar] = []
+        self.next_scan = 0.0
+
+    def watches(self, symbol: str) -> bool:
+        return symbol in self.timeframes
+
+    def add(self, symbol: str, timeframe: str) -> None:
+        self.timeframes.setdefault(symbol, set()).add(timeframe)
+
+    def remove(self, symbol: str, timeframe: str) -> None:
+        timeframes = self.timeframes.get(symbol)
+        if not timeframes:
+            return
+        timeframes.discard(timeframe)
+        self.bars.pop((symbol, timeframe), None)
+        self.closed_until.pop((symbol, timeframe), None)
+        if not timeframes:
+            del self.timeframes[symbol]
+            self.last_time_msc.pop(symbol, None)
+
+    def current(self, symbol: str, timeframe: str) -> Optional[Bar]:
+        """The bar in progress, if any"""
+        return self.bars.get((symbol, timeframe))
+
+    def update(self, symbol: str, bid: float, time_msc: int, now: Optional[float] = None) -> None:
+        """Apply one tick to every watched timeframe of its symbol"""
+        timeframes = self.timeframes.get(symbol)
+        if not timeframes:
+            return
+
+        now = time.time() if now is None else now
+        # Ticks arrive after they happen, so the largest offset is the closest
+        # to the true one; a much smaller one means the broker clock moved back
+        offset = time_msc - int(now * 1000)
+        if self.clock_offset is None or offset > self.clock_offset or offset < self.clock_offset - 3_600_000:
+            self.clock_offset = offset
+        if time_msc > self.last_time_msc.get(symbol, 0):
+            self.last_time_msc[symbol] = time_msc
+
+        for timeframe in timeframes:
+            key = (symbol, timeframe)
+            bar = self.bars.get(key)
+            if bar is not None and time_msc >= bar.end_msc:
+                self._close(key, bar)
+                self.completed.append(bar)
+                bar = None
+            if bar is None:
+                if time_msc < self.closed_until.get(key, 0):
+                    continue  # Late tick for a bar that was already sent as closed
+                length = TIMEFRAMES[timeframe]
+                self.bars[key] = Bar(symbol, timeframe, time_msc - time_msc % length, bid)
+            elif time_msc >= bar.start_msc:
+                bar.add(bid)
+
+    def drain(self, now: Optional[float] = None) -> List[Bar]:
+        """Bars to send now: every bar closed since the last call, and bars in
+        progress that changed and were not sent within update_interval"""
+        now = time.time() if now is None else now
+        due = self.completed
+        self.completed = []
+        if now < self.next_scan:
+            return due
+        self.next_scan = now + self.scan_interval
+
+        broker_now = None if self.clock_offset is None else int(now * 1000) + self.clock_offset
+        for key, bar in list(self.bars.items()):
+            if broker_now is not None and broker_now >= bar.end_msc + self.close_delay_msc:
+                del self.bars[key]
+                self._close(key, bar)
+                due.append(bar)
+            elif bar.dirty and now - bar.sent_at >= self.update_interval:
+                bar.dirty = False
+                bar.sent_at = now
+                due.append(bar)
+        return due
+
+    def _close(self, key: Tuple[str, str], bar: Bar) -> None:
+        bar.closed = True
+        self.closed_until[key] = bar.end_msc
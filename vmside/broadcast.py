@@ -0,0 +1,99 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import websockets
+
+from wire_protocol import encode_price_frame
+
+logger = logging.getLogger(__name__)
+
+
+def encode_batch(messages: List[str]) -> str:
+    """Wrap already-encoded JSON events in one batch frame without re-encoding them"""
+    return '{"type": "batch", "events": [' + ", ".join(messages) + "]}"
+
+
+class Broadcaster:
+    """Fans each encoded event out to all of its subscribers
+
+    Events are encoded once by the caller. Clients whose outbound queue is
+    empty and whose socket is keeping up get the frame through
+    ``websockets.broadcast``, which frames it once and writes it to every
+    transport without awaiting. Everyone else gets it through their own
+    queue, where their overflow policy applies.
+    """
+
+    def __init__(self, client_queues: Dict, high_water: int = 64 * 1024):
+        """
+        Args:
+            client_queues: WebSocket to ClientConnection map owned by the server
+            high_water: Write buffer size above which a client is served from its queue
+        """
+        self.client_queues = client_queues
+        self.high_water = high_water
+
+    def send_reliable(self, connections: Iterable, message: str) -> None:
+        """Send a trade update or control message that must not be dropped"""
+        direct = []
+        for websocket in connections:
+            client = self.client_queues.get(websocket)
+            if client is None:
+                continue
+            if client.ready_for_broadcast(self.high_water):
+                direct.append(websocket)
+                client.sent += 1
+            else:
+                client.send_reliable(message)
+        if direct:
+            websockets.broadcast(direct, message)
+
+    def send_prices(self, events: List[Tuple[str, str, bytes]], clients_by_symbol: Dict[str, set]) -> None:
+        """Send one poll's (symbol, JSON message, binary record) events to every subscriber
+
+        Clients that asked for batching or for the binary protocol receive all
+        of their events from the poll in a single frame; clients with the same
+        set of events share it.
+        """
+        batched = defaultdict(list)  # WebSocket -> indices into events
+
+        for i, (symbol, message, _) in enumerate(events):
+            direct = []
+            for websocket in clients_by_symbol.get(symbol, ()):
+                client = self.client_queues.get(websocket)
+                if client is None:
+                    continue
+                if client.batch or client.binary:
+                    batched[websocket].append(i)
+                elif client.ready_for_broadcast(self.high_water):
+                    direct.append(websocket)
+                    client.sent += 1
+                else:
+                    client.send_price(symbol, message)
+            if direct:
+                websockets.broadcast(direct, message)
+
+        if not batched:
+            return
+
+        # Group idle batch clients by the events they get so each frame is built once
+        groups = defaultdict(list)
+        for websocket, indices in batched.items():
+            client = self.client_queues[websocket]
+            if client.ready_for_broadcast(self.high_water):
+                groups[(client.binary, tuple(indices))].append(websocket)
+                client.sent += 1
+            else:
+                # The client's writer merges whatever is pending into one frame
+                for i in indices:
+                    symbol, message, record = events[i]
+                    client.send_price(symbol, record if client.binary else message)
+
+        for (binary, indices), connections in groups.items():
+            if binary:
+                frame = encode_price_frame([events[i][2] for i in indices])
+            elif len(indices) == 1:
+                frame = events[indices[0]][1]
+            else:
+                frame = encode_batch([events[i][1] for i in indices])
+            websockets.broadcast(connections, frame)
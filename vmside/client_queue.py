@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict
+
+from websockets.exceptions import ConnectionClosed
+
+from broadcast import encode_batch
+from wire_protocol import BINARY_PROTOCOL, JSON_PROTOCOL, encode_price_frame
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("conflate", "drop_oldest", "disconnect")
+
+# Close code sent to clients that cannot keep up (RFC 6455 "Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """Outbound queues and writer task for one WebSocket client
+
+    Fan-out only enqueues, so a slow client never delays the others or the
+    next poll cycle. Price updates sit in a bounded queue governed by the
+    overflow policy:
+
+    * ``conflate``: keep only the latest pending price per symbol
+    * ``drop_oldest``: drop the oldest pending price when full
+    * ``disconnect``: close the connection when full
+
+    Trade updates and control messages use a separate queue that is never
+    dropped; a client that lets it fill up is disconnected instead. Clients
+    with ``batch`` set get all pending price updates in one batch frame;
+    binary-protocol clients always get pending price records in one frame.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        max_queue: int = 1000,
+        overflow_policy: str = "conflate",
+        max_reliable_queue: int = 10000,
+        send_latency=None,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.max_reliable_queue = max_reliable_queue
+
+        self._conflated: "OrderedDict[str, Any]" = OrderedDict()
+        self._prices = deque()
+        self._reliable = deque()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._sending = False
+        self.closed = False
+        self.batch = False
+        self.protocol = JSON_PROTOCOL
+
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.max_depth = 0
+        self.last_send_latency = 0.0
+        self.send_latency = send_latency  # Optional histogram child shared by all clients
+
+    @property
+    def price_depth(self) -> int:
+        return len(self._conflated) + len(self._prices)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.price_depth + len(self._reliable)
+
+    @property
+    def binary(self) -> bool:
+        """True if price updates are queued as binary records"""
+        return self.protocol == BINARY_PROTOCOL
+
+    def ready_for_broadcast(self, high_water: int) -> bool:
+        """True if a frame can be written straight to the socket without reordering"""
+        if self.closed or self._sending or self.queue_depth:
+            return False
+        transport = getattr(self.websocket, "transport", None)
+        return transport is not None and transport.get_write_buffer_size() < high_water
+
+    def start(self) -> None:
+        """Start the writer task"""
+        self._task = asyncio.create_task(self._writer())
+
+    def set_overflow_policy(self, overflow_policy: str) -> None:
+        """Switch policy; anything pending is kept in its original order"""
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        if overflow_policy == self.overflow_policy:
+            return
+        if self.overflow_policy == "conflate":
+            self._prices.extend(self._conflated.values())
+            self._conflated.clear()
+        elif overflow_policy == "conflate" and self._prices:
+            # Pending messages have no symbol key; let them drain first
+            if self.binary:
+                # Raw records only go out inside a price frame
+                self._reliable.append(encode_price_frame(list(self._prices)))
+            else:
+                self._reliable.extend(self._prices)
+            self._prices.clear()
+        self.overflow_policy = overflow_policy
+
+    def clear_prices(self) -> None:
+        """Discard pending price updates"""
+        self.dropped += self.price_depth
+        self._pop_prices()
+
+    def send_price(self, symbol: str, message: Any) -> None:
+        """Queue a price update, applying the overflow policy"""
+        if self.closed:
+            return
+
+        if self.overflow_policy == "conflate":
+            if symbol in self._conflated:
+                self._conflated[symbol] = message
+                self.conflated += 1
+                return
+            if len(self._conflated) >= self.max_queue:
+                self._conflated.popitem(last=False)
+                self.dropped += 1
+            self._conflated[symbol] = message
+        else:
+            if len(self._prices) >= self.max_queue:
+                if self.overflow_policy == "disconnect":
+                    self._disconnect("price queue full")
+                    return
+                self._prices.popleft()
+                self.dropped += 1
+            self._prices.append(message)
+
+        self._wake()
+
+    def send_reliable(self, message: Any) -> None:
+        """Queue a trade update or control message; these are never dropped"""
+        if self.closed:
+            return
+        if len(self._reliable) >= self.max_reliable_queue:
+            self._disconnect("trade queue full")
+            return
+        self._reliable.append(message)
+        self._wake()
+
+    async def close(self) -> None:
+        """Stop the writer task"""
+        self.closed = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters for this client"""
+        return {
+            "client": str(getattr(self.websocket, "remote_address", "")),
+            "policy": self.overflow_policy,
+            "queue_depth": self.queue_depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "last_send_ms": self.last_send_latency * 1000,
+        }
+
+    def _wake(self) -> None:
+        depth = self.queue_depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._wakeup.set()
+
+    def _next_message(self) -> Any:
+        if self._reliable:
+            return self._reliable.popleft()
+        if self.binary:
+            return encode_price_frame(self._pop_prices())
+        if self.batch and self.price_depth > 1:
+            return encode_batch(self._pop_prices())
+        if self._conflated:
+            return self._conflated.popitem(last=False)[1]
+        return self._prices.popleft()
+
+    def _pop_prices(self) -> list:
+        messages = list(self._conflated.values()) + list(self._prices)
+        self._conflated.clear()
+        self._prices.clear()
+        return messages
+
+    async def _writer(self) -> None:
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+
+                while self.queue_depth and not self.closed:
+                    message = self._next_message()
+                    start = time.perf_counter()
+                    self._sending = True
+                    try:
+                        await self.websocket.send(message)
+                    finally:
+                        self._sending = False
+                    self.last_send_latency = time.perf_counter() - start
+                    if self.send_latency is not None:
+                        self.send_latency.observe(self.last_send_latency)
+                    self.sent += 1
+        except ConnectionClosed:
+            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Client writer failed: {e}")
+        finally:
+            self.closed = True
+
+    def _disconnect(self, reason: str) -> None:
+        logger.warning(f"Disconnecting slow client {self.websocket.remote_address}: {reason}")
+        self.closed = True
+        self._wakeup.set()
+        asyncio.get_running_loop().create_task(
+            self.websocket.close(SLOW_CONSUMER_CLOSE_CODE, reason)
+        )
@@ -0,0 +1,132 @@
+"""Benchmark of Pub/Sub payload compression: CPU cost against bytes saved
+
+Builds messages shaped like the server's price and trade updates, as single
+records and as envelopes, and for each codec setting reports the encoded
+size, the compression ratio, the compress and decompress time per message
+and the bytes saved per CPU millisecond spent compressing.
+
+Example:
+    python compression_benchmark.py --records 20000 --envelope-sizes 1,10,100
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from envelope import encode_envelope
+from payload_codec import ZLIB, ZSTD, PayloadEncoder, decode_payload, zstandard
+
+SYMBOLS = {"EURUSD": (1.1, 5), "GBPUSD": (1.27, 5), "USDJPY": (150.0, 3), "XAUUSD": (2350.0, 2),
+           "AUDUSD": (0.66, 5), "USDCHF": (0.9, 5), "USDCAD": (1.36, 5), "NZDUSD": (0.61, 5)}
+
+
+def sample_records(count: int, trade_every: int = 50, seed: int = 1) -> List[str]:
+    """Encoded price updates from random-walk quotes, with a position update every trade_every records"""
+    rng = random.Random(seed)
+    prices = {symbol: base for symbol, (base, _) in SYMBOLS.items()}
+    now = datetime(2024, 1, 2, 9, 0, tzinfo=timezone.utc)
+    records = []
+    for n in range(count):
+        symbol = rng.choice(list(SYMBOLS))
+        digits = SYMBOLS[symbol][1]
+        point = 10 ** -digits
+        now += timedelta(milliseconds=rng.randint(1, 40))
+        if n % trade_every == trade_every - 1:
+            records.append(json.dumps({
+                "type": rng.choice(("buy", "sell")), "update_type": "position", "timestamp": now.replace(tzinfo=None).isoformat(),
+                "trade_id": 100000000 + rng.randint(1, 50), "symbol": symbol, "volume": 0.1,
+                "price": round(prices[symbol], digits), "profit": round(rng.uniform(-50, 50), 2), "sl": 0.0, "tp": 0.0,
+            }))
+            continue
+        prices[symbol] += rng.randint(-3, 3) * point
+        bid = round(prices[symbol], digits)
+        ask = round(bid + rng.randint(1, 20) * point, digits)
+        records.append(json.dumps({
+            "type": "price_update", "symbol": symbol, "bid": bid, "ask": ask, "spread": ask - bid,
+            "timestamp": now.isoformat(timespec="microseconds"),
+        }))
+    return records
+
+
+def payloads(records: List[str], envelope_size: int) -> List[bytes]:
+    """Message data as the publisher sends it: single records, or envelopes of envelope_size"""
+    if envelope_size <= 1:
+        return [record.encode("utf-8") for record in records]
+    return [encode_envelope(records[i:i + envelope_size]) for i in range(0, len(records), envelope_size)]
+
+
+def codec_settings() -> Dict[str, dict]:
+    settings = {
+        "zlib-1": dict(encoding=ZLIB, level=1, use_dictionary=False),
+        "zlib-1+dict": dict(encoding=ZLIB, level=1),
+        "zlib-6": dict(encoding=ZLIB, level=6, use_dictionary=False),
+        "zlib-6+dict": dict(encoding=ZLIB, level=6),
+        "zlib-9+dict": dict(encoding=ZLIB, level=9),
+    }
+    if zstandard is not None:
+        settings.update({
+            "zstd-3": dict(encoding=ZSTD, level=3, use_dictionary=False),
+            "zstd-3+dict": dict(encoding=ZSTD, level=3),
+            "zstd-9+dict": dict(encoding=ZSTD, level=9),
+        })
+    return settings
+
+
+def benchmark(messages: List[bytes], settings: dict) -> dict:
+    """Compress and decompress every message with one setting and time both"""
+    encoder = PayloadEncoder(min_size=0, **settings)
+    encoded = [encoder.encode(data) for data in messages]
+    start = time.perf_counter()
+    for data, attributes in encoded:
+        decode_payload(data, attributes)
+    decode_seconds = time.perf_counter() - start
+
+    stats = encoder.stats()
+    saved = stats["bytes_in"] - stats["bytes_out"]
+    return {
+        "bytes_per_message": stats["bytes_in"] / len(messages),
+        "encoded_bytes_per_message": stats["bytes_out"] / len(messages),
+        "ratio": stats["ratio"],
+        "compress_us": stats["seconds"] / len(messages) * 1e6,
+        "decompress_us": decode_seconds / len(messages) * 1e6,
+        "saved_bytes_per_cpu_ms": saved / (stats["seconds"] * 1000) if stats["seconds"] else 0.0,
+    }
+
+
+def print_report(report: Dict[str, Dict[str, dict]]) -> None:
+    for envelope_size, results in report.items():
+        first = next(iter(results.values()))
+        print(f"\nenvelopes of {envelope_size} records, {first['bytes_per_message']:.0f} bytes per message")
+        print(f"{'codec':<14}{'bytes':>9}{'ratio':>8}{'compress':>12}{'decompress':>12}{'saved/cpu-ms':>14}")
+        for name, result in results.items():
+            print(f"{name:<14}{result['encoded_bytes_per_message']:>9.0f}{result['ratio']:>7.1f}x"
+                  f"{result['compress_us']:>10.1f}us{result['decompress_us']:>10.1f}us"
+                  f"{result['saved_bytes_per_cpu_ms'] / 1024:>11.0f} KB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Pub/Sub payload compression")
+    parser.add_argument("--records", type=int, default=20000, help="Records to encode")
+    parser.add_argument("--envelope-sizes", default="1,10,100",
+                        help="Comma-separated records per message; 1 sends each record on its own")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    records = sample_records(args.records)
+    report = {}
+    for envelope_size in (int(size) for size in args.envelope_sizes.split(",")):
+        messages = payloads(records, envelope_size)
+        report[envelope_size] = {name: benchmark(messages, settings) for name, settings in codec_settings().items()}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        if zstandard is None:
+            print("zstandard is not installed; only zlib is measured")
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
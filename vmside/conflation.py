@@ -0,0 +1,147 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from quote_filter import QuoteFilter
+
+BUCKET = "bucket"
+MIN_MOVE = "min-move"
+LAST = "last"
+POLICIES = (BUCKET, MIN_MOVE, LAST)
+DEFAULT_SYMBOL = "*"
+MAX_POINT_DECIMALS = 8  # Finer than any MT5 symbol's digits; anything past it is float noise
+
+
+def parse_policies(spec: str) -> Dict[str, Tuple[str, float]]:
+    """Parse a conflation spec such as ``"XAUUSD=min-move:50,*=bucket:0.25"``
+
+    Each entry is ``SYMBOL=POLICY:VALUE``; ``*`` applies to symbols not
+    listed. VALUE is seconds for bucket and last, points for min-move.
+
+    Raises:
+        ValueError: If an entry is malformed or names an unknown policy
+    """
+    policies = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        symbol, _, rule = entry.partition("=")
+        policy, _, value = rule.partition(":")
+        if not symbol or policy not in POLICIES:
+            raise ValueError(f"Invalid conflation entry {entry!r}; expected SYMBOL=POLICY:VALUE with POLICY one of {', '.join(POLICIES)}")
+        try:
+            amount = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid conflation value in {entry!r}") from None
+        if amount <= 0:
+            raise ValueError(f"Conflation value in {entry!r} must be positive")
+        policies[symbol] = (policy, amount)
+    return policies
+
+
+def _point_from_price(price: float) -> float:
+    """Point size implied by a price's decimals; MT5 rounds prices to the symbol's digits
+
+    A price computed in floating point (1.1 + 0.2 is 1.3000000000000003) shows
+    spurious decimals, so it is rounded to MAX_POINT_DECIMALS first.
+    """
+    text = repr(round(price, MAX_POINT_DECIMALS))
+    if "e" in text or "." not in text:
+        return 1.0
+    return 10.0 ** -(len(text) - text.index(".") - 1)
+
+
+class Conflator:
+    """Per-symbol downsampling of price updates before they are published
+
+    Policies, chosen per symbol:
+
+    - ``bucket``: the first quote of every aligned window of VALUE seconds
+      passes straight away; the rest of the window is dropped.
+    - ``min-move``: a quote passes when its bid or ask moved by VALUE points
+      since the last quote that passed (see QuoteFilter). Point sizes are
+      inferred from the quotes' decimals.
+    - ``last``: the latest quote of every aligned window of VALUE seconds is
+      held and released by ``flush`` when the window closes.
+
+    Symbols without a policy pass unchanged.
+    """
+
+    def __init__(self, policies: Dict[str, Tuple[str, float]]):
+        """
+        Args:
+            policies: Symbol (or ``*``) to (policy, value), as from parse_policies
+        """
+        self.policies = policies
+        self.buckets: Dict[str, int] = {}  # Symbol to the bucket of its last quote that passed
+        self.filters: Dict[str, QuoteFilter] = {}
+        self.held: Dict[str, dict] = {}  # Symbol to the latest quote of its open "last" window
+        self.window_ends: Dict[str, float] = {}
+        self.received: Dict[str, int] = {}
+        self.sent: Dict[str, int] = {}
+
+    def policy(self, symbol: str) -> Optional[Tuple[str, float]]:
+        return self.policies.get(symbol, self.policies.get(DEFAULT_SYMBOL))
+
+    def add(self, message: dict, now: Optional[float] = None) -> Optional[dict]:
+        """Offer a price update; returns it if it is to be published now"""
+        symbol = message.get("symbol", "")
+        self.received[symbol] = self.received.get(symbol, 0) + 1
+        policy = self.policy(symbol)
+        now = time.monotonic() if now is None else now
+
+        if policy is None:
+            passed = True
+        elif policy[0] == BUCKET:
+            bucket = math.floor(now / policy[1])
+            passed = self.buckets.get(symbol) != bucket
+            if passed:
+                self.buckets[symbol] = bucket
+        elif policy[0] == MIN_MOVE:
+            passed = self._min_move(symbol, message, policy[1], now)
+        else:
+            if symbol not in self.held:
+                self.window_ends[symbol] = (math.floor(now / policy[1]) + 1) * policy[1]
+            self.held[symbol] = message
+            return None
+
+        if not passed:
+            return None
+        self.sent[symbol] = self.sent.get(symbol, 0) + 1
+        return message
+
+    def due(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next held quote is released (0 if overdue), or None if none is held"""
+        if not self.held:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self.window_ends.values()) - now)
+
+    def flush(self, now: Optional[float] = None, force: bool = False) -> List[dict]:
+        """Release the held quotes whose window has closed, or all of them with force"""
+        now = time.monotonic() if now is None else now
+        released = []
+        for symbol in [symbol for symbol, end in self.window_ends.items() if force or end <= now]:
+            del self.window_ends[symbol]
+            released.append(self.held.pop(symbol))
+            self.sent[symbol] = self.sent.get(symbol, 0) + 1
+        return released
+
+    def stats(self) -> Dict[str, int]:
+        """Price updates received and passed on, in total"""
+        return {"in": sum(self.received.values()), "out": sum(self.sent.values()), "held": len(self.held)}
+
+    def symbol_stats(self) -> Dict[str, Dict[str, int]]:
+        """Price updates received and passed on per symbol"""
+        return {
+            symbol: {"in": received, "out": self.sent.get(symbol, 0)}
+            for symbol, received in self.received.items()
+        }
+
+    def _min_move(self, symbol: str, message: dict, points: float, now: float) -> bool:
+        quotes = self.filters.get(symbol)
+        if quotes is None:
+            quotes = self.filters[symbol] = QuoteFilter(min_move_points=points)
+        bid, ask = message.get("bid", 0.0), message.get("ask", 0.0)
+        # Trailing zeros hide decimals, so keep the finest point seen
+        point = min(_point_from_price(bid), _point_from_price(ask), quotes.points.get(symbol, 1.0))
+        quotes.set_point(symbol, point)
+        return quotes.should_emit(symbol, bid, ask, now)
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import MetaTrader5 as mt5
+
+logger = logging.getLogger(__name__)
+
+CLOSING_ENTRIES = (mt5.DEAL_ENTRY_OUT, mt5.DEAL_ENTRY_OUT_BY)
+
+
+class DealHistoryCursor:
+    """Incremental reader of MT5 deal history from a persisted (time_msc, ticket) cursor
+
+    Each fetch only asks the terminal for deals since the cursor minus a small
+    overlap. Deals can show up in the history after newer ones were already
+    read, so instead of comparing against the cursor, the tickets seen within
+    the overlap window are remembered (and persisted with the cursor) and
+    every deal not among them is new. Each deal is returned once, also across
+    restarts, as long as it arrives within overlap_seconds. Must be called
+    from the thread that owns the MT5 session.
+    """
+
+    def __init__(
+        self,
+        state_file: Optional[str] = "deal_cursor.json",
+        overlap_seconds: int = 60,
+        initial_lookback_seconds: int = 24 * 3600,
+        index_size: int = 10000,
+    ):
+        """
+        Args:
+            state_file: Where the cursor is persisted (None keeps it in memory only)
+            overlap_seconds: How far before the cursor each query starts
+            initial_lookback_seconds: History scanned to place a brand-new cursor
+            index_size: Number of closing deals kept in the position_id index
+        """
+        self.state_file = state_file
+        self.overlap_seconds = overlap_seconds
+        self.initial_lookback_seconds = initial_lookback_seconds
+        self.index_size = index_size
+        self.cursor: Optional[Tuple[int, int]] = None
+        self.seen: Dict[int, int] = {}  # Ticket to time_msc of the deals within the overlap window
+        self._load()
+        self.closing_by_position: "OrderedDict[int, object]" = OrderedDict()
+
+    def fetch_new(self) -> List:
+        """Return deals newer than the cursor, oldest first, and advance the cursor"""
+        now = int(time.time())
+        # Deal times are in trade server time, so look a day ahead to cover any offset
+        date_to = now + 24 * 3600
+
+        if self.cursor is None:
+            self._bootstrap(now - self.initial_lookback_seconds, date_to)
+            return []
+
+        window_start = self.cursor[0] - self.overlap_seconds * 1000
+        deals = mt5.history_deals_get(window_start // 1000, date_to) or ()
+
+        new_deals = sorted(
+            (d for d in deals if d.time_msc >= window_start and d.ticket not in self.seen),
+            key=lambda d: (d.time_msc, d.ticket),
+        )
+        if not new_deals:
+            return []
+
+        for deal in new_deals:
+            self.seen[deal.ticket] = deal.time_msc
+            if deal.entry in CLOSING_ENTRIES:
+                self.closing_by_position[deal.position_id] = deal
+        while len(self.closing_by_position) > self.index_size:
+            self.closing_by_position.popitem(last=False)
+
+        last = new_deals[-1]
+        self.cursor = max(self.cursor, (last.time_msc, last.ticket))
+        self._prune_seen()
+        self._save()
+        return new_deals
+
+    @staticmethod
+    def closing_deals(deals: List) -> List:
+        """Deals that close (part of) a position"""
+        return [d for d in deals if d.entry in CLOSING_ENTRIES]
+
+    def closing_deal(self, position_id: int):
+        """Most recent closing deal seen for a position, if any"""
+        return self.closing_by_position.get(position_id)
+
+    def _bootstrap(self, date_from: int, date_to: int) -> None:
+        """Place a new cursor at the latest existing deal without replaying history"""
+        deals = mt5.history_deals_get(date_from, date_to) or ()
+        if deals:
+            last = max(deals, key=lambda d: (d.time_msc, d.ticket))
+            self.cursor = (last.time_msc, last.ticket)
+        else:
+            self.cursor = (date_from * 1000, 0)
+        self.seen = {d.ticket: d.time_msc for d in deals}
+        self._prune_seen()
+        self._save()
+        logger.info(f"Deal history cursor initialized at {self.cursor}")
+
+    def _prune_seen(self) -> None:
+        window_start = self.cursor[0] - self.overlap_seconds * 1000
+        self.seen = {ticket: time_msc for ticket, time_msc in self.seen.items() if time_msc >= window_start}
+
+    def _load(self) -> None:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            cursor = int(state["time_msc"]), int(state["ticket"])
+            seen = {int(ticket): int(time_msc) for ticket, time_msc in state.get("seen", [])}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Could not read deal cursor from {self.state_file}: {e}")
+            return
+        self.cursor, self.seen = cursor, seen
+
+    def _save(self) -> None:
+        if not self.state_file:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump({"time_msc": self.cursor[0], "ticket": self.cursor[1], "seen": list(self.seen.items())}, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.error(f"Could not persist deal cursor to {self.state_file}: {e}")
@@ -0,0 +1,69 @@
+import time
+from typing import List, Optional
+
+ENVELOPE_VERSION = 1
+
+
+def encode_envelope(records: List[str]) -> bytes:
+    """Wrap already-encoded JSON records in one envelope message without re-encoding them"""
+    return (
+        f'{{"type": "envelope", "version": {ENVELOPE_VERSION}, "records": [' + ", ".join(records) + "]}"
+    ).encode("utf-8")
+
+
+class EnvelopePacker:
+    """Packs records into envelopes of up to max_records records, max_bytes bytes or max_delay seconds
+
+    ``add`` returns a finished envelope when the record fills it; ``due``
+    tells when the oldest pending record has waited max_delay and the
+    envelope should be flushed even though it is not full.
+    """
+
+    def __init__(self, max_records: int = 100, max_delay: float = 0.1, max_bytes: int = 512 * 1024):
+        """
+        Args:
+            max_records: Records per envelope
+            max_delay: Seconds the first record of an envelope may wait for more
+            max_bytes: Approximate encoded size at which an envelope is closed
+        """
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+        self.records: List[str] = []
+        self.size = 0
+        self.opened_at = 0.0
+        self.envelopes = 0
+        self.packed = 0
+        self.last_count = 0  # Records in the envelope returned last
+
+    def add(self, record: str, now: Optional[float] = None) -> Optional[bytes]:
+        """Add an encoded record; returns the envelope it completed, if any"""
+        if not self.records:
+            self.opened_at = time.monotonic() if now is None else now
+        self.records.append(record)
+        self.size += len(record) + 2
+        if len(self.records) >= self.max_records or self.size >= self.max_bytes:
+            return self.flush()
+        return None
+
+    def due(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the pending envelope must be flushed (0 if overdue), or None if empty"""
+        if not self.records:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.opened_at + self.max_delay - now)
+
+    def flush(self) -> Optional[bytes]:
+        """The envelope of all pending records, or None if there are none"""
+        if not self.records:
+            return None
+        envelope = encode_envelope(self.records)
+        self.last_count = len(self.records)
+        self.envelopes += 1
+        self.packed += self.last_count
+        self.records = []
+        self.size = 0
+        return envelope
+
+    def __len__(self) -> int:
+        return len(self.records)
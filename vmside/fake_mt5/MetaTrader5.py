@@ -0,0 +1,464 @@
+"""Synthetic stand-in for the MetaTrader5 package, for benchmarks and tests on Linux
+
+Put this directory first on ``sys.path`` (or on PYTHONPATH) and ``import
+MetaTrader5`` picks it up instead of the real terminal bindings. It covers
+the calls the VM side makes, with the same named-tuple and structured-array
+shapes:
+
+- Ticks arrive at a fixed rate per symbol. Each price is a function of the
+  tick's index, so copy_ticks_from, symbol_info_tick and prices in other
+  processes all agree.
+- About ``positions`` positions are open at any time. New ones open at
+  ``trade_rate`` per second, each replacing the oldest, and every open and
+  close shows up as a deal in history_deals_get. Profit follows the price.
+- account_info adds up the open positions; order_send accepts every order
+  but does not change the synthetic book.
+
+The data depends only on the settings and the time since an epoch. The
+epoch is stored in FAKE_MT5_EPOCH_MSC on first import, so child processes
+(such as the price worker) see the same market.
+
+Settings come from environment variables, or from configure():
+
+    FAKE_MT5_SYMBOLS      symbol names, comma separated, or a count (default 10)
+    FAKE_MT5_TICK_RATE    ticks per second per symbol (default 10)
+    FAKE_MT5_POSITIONS    open positions at any time (default 20)
+    FAKE_MT5_TRADE_RATE   positions opened (and closed) per second (default 0.5)
+    FAKE_MT5_LATENCY      seconds each data call takes, to mimic the terminal (default 0)
+"""
+import math
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+__version__ = "5.0.45-fake"
+__author__ = "synthetic"
+
+# Constants, with the values of the real package
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_INOUT = 2
+DEAL_ENTRY_OUT_BY = 3
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+TICK_FLAG_BID = 2
+TICK_FLAG_ASK = 4
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_CLOSE_BY = 10
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+TRADE_RETCODE_DONE = 10009
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL = -10001
+
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+TradePosition = namedtuple(
+    "TradePosition",
+    "ticket time time_msc time_update time_update_msc type magic identifier reason volume "
+    "price_open sl tp price_current swap profit symbol comment external_id",
+)
+TradeDeal = namedtuple(
+    "TradeDeal",
+    "ticket order time time_msc type entry magic position_id reason volume price "
+    "commission swap profit fee symbol comment external_id",
+)
+AccountInfo = namedtuple(
+    "AccountInfo",
+    "login trade_mode leverage limit_orders margin_so_mode trade_allowed trade_expert margin_mode "
+    "currency_digits fifo_close balance credit profit equity margin margin_free margin_level "
+    "margin_so_call margin_so_so margin_initial margin_maintenance assets liabilities "
+    "commission_blocked name server currency company",
+)
+TerminalInfo = namedtuple(
+    "TerminalInfo",
+    "community_account community_connection connected dlls_allowed trade_allowed tradeapi_disabled "
+    "email_enabled ftp_enabled notifications_enabled mqid build maxbars codepage ping_last "
+    "community_balance retransmission company name language path data_path commondata_path",
+)
+# The symbol properties the VM side reads, out of the many the real SymbolInfo has
+SymbolInfo = namedtuple(
+    "SymbolInfo",
+    "name description path currency_base currency_profit digits point spread visible select "
+    "trade_contract_size volume_min volume_max volume_step bid ask time",
+)
+OrderSendResult = namedtuple(
+    "OrderSendResult", "retcode deal order volume price bid ask comment request_id retcode_external request"
+)
+
+# Same layout as the arrays the real copy_ticks_from returns
+TICK_DTYPE = np.dtype([
+    ("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"),
+    ("volume", "<u8"), ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8"),
+])
+
+CONTRACT_SIZE = 100000
+BALANCE = 10000.0
+TICKET_BASE = 10_000_000
+
+_settings = {}
+_symbols = []
+_symbol_index = {}
+_initialized = False
+_last_error = (RES_S_OK, "Success")
+
+
+def configure(**settings) -> None:
+    """Change the synthetic market; keys are the lower-cased FAKE_MT5_ names without the prefix
+
+    The values are also exported to the environment so processes started
+    afterwards see the same market.
+    """
+    for name, value in settings.items():
+        os.environ[f"FAKE_MT5_{name.upper()}"] = ",".join(value) if isinstance(value, (list, tuple)) else str(value)
+    _load_settings()
+
+
+def _load_settings() -> None:
+    global _symbols, _symbol_index
+    symbols = os.environ.get("FAKE_MT5_SYMBOLS", "10")
+    if symbols.strip().isdigit():
+        _symbols = [f"SYM{i:03d}" for i in range(int(symbols))]
+    else:
+        _symbols = [symbol.strip() for symbol in symbols.split(",") if symbol.strip()]
+    _symbol_index = {symbol: i for i, symbol in enumerate(_symbols)}
+    _settings.update(
+        tick_rate=float(os.environ.get("FAKE_MT5_TICK_RATE", 10)),
+        positions=int(os.environ.get("FAKE_MT5_POSITIONS", 20)),
+        trade_rate=float(os.environ.get("FAKE_MT5_TRADE_RATE", 0.5)),
+        latency=float(os.environ.get("FAKE_MT5_LATENCY", 0)),
+    )
+
+
+os.environ.setdefault("FAKE_MT5_EPOCH_MSC", str(int(time.time() * 1000)))
+EPOCH_MSC = int(os.environ["FAKE_MT5_EPOCH_MSC"])
+_load_settings()
+
+
+def _now_msc() -> int:
+    return int(time.time() * 1000)
+
+
+def _call() -> bool:
+    """Common prologue of the data calls: simulated latency and the initialized check"""
+    global _last_error
+    if _settings["latency"]:
+        time.sleep(_settings["latency"])
+    if not _initialized:
+        _last_error = (RES_E_INTERNAL_FAIL, "No IPC connection")
+        return False
+    _last_error = (RES_S_OK, "Success")
+    return True
+
+
+def _fail(code: int, message: str):
+    global _last_error
+    _last_error = (code, message)
+    return None
+
+
+def _seconds(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+# Prices
+
+def _base_price(index: int) -> float:
+    return round(0.8 + (index % 40) * 0.05, 5)
+
+
+def _tick_time(index: int, k):
+    """time_msc of tick k of a symbol; symbols are offset from each other within one tick period"""
+    rate = _settings["tick_rate"]
+    return EPOCH_MSC + np.floor((k + index / max(len(_symbols), 1)) * 1000.0 / rate).astype(np.int64)
+
+
+def _tick_index(index: int, time_msc: float) -> int:
+    """Index of the last tick of a symbol at or before time_msc"""
+    rate = _settings["tick_rate"]
+    k = math.floor((time_msc - EPOCH_MSC) * rate / 1000.0 - index / max(len(_symbols), 1))
+    # Undo float rounding at tick boundaries
+    while int(_tick_time(index, np.int64(k + 1))) <= time_msc:
+        k += 1
+    while int(_tick_time(index, np.int64(k))) > time_msc:
+        k -= 1
+    return k
+
+
+def _prices(index: int, k):
+    """Bid and ask of tick k (scalar or array): two slow waves and a fast one around the base price"""
+    base = _base_price(index)
+    bid = base * (1 + 0.002 * np.sin(k * 0.0131 + index) + 0.0006 * np.sin(k * 0.171 + 2 * index)
+                  + 0.0001 * np.sin(k * 1.37 + 3 * index))
+    bid = np.round(bid, 5)
+    return bid, np.round(bid + (8 + index % 12) * 1e-5, 5)
+
+
+def _ticks(index: int, k_from: int, k_to: int) -> np.ndarray:
+    """Ticks k_from..k_to (inclusive) of a symbol as a copy_ticks_from array"""
+    k = np.arange(k_from, k_to + 1, dtype=np.int64)
+    ticks = np.zeros(len(k), dtype=TICK_DTYPE)
+    ticks["time_msc"] = _tick_time(index, k)
+    ticks["time"] = ticks["time_msc"] // 1000
+    ticks["bid"], ticks["ask"] = _prices(index, k)
+    ticks["flags"] = TICK_FLAG_BID | TICK_FLAG_ASK
+    return ticks
+
+
+def _quote(index: int, time_msc: int):
+    k = _tick_index(index, time_msc)
+    bid, ask = _prices(index, k)
+    return float(bid), float(ask)
+
+
+# Positions and deals
+
+def _position_range(time_msc: int):
+    """Sequence numbers of the positions open at time_msc"""
+    count, rate = _settings["positions"], _settings["trade_rate"]
+    if count <= 0:
+        return range(0)
+    if rate <= 0:
+        return range(count)
+    newest = math.floor((time_msc - EPOCH_MSC) * rate / 1000.0)
+    return range(max(newest - count + 1, -count), newest + 1)
+
+
+def _open_time(n: int) -> int:
+    rate = _settings["trade_rate"]
+    if rate <= 0:
+        return EPOCH_MSC - 1000
+    return EPOCH_MSC + math.floor(n * 1000.0 / rate)
+
+
+def _close_time(n: int) -> Optional[int]:
+    rate = _settings["trade_rate"]
+    if rate <= 0:
+        return None
+    return _open_time(n + _settings["positions"])
+
+
+def _position_fields(n: int):
+    """Symbol index, type, volume and open price of position n"""
+    index = n % len(_symbols)
+    position_type = n % 2
+    volume = round(0.01 * (1 + n % 10), 2)
+    bid, ask = _quote(index, _open_time(n))
+    return index, position_type, volume, ask if position_type == ORDER_TYPE_BUY else bid
+
+
+def _profit(position_type: int, volume: float, price_open: float, price_close: float) -> float:
+    direction = 1 if position_type == ORDER_TYPE_BUY else -1
+    return round(direction * (price_close - price_open) * volume * CONTRACT_SIZE, 2)
+
+
+def _position(n: int, now_msc: int) -> TradePosition:
+    index, position_type, volume, price_open = _position_fields(n)
+    bid, ask = _quote(index, now_msc)
+    # A buy is closed at the bid and a sell at the ask
+    price_current = bid if position_type == ORDER_TYPE_BUY else ask
+    open_msc = _open_time(n)
+    ticket = TICKET_BASE + n
+    return TradePosition(
+        ticket, open_msc // 1000, open_msc, open_msc // 1000, open_msc, position_type, 0, ticket, 0, volume,
+        price_open, 0.0, 0.0, price_current, 0.0, _profit(position_type, volume, price_open, price_current),
+        _symbols[index], "", "",
+    )
+
+
+def _deals(n: int):
+    """Opening deal of position n and, once it is closed, its closing deal"""
+    index, position_type, volume, price_open = _position_fields(n)
+    ticket = TICKET_BASE + n
+    open_msc = _open_time(n)
+    deals = [TradeDeal(
+        2 * ticket, 2 * ticket, open_msc // 1000, open_msc, position_type, DEAL_ENTRY_IN, 0, ticket, 0,
+        volume, price_open, 0.0, 0.0, 0.0, 0.0, _symbols[index], "", "",
+    )]
+    close_msc = _close_time(n)
+    if close_msc is not None:
+        bid, ask = _quote(index, close_msc)
+        price = bid if position_type == ORDER_TYPE_BUY else ask
+        deals.append(TradeDeal(
+            2 * ticket + 1, 2 * ticket + 1, close_msc // 1000, close_msc, 1 - position_type, DEAL_ENTRY_OUT, 0,
+            ticket, 0, volume, price, 0.0, 0.0, _profit(position_type, volume, price_open, price), 0.0,
+            _symbols[index], "", "",
+        ))
+    return deals
+
+
+# Terminal and account
+
+def initialize(path: Optional[str] = None, **kwargs) -> bool:
+    global _initialized, _last_error
+    _initialized = True
+    _last_error = (RES_S_OK, "Success")
+    return True
+
+
+def login(login: int, password: Optional[str] = None, server: Optional[str] = None, timeout: int = 60000) -> bool:
+    return _call()
+
+
+def shutdown() -> None:
+    global _initialized
+    _initialized = False
+
+
+def last_error():
+    return _last_error
+
+
+def version():
+    return (500, 4000, "01 Jan 2024")
+
+
+def terminal_info() -> Optional[TerminalInfo]:
+    if not _call():
+        return None
+    return TerminalInfo(
+        False, False, True, False, True, False, False, False, False, False, 4000, 100000, 0, 0, 0.0, 0.0,
+        "Synthetic", "MetaTrader 5 (fake)", "English", "/fake", "/fake", "/fake",
+    )
+
+
+def account_info() -> Optional[AccountInfo]:
+    if not _call():
+        return None
+    now_msc = _now_msc()
+    positions = [_position(n, now_msc) for n in _position_range(now_msc)]
+    profit = round(sum(position.profit for position in positions), 2)
+    margin = round(sum(position.volume for position in positions) * CONTRACT_SIZE / 100, 2)
+    equity = round(BALANCE + profit, 2)
+    return AccountInfo(
+        1, 0, 100, 0, 0, True, True, 2, 2, False, BALANCE, 0.0, profit, equity, margin,
+        round(equity - margin, 2), round(equity / margin * 100, 2) if margin else 0.0,
+        50.0, 30.0, 0.0, 0.0, 0.0, 0.0, 0.0, "Synthetic account", "Fake-Server", "USD", "Synthetic",
+    )
+
+
+# Symbols and ticks
+
+def symbols_total() -> int:
+    return len(_symbols)
+
+
+def symbols_get(group: Optional[str] = None):
+    return tuple(symbol_info(symbol) for symbol in _symbols)
+
+
+def symbol_select(symbol: str, enable: bool = True) -> bool:
+    return symbol in _symbol_index
+
+
+def symbol_info(symbol: str) -> Optional[SymbolInfo]:
+    if not _call():
+        return None
+    index = _symbol_index.get(symbol)
+    if index is None:
+        return _fail(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+    now_msc = _now_msc()
+    bid, ask = _quote(index, now_msc)
+    return SymbolInfo(
+        symbol, f"Synthetic symbol {symbol}", f"Fake\\{symbol}", symbol[:3], symbol[3:6] or "USD", 5, 1e-5,
+        round((ask - bid) / 1e-5), True, True, CONTRACT_SIZE, 0.01, 100.0, 0.01, bid, ask, now_msc // 1000,
+    )
+
+
+def symbol_info_tick(symbol: str) -> Optional[Tick]:
+    if not _call():
+        return None
+    index = _symbol_index.get(symbol)
+    if index is None:
+        return _fail(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+    tick = _ticks(index, *(2 * [_tick_index(index, _now_msc())]))[0]
+    return Tick(int(tick["time"]), float(tick["bid"]), float(tick["ask"]), 0.0, 0, int(tick["time_msc"]),
+                int(tick["flags"]), 0.0)
+
+
+def copy_ticks_from(symbol: str, date_from, count: int, flags: int) -> Optional[np.ndarray]:
+    """Up to ``count`` ticks from ``date_from`` (datetime or seconds) up to now"""
+    if not _call():
+        return None
+    index = _symbol_index.get(symbol)
+    if index is None:
+        return _fail(RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+    k_from = _tick_index(index, _seconds(date_from) * 1000 - 1) + 1
+    k_to = min(_tick_index(index, _now_msc()), k_from + count - 1)
+    return _ticks(index, k_from, k_to)
+
+
+# Trading
+
+def positions_total() -> int:
+    if not _call():
+        return 0
+    return len(_position_range(_now_msc()))
+
+
+def positions_get(symbol: Optional[str] = None, group: Optional[str] = None, ticket: Optional[int] = None):
+    if not _call():
+        return None
+    now_msc = _now_msc()
+    positions = (_position(n, now_msc) for n in _position_range(now_msc))
+    return tuple(
+        position for position in positions
+        if (symbol is None or position.symbol == symbol) and (ticket is None or position.ticket == ticket)
+    )
+
+
+def history_deals_get(date_from=None, date_to=None, group: Optional[str] = None,
+                      ticket: Optional[int] = None, position: Optional[int] = None):
+    """Deals between two times (datetime or seconds), or of one deal ticket or position"""
+    if not _call():
+        return None
+    now_msc = _now_msc()
+    count = _settings["positions"]
+    if position is not None or ticket is not None:
+        n = (position if position is not None else ticket // 2) - TICKET_BASE
+        deals = [deal for deal in _deals(n) if deal.time_msc <= now_msc] if n >= -count else []
+        return tuple(deal for deal in deals if ticket is None or deal.ticket == ticket)
+    if date_from is None or date_to is None:
+        return _fail(RES_E_INVALID_PARAMS, "Invalid arguments")
+
+    from_msc = _seconds(date_from) * 1000
+    to_msc = min(_seconds(date_to) * 1000, now_msc)
+    # Positions with an open or close deal in range; history begins with the positions open at the epoch
+    first = max(_position_range(int(from_msc)).start, -count) if _settings["trade_rate"] > 0 else 0
+    last = _position_range(int(to_msc)).stop
+    deals = [deal for n in range(first, last) for deal in _deals(n) if from_msc <= deal.time_msc <= to_msc]
+    deals.sort(key=lambda deal: (deal.time_msc, deal.ticket))
+    return tuple(deals)
+
+
+def history_orders_get(date_from=None, date_to=None, **kwargs):
+    if not _call():
+        return None
+    return ()
+
+
+def order_send(request: dict) -> Optional[OrderSendResult]:
+    """Accept any order; the synthetic book is not changed by it"""
+    if not _call():
+        return None
+    index = _symbol_index.get(request.get("symbol"))
+    bid, ask = _quote(index, _now_msc()) if index is not None else (0.0, 0.0)
+    return OrderSendResult(
+        TRADE_RETCODE_DONE, 0, 0, request.get("volume", 0.0), request.get("price", 0.0), bid, ask,
+        "Request executed", 0, 0, request,
+    )
@@ -0,0 +1,452 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue
+import signal
+import socket
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+
+from metrics import ServerMetrics
+from mt5_base import SymbolPrice
+from server import MT5WebSocketServer
+from shm_ring import RingReader, SharedRing
+from wire_protocol import FRAME_HEADER, PRICE_RECORD, SymbolTable, encode_price_frame
+
+logger = logging.getLogger(__name__)
+
+# Ring entry kinds; the first byte of every entry
+EVENT_PRICES = 1    # kind | price frame (wire_protocol layout)
+EVENT_SYMBOL = 2    # kind | symbol id u16 | symbol name
+EVENT_TRADE = 3     # kind | transaction floor i64 | message length u32 | message | delta message
+EVENT_POSITION_CLOSED = 4  # kind | ticket i64
+EVENT_ACCOUNT = 5   # kind | account summary JSON
+EVENT_POSITION = 6  # kind | ticket i64 | encoded position update, replayed for late workers
+EVENT_POSITIONS_RESET = 7  # kind; the EVENT_POSITION entries that follow are every open position
+
+SYMBOL_EVENT = struct.Struct("<BH")
+TRADE_EVENT = struct.Struct("<BqI")
+POSITION_CLOSED_EVENT = struct.Struct("<Bq")
+POSITION_EVENT = struct.Struct("<Bq")
+
+
+class RingBroadcaster:
+    """Capture-side stand-in for Broadcaster that writes price records to the ring"""
+
+    def __init__(self, ring: SharedRing):
+        self.ring = ring
+        # Price records that fit in one ring entry
+        self.records_per_entry = (ring.max_payload - 1 - FRAME_HEADER.size) // PRICE_RECORD.size
+
+    def send_prices(self, events: List, clients_by_symbol: Dict[str, set]) -> None:
+        records = [record for _, _, record in events]
+        for start in range(0, len(records), self.records_per_entry):
+            frame = encode_price_frame(records[start:start + self.records_per_entry])
+            self.ring.write(bytes([EVENT_PRICES]) + frame)
+
+
+class CaptureServer(MT5WebSocketServer):
+    """Owns the MT5 session and publishes prices and trade updates to a shared ring
+
+    Runs the usual polling loops but serves no clients itself. Subscriptions
+    arrive from the fan-out workers over a control queue, keyed by worker id,
+    so symbols are only polled while some worker has a subscriber for them.
+    """
+
+    def __init__(self, ring: SharedRing, control_queue, **kwargs):
+        super().__init__(**kwargs)
+        self.ring = ring
+        self.control_queue = control_queue
+        self.control_task = None
+        self.broadcaster = RingBroadcaster(ring)
+
+    def _price_event(self, symbol: str, bid: float, ask: float, time_msc: int, timestamp: str) -> Tuple[str, None, bytes]:
+        # Workers build the JSON form, so only the binary record is encoded here
+        return symbol, None, self._price_record(symbol, bid, ask, time_msc)
+
+    def _fan_out_trade(self, message: str, delta_message: str = None):
+        floor = self.trade_journal.transaction_floor
+        encoded = message.encode()
+        self.ring.write(
+            TRADE_EVENT.pack(EVENT_TRADE, -1 if floor is None else floor, len(encoded))
+            + encoded
+            + (delta_message.encode() if delta_message else b"")
+        )
+
+    def _position_closed(self, ticket: int):
+        super()._position_closed(ticket)
+        self.ring.write(POSITION_CLOSED_EVENT.pack(EVENT_POSITION_CLOSED, ticket))
+
+    def _set_account(self, account: dict):
+        if account != self.account_info:
+            self.ring.write(bytes([EVENT_ACCOUNT]) + json.dumps(account).encode())
+        super()._set_account(account)
+
+    def handle_control(self, message: tuple) -> None:
+        """Apply a subscription change reported by a worker"""
+        action, worker_id, *args = message
+        if action == "subscribe":
+            self.subscriptions.subscribe(worker_id, args[0])
+            # (Re)announce ids; a worker that attached late may have missed them
+            for symbol in args[0]:
+                self.ring.write(SYMBOL_EVENT.pack(EVENT_SYMBOL, self.symbol_table.id_for(symbol)) + symbol.encode())
+        elif action == "unsubscribe":
+            self.subscriptions.unsubscribe(worker_id, args[0])
+        elif action == "update_interval":
+            symbol, interval = args
+            if self.poll_scheduler.request(symbol, worker_id, interval):
+                self._requested_interval_changed(symbol)
+        elif action == "trades":
+            if args[0]:
+                self.trade_subscribers.add(worker_id)
+            else:
+                self.trade_subscribers.discard(worker_id)
+        elif action == "worker_exit":
+            self.subscriptions.remove_client(worker_id)
+            self.trade_subscribers.discard(worker_id)
+            self.poll_scheduler.release(worker_id)
+        elif action == "sync":
+            self.publish_state()
+        else:
+            logger.warning(f"Unknown control message: {action}")
+
+    def publish_state(self) -> None:
+        """Write symbol ids, open positions and the account summary for a worker that missed entries"""
+        for symbol, symbol_id in list(self.symbol_table.ids.items()):
+            self.ring.write(SYMBOL_EVENT.pack(EVENT_SYMBOL, symbol_id) + symbol.encode())
+        # Positions closed in the entries a worker missed must not outlive the sync
+        self.ring.write(bytes([EVENT_POSITIONS_RESET]))
+        for ticket, message in list(self.position_messages.items()):
+            self.ring.write(POSITION_EVENT.pack(EVENT_POSITION, ticket) + message.encode())
+        if self.account_info is not None:
+            self.ring.write(bytes([EVENT_ACCOUNT]) + json.dumps(self.account_info).encode())
+
+    async def read_control(self):
+        """Apply control messages from the workers as they arrive"""
+        loop = asyncio.get_running_loop()
+        while self.running:
+            message = await loop.run_in_executor(None, self._next_control)
+            if message is not None:
+                self.handle_control(message)
+
+    def _next_control(self) -> Optional[tuple]:
+        try:
+            return self.control_queue.get(timeout=0.5)
+        except queue.Empty:
+            return None
+
+    async def start_server(self):
+        """Run the MT5 polling loops without serving clients"""
+        self.running = True
+        self.loop_monitor_task = asyncio.create_task(self.loop_monitor.run())
+        self.control_task = asyncio.create_task(self.read_control())
+        if self.capture_mode == "ticks":
+            self.price_update_task = asyncio.create_task(self.capture_ticks())
+        else:
+            self.price_update_task = asyncio.create_task(self.update_prices())
+        self.trade_update_task = asyncio.create_task(self.update_trades())
+        self.client_stats_task = asyncio.create_task(self.log_stats())
+        if self.http_endpoints:
+            self.account_task = asyncio.create_task(self.update_account())
+        logger.info(f"MT5 capture process started, writing to ring {self.ring.name}")
+        await asyncio.Future()  # Run forever
+
+    def stop_server(self):
+        if self.control_task:
+            self.control_task.cancel()
+        super().stop_server()
+
+
+class FanoutWorker(MT5WebSocketServer):
+    """Serves WebSocket clients from the shared ring without touching MT5
+
+    Prices are JSON-encoded here, once per event per worker, so encoding and
+    sending scale with the number of workers. Trade updates arrive already
+    journaled and encoded; the worker mirrors the journal to serve
+    reconnecting clients.
+    """
+
+    def __init__(self, worker_id: int, ring: SharedRing, control_queue, journal_epoch: int,
+                 reuse_port: bool = False, poll_interval: float = 0.002, **kwargs):
+        super().__init__(**kwargs)
+        self.worker_id = worker_id
+        self.ring = ring
+        self.control_queue = control_queue
+        self.reuse_port = reuse_port
+        self.poll_interval = poll_interval
+        self.ring_task = None
+        self.trade_journal.epoch = journal_epoch
+        self.symbol_table = SymbolTable(assign=False)
+        self.symbol_names: Dict[int, str] = {}
+        self.wants_trades = False
+        self.journal_complete = True  # No ring entries lost since start
+        # MT5 call timings stay in the capture process; scrapes see this worker's stages and clients
+        self.metrics = ServerMetrics(self, {"worker": str(worker_id)})
+
+    def _create_mt5_client(self):
+        return None, None
+
+    def _activate_symbol(self, symbol: str) -> None:
+        self.control_queue.put(("subscribe", self.worker_id, [symbol]))
+
+    def _deactivate_symbol(self, symbol: str) -> None:
+        if self.last_quotes.pop(symbol, None) is not None:
+            self.quotes_version += 1
+        self.control_queue.put(("unsubscribe", self.worker_id, [symbol]))
+
+    def _requested_interval_changed(self, symbol: str) -> None:
+        # The capture process polls; pass on the fastest interval this worker's clients want
+        self.control_queue.put(("update_interval", self.worker_id, symbol, self.poll_scheduler.requested.get(symbol)))
+
+    def _report_trade_interest(self) -> None:
+        wants_trades = bool(self.trade_subscribers)
+        if wants_trades != self.wants_trades:
+            self.wants_trades = wants_trades
+            self.control_queue.put(("trades", self.worker_id, wants_trades))
+
+    async def handle_subscription(self, websocket, message):
+        await super().handle_subscription(websocket, message)
+        self._report_trade_interest()
+
+    async def unregister_client(self, websocket):
+        await super().unregister_client(websocket)
+        self._report_trade_interest()
+
+    async def _refresh_positions(self) -> bool:
+        # Positions come from the capture process, which diffs them while this
+        # worker reports trade interest or the HTTP endpoints are on
+        return self.wants_trades or self.http_endpoints is not None
+
+    async def _missed_transactions_from_history(self, last_transaction_id) -> List[str]:
+        logger.warning(f"transaction_id {last_transaction_id} predates this worker's journal; MT5 history is not available in fan-out workers")
+        return []
+
+    async def read_ring(self):
+        """Fan ring entries out to this worker's clients as they are published"""
+        reader = RingReader(self.ring)
+        if reader.cursor > 1:
+            # Symbol ids and positions announced in the overwritten entries would be
+            # missing, so ask the capture process to publish its current state
+            logger.warning(f"Worker {self.worker_id} started after {reader.cursor - 1} ring entries were "
+                           f"overwritten, requesting the current state")
+            self.journal_complete = False
+            self.control_queue.put(("sync", self.worker_id))
+        while self.running:
+            entries, lost = reader.read()
+            if lost:
+                logger.warning(f"Worker {self.worker_id} fell behind the ring, {lost} events lost, "
+                               f"requesting the current state")
+                self.journal_complete = False
+                self.control_queue.put(("sync", self.worker_id))
+            if not entries:
+                # Bars in progress and bars past their end still go out between ticks
+                self._send_bars()
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            events = []
+            encode_start = time.perf_counter()
+            for entry in entries:
+                kind = entry[0]
+                if kind == EVENT_PRICES:
+                    events.extend(self._price_events(entry))
+                    continue
+
+                # Keep prices and trade updates in ring order
+                if events:
+                    self._fan_out_prices(events, encode_start)
+                    events = []
+                try:
+                    self._apply_entry(kind, entry)
+                except Exception as e:
+                    logger.error(f"Error applying ring entry of kind {kind}: {e}")
+                encode_start = time.perf_counter()
+
+            if events:
+                self._fan_out_prices(events, encode_start)
+            self._send_bars()
+            # Let client writers run between batches
+            await asyncio.sleep(0)
+
+    def _price_events(self, entry: bytes) -> List:
+        events = []
+        offset = 1 + FRAME_HEADER.size
+        for symbol_id, bid, ask, time_msc in PRICE_RECORD.iter_unpack(entry[offset:]):
+            symbol = self.symbol_names.get(symbol_id)
+            if symbol is not None:
+                self._cache_quote(symbol, SymbolPrice(bid, ask, time_msc))
+                # Bars are built per worker from the prices the capture process sent
+                if self.bar_aggregator.watches(symbol):
+                    self.bar_aggregator.update(symbol, bid, time_msc)
+                if symbol in self.subscriptions:
+                    record = entry[offset:offset + PRICE_RECORD.size]
+                    events.append((symbol, self._price_message(symbol, bid, ask, self._tick_timestamp(time_msc)), record))
+            offset += PRICE_RECORD.size
+        return events
+
+    def _apply_entry(self, kind: int, entry: bytes) -> None:
+        if kind == EVENT_SYMBOL:
+            _, symbol_id = SYMBOL_EVENT.unpack_from(entry)
+            symbol = entry[SYMBOL_EVENT.size:].decode()
+            if self.symbol_names.get(symbol_id) == symbol:
+                return
+            self.symbol_names[symbol_id] = symbol
+            self.symbol_table.learn(symbol, symbol_id)
+            # Binary clients that subscribed before the id was known
+            for websocket in self.subscriptions.subscribers(symbol):
+                client = self.client_queues.get(websocket)
+                if client and client.binary:
+                    self._send(websocket, json.dumps(self.symbol_table.message([symbol])))
+
+        elif kind == EVENT_TRADE:
+            _, floor, length = TRADE_EVENT.unpack_from(entry)
+            start = TRADE_EVENT.size
+            message = entry[start:start + length].decode()
+            delta_message = entry[start + length:].decode() or None
+            update = json.loads(message)
+
+            if not self.trade_journal.record(update, message):
+                self.journal_complete = False
+            if self.journal_complete and floor >= 0:
+                self.trade_journal.transaction_floor = max(self.trade_journal.transaction_floor or 0, floor)
+            if update.get("update_type") == "position":
+                self._store_position(update["trade_id"], message)
+            self._fan_out_trade(message, delta_message)
+
+        elif kind == EVENT_POSITION_CLOSED:
+            _, ticket = POSITION_CLOSED_EVENT.unpack_from(entry)
+            self._position_closed(ticket)
+
+        elif kind == EVENT_POSITIONS_RESET:
+            self.last_positions.clear()
+            self.position_messages.clear()
+            self.positions_version += 1
+
+        elif kind == EVENT_POSITION:
+            _, ticket = POSITION_EVENT.unpack_from(entry)
+            self._store_position(ticket, entry[POSITION_EVENT.size:].decode())
+
+        elif kind == EVENT_ACCOUNT:
+            self._set_account(json.loads(entry[1:]))
+
+        else:
+            logger.warning(f"Unknown ring entry kind {kind}")
+
+    async def start_server(self):
+        """Serve clients on the shared port (or this worker's own port)"""
+        self.running = True
+        self.loop_monitor_task = asyncio.create_task(self.loop_monitor.run())
+        self.ring_task = asyncio.create_task(self.read_ring())
+        self.client_stats_task = asyncio.create_task(self.log_stats())
+
+        async with websockets.serve(self.handle_client, self.host, self.port,
+                                    process_request=self.process_http_request, reuse_port=self.reuse_port):
+            logger.info(f"Fan-out worker {self.worker_id} serving on {self.host}:{self.port}")
+            await asyncio.Future()  # Run forever
+
+    def stop_server(self):
+        if self.ring_task:
+            self.ring_task.cancel()
+        super().stop_server()
+
+
+def _interrupt(signum, frame) -> None:
+    # run_fanout terminates children with SIGTERM; shut down as on Ctrl+C
+    raise KeyboardInterrupt
+
+
+def _capture_main(ring_name: str, control_queue, journal_epoch: int, server_kwargs: dict) -> None:
+    signal.signal(signal.SIGTERM, _interrupt)
+    ring = SharedRing.attach(ring_name)
+    server = CaptureServer(ring, control_queue, **server_kwargs)
+    server.trade_journal.epoch = journal_epoch
+    try:
+        asyncio.run(server.start_server())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Ctrl+C reaches the children and is followed by run_fanout's SIGTERM
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        server.stop_server()
+        ring.close()
+
+
+def _worker_main(worker_id: int, ring_name: str, control_queue, journal_epoch: int,
+                 port: int, reuse_port: bool, server_kwargs: dict) -> None:
+    signal.signal(signal.SIGTERM, _interrupt)
+    ring = SharedRing.attach(ring_name)
+    server = FanoutWorker(worker_id, ring, control_queue, journal_epoch,
+                          reuse_port=reuse_port, **dict(server_kwargs, port=port))
+    try:
+        asyncio.run(server.start_server())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Ctrl+C reaches the children and is followed by run_fanout's SIGTERM
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        server.stop_server()
+        ring.close()
+
+
+def run_fanout(workers: int, ring_slots: int = 16384, ring_slot_size: int = 1024, **server_kwargs) -> None:
+    """Run one MT5 capture process and ``workers`` fan-out processes until interrupted
+
+    Workers share the server port through SO_REUSEPORT where the platform has
+    it. Elsewhere (notably Windows) worker ``i`` listens on ``port + i``.
+    Workers that die are restarted; if the capture process dies, everything
+    is shut down.
+    """
+    ring = SharedRing.create(capacity=ring_slots, slot_size=ring_slot_size)
+    control_queue = multiprocessing.Queue()
+    journal_epoch = int(time.time() * 1000)
+    reuse_port = hasattr(socket, "SO_REUSEPORT")
+    base_port = server_kwargs.get("port", 8765)
+    if not reuse_port:
+        logger.warning(f"SO_REUSEPORT is not available; workers listen on ports {base_port}-{base_port + workers - 1}")
+
+    def start_worker(worker_id: int) -> multiprocessing.Process:
+        port = base_port if reuse_port else base_port + worker_id
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(worker_id, ring.name, control_queue, journal_epoch, port, reuse_port, server_kwargs),
+            name=f"mt5-fanout-{worker_id}",
+        )
+        process.start()
+        return process
+
+    capture = multiprocessing.Process(
+        target=_capture_main,
+        args=(ring.name, control_queue, journal_epoch, server_kwargs),
+        name="mt5-capture",
+    )
+    capture.start()
+    processes = {worker_id: start_worker(worker_id) for worker_id in range(workers)}
+    logger.info(f"Started MT5 capture process and {workers} fan-out workers")
+
+    try:
+        while capture.is_alive():
+            time.sleep(1)
+            for worker_id, process in list(processes.items()):
+                if not process.is_alive():
+                    logger.error(f"Fan-out worker {worker_id} exited with code {process.exitcode}, restarting")
+                    control_queue.put(("worker_exit", worker_id))
+                    processes[worker_id] = start_worker(worker_id)
+        logger.error(f"MT5 capture process exited with code {capture.exitcode}, stopping workers")
+    except KeyboardInterrupt:
+        logger.info("Stopping fan-out server")
+    finally:
+        children = [capture, *processes.values()]
+        for process in children:
+            if process.is_alive():
+                process.terminate()
+        for process in children:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+        ring.close()
@@ -0,0 +1,135 @@
+"""Read-only HTTP GET endpoints served from the WebSocket server's memory
+
+The endpoints share the WebSocket server's port: websockets hands every
+request to ``process_request`` before the handshake, and plain GETs to one
+of the paths below are answered there instead of being upgraded.
+
+    /prices       latest quote per polled symbol (``?symbols=EURUSD,GBPUSD`` to filter)
+    /positions    open positions, as their latest trade_update messages
+    /net_volume   net open volume per symbol (buy minus sell)
+    /account      account balance, equity and margin
+
+No request touches MT5. Every response carries an ETag derived from a
+version counter of the state it shows, so a request with a matching
+If-None-Match costs a dictionary lookup and gets 304 Not Modified. Tags
+include a token unique to the process, since fan-out workers sharing a
+port count versions independently.
+"""
+import json
+import logging
+import secrets
+from collections import defaultdict
+from http import HTTPStatus
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from websockets.datastructures import Headers
+from websockets.http11 import Request, Response
+
+logger = logging.getLogger(__name__)
+
+
+def http_response(status: int, body: bytes, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """A complete HTTP response for a websockets process_request hook"""
+    status = HTTPStatus(status)
+    response_headers = Headers()
+    response_headers["Content-Type"] = content_type
+    response_headers["Content-Length"] = str(len(body))
+    for name, value in (headers or {}).items():
+        response_headers[name] = value
+    return Response(status.value, status.phrase, response_headers, body)
+
+
+class SnapshotEndpoints:
+    """Renders and caches the HTTP snapshot endpoints of an MT5WebSocketServer"""
+
+    def __init__(self, server, max_age: float = 1.0):
+        """
+        Args:
+            server: MT5WebSocketServer whose cached state is served
+            max_age: Seconds clients may reuse a response without revalidating
+        """
+        self.server = server
+        self.cache_control = f"max-age={max_age:g}"
+        self.instance = secrets.token_hex(4)
+        # Path to (version of the state it shows, renderer)
+        self.routes: Dict[str, Tuple[Callable[[], int], Callable[[Optional[list]], Optional[str]]]] = {
+            "/prices": (lambda: server.quotes_version, self._prices),
+            "/positions": (lambda: server.positions_version, self._positions),
+            "/net_volume": (lambda: server.positions_version, self._net_volume),
+            "/account": (lambda: server.account_version, self._account),
+        }
+        self.bodies: Dict[str, Tuple[int, bytes]] = {}  # Unfiltered body per path and its version
+        self.requests = 0
+        self.not_modified = 0
+
+    def process_request(self, connection, request: Request) -> Optional[Response]:
+        """websockets process_request hook; returns None to go on with the WebSocket handshake"""
+        url = urlsplit(request.path)
+        route = self.routes.get(url.path)
+        if route is None or "websocket" in request.headers.get("Upgrade", "").lower():
+            return None
+
+        self.requests += 1
+        version_of, render = route
+        version = version_of()
+        symbols = parse_qs(url.query).get("symbols")
+        symbols = symbols[0].split(",") if symbols else None
+        # Filtered views change with the same version, so the query goes into the tag
+        etag = f'"{self.instance}-{version}{"-" + ",".join(symbols) if symbols else ""}"'
+
+        if etag in (tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")):
+            self.not_modified += 1
+            return self._response(HTTPStatus.NOT_MODIFIED, b"", etag)
+
+        cached = self.bodies.get(url.path)
+        if symbols is None and cached is not None and cached[0] == version:
+            return self._response(HTTPStatus.OK, cached[1], etag)
+
+        try:
+            text = render(symbols)
+        except Exception as e:
+            logger.error(f"Error rendering {url.path}: {e}")
+            return self._response(HTTPStatus.INTERNAL_SERVER_ERROR, b'{"error": "internal error"}')
+        if text is None:
+            return self._response(HTTPStatus.SERVICE_UNAVAILABLE, b'{"error": "not available yet"}')
+
+        body = text.encode()
+        if symbols is None:
+            self.bodies[url.path] = (version, body)
+        return self._response(HTTPStatus.OK, body, etag)
+
+    def _response(self, status: HTTPStatus, body: bytes, etag: Optional[str] = None) -> Response:
+        headers = {"Cache-Control": self.cache_control}
+        if etag:
+            headers["ETag"] = etag
+        return http_response(status, body, headers=headers)
+
+    def _prices(self, symbols: Optional[list]) -> str:
+        server = self.server
+        quotes = server.last_quotes
+        symbols = sorted(quotes) if symbols is None else [symbol for symbol in symbols if symbol in quotes]
+        return '{"prices": [' + ", ".join(server._quote_message(symbol, quotes[symbol]) for symbol in symbols) + "]}"
+
+    def _positions(self, symbols: Optional[list]) -> str:
+        messages = self.server.position_messages.values()
+        if symbols is not None:
+            messages = [message for message in messages if json.loads(message)["symbol"] in symbols]
+        return '{"positions": [' + ", ".join(messages) + "]}"
+
+    def _net_volume(self, symbols: Optional[list]) -> str:
+        net_volume = defaultdict(float)
+        for message in self.server.position_messages.values():
+            position = json.loads(message)
+            net_volume[position["symbol"]] += position["volume"] if position["type"] == "buy" else -position["volume"]
+        if symbols is not None:
+            net_volume = {symbol: net_volume.get(symbol, 0.0) for symbol in symbols}
+        return json.dumps({"net_volume": {symbol: round(volume, 2) for symbol, volume in sorted(net_volume.items())}})
+
+    def _account(self, symbols: Optional[list]) -> Optional[str]:
+        account = self.server.account_info
+        return None if account is None else json.dumps(account)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "not_modified": self.not_modified}
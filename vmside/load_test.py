@@ -0,0 +1,298 @@
+"""Load test for MT5WebSocketServer against the synthetic MetaTrader5 backend
+
+Runs the server in a child process with fake_mt5/MetaTrader5.py in place
+of the terminal, connects N simulated clients from a few client processes,
+and reports throughput and latency percentiles:
+
+- tick-to-client: receive time minus the tick's time. This includes the
+  polling interval in snapshot mode, so it is the end-to-end latency a
+  client sees.
+- fan-out spread: for each tick, the time between the first and the last
+  client receiving it. This is how long fanning one update out takes.
+
+Example:
+    python load_test.py --clients 500 --symbols 20 --tick-rate 20 --capture-mode ticks --duration 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import websockets
+
+from wire_protocol import BINARY_PROTOCOL, FRAME_HEADER, JSON_PROTOCOL, PRICE_RECORD
+
+FAKE_MT5_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_mt5")
+
+logger = logging.getLogger(__name__)
+
+
+def _server_main(server_kwargs: dict, workers: int, verbose: bool) -> None:
+    """Server process: the real server code on top of the already imported fake MetaTrader5"""
+    if not verbose:
+        logging.disable(logging.INFO)
+    from server import MT5WebSocketServer
+
+    if workers > 0:
+        from fanout import run_fanout
+        run_fanout(workers, **server_kwargs)
+        return
+
+    server = MT5WebSocketServer(**server_kwargs)
+    try:
+        asyncio.run(server.start_server())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop_server()
+
+
+class ClientStats:
+    """What one client process saw during the measurement window"""
+
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.frames = 0
+        self.bytes = 0
+        self.price_updates = 0
+        self.trade_updates = 0
+        self.latencies: List[float] = []  # Tick-to-client, ms
+        self.receipts: Dict[tuple, list] = {}  # (symbol, tick time) -> [first, last, count] receive times
+
+    def price(self, symbol, time_msc: float, received_ms: float) -> None:
+        self.price_updates += 1
+        self.latencies.append(received_ms - time_msc)
+        receipt = self.receipts.get((symbol, time_msc))
+        if receipt is None:
+            self.receipts[(symbol, time_msc)] = [received_ms, received_ms, 1]
+        else:
+            receipt[0] = min(receipt[0], received_ms)
+            receipt[1] = max(receipt[1], received_ms)
+            receipt[2] += 1
+
+    def result(self) -> dict:
+        return {
+            "connected": self.connected, "failed": self.failed, "frames": self.frames, "bytes": self.bytes,
+            "price_updates": self.price_updates, "trade_updates": self.trade_updates,
+            "latencies": np.array(self.latencies, dtype=np.float64), "receipts": self.receipts,
+        }
+
+
+async def _client(url: str, subscription: dict, stats: ClientStats, measure_from: float) -> None:
+    try:
+        websocket = await websockets.connect(url, open_timeout=30)
+    except Exception as e:
+        logger.warning(f"Client could not connect: {e}")
+        stats.failed += 1
+        return
+    stats.connected += 1
+    try:
+        await websocket.send(json.dumps(subscription))
+        async for message in websocket:
+            received_ms = time.time() * 1000
+            if received_ms < measure_from:
+                continue
+            stats.frames += 1
+            stats.bytes += len(message)
+            if isinstance(message, bytes):
+                # Symbol ids stand in for names; only the tick identity matters here
+                for symbol_id, _, _, time_msc in PRICE_RECORD.iter_unpack(message[FRAME_HEADER.size:]):
+                    stats.price(symbol_id, time_msc, received_ms)
+                continue
+            data = json.loads(message)
+            for event in data["events"] if data.get("type") == "batch" else (data,):
+                if event.get("type") == "price_update":
+                    time_msc = datetime.fromisoformat(event["timestamp"]).timestamp() * 1000
+                    stats.price(event["symbol"], round(time_msc), received_ms)
+                elif "update_type" in event:
+                    # Trade updates carry the position side in "type"
+                    stats.trade_updates += 1
+    except websockets.ConnectionClosed as e:
+        logger.warning(f"Client disconnected by the server: {e}")
+    finally:
+        await websocket.close()
+
+
+def _client_main(url: str, subscriptions: List[dict], measure_from: float, measure_until: float,
+                 results) -> None:
+    """Client process: run its share of clients and report what they received"""
+    stats = ClientStats()
+
+    async def run():
+        tasks = [asyncio.create_task(_client(url, subscription, stats, measure_from * 1000))
+                 for subscription in subscriptions]
+        await asyncio.sleep(max(0.0, measure_until - time.time()))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+    results.put(stats.result())
+
+
+def _wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    if len(values) == 0:
+        return {}
+    points = np.percentile(values, [50, 90, 99, 99.9])
+    return {"p50": points[0], "p90": points[1], "p99": points[2], "p99.9": points[3], "max": float(values.max())}
+
+
+def summarize(results: List[dict], duration: float) -> dict:
+    """Merge the client processes' results into one report"""
+    report = {key: sum(result[key] for result in results)
+              for key in ("connected", "failed", "frames", "bytes", "price_updates", "trade_updates")}
+    report["duration"] = duration
+    report["price_updates_per_second"] = report["price_updates"] / duration
+    report["frames_per_second"] = report["frames"] / duration
+    report["mbytes_per_second"] = report["bytes"] / duration / 1e6
+
+    latencies = np.concatenate([result["latencies"] for result in results]) if results else np.empty(0)
+    report["tick_to_client_ms"] = _percentiles(latencies)
+
+    receipts = defaultdict(lambda: [float("inf"), float("-inf"), 0])
+    for result in results:
+        for key, (first, last, count) in result["receipts"].items():
+            merged = receipts[key]
+            merged[0], merged[1], merged[2] = min(merged[0], first), max(merged[1], last), merged[2] + count
+    spreads = np.array([last - first for first, last, count in receipts.values() if count > 1])
+    report["fanout_spread_ms"] = _percentiles(spreads)
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"clients          {report['connected']} connected, {report['failed']} failed")
+    print(f"price updates    {report['price_updates']} ({report['price_updates_per_second']:.0f}/s)")
+    print(f"trade updates    {report['trade_updates']}")
+    print(f"frames           {report['frames']} ({report['frames_per_second']:.0f}/s, "
+          f"{report['mbytes_per_second']:.2f} MB/s)")
+    for title, key in (("tick-to-client", "tick_to_client_ms"), ("fan-out spread", "fanout_spread_ms")):
+        points = report[key]
+        if points:
+            print(f"{title:<16} " + "  ".join(f"{name} {value:.1f}ms" for name, value in points.items()))
+        else:
+            print(f"{title:<16} no samples")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Load test the MT5 WebSocket server against a synthetic MT5")
+    parser.add_argument("--clients", type=int, default=100, help="Simulated WebSocket clients")
+    parser.add_argument("--client-processes", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Processes the clients are spread over")
+    parser.add_argument("--symbols", type=int, default=10, help="Synthetic symbols")
+    parser.add_argument("--symbols-per-client", type=int, default=None,
+                        help="Symbols each client subscribes to (default: all)")
+    parser.add_argument("--tick-rate", type=float, default=10.0, help="Ticks per second per symbol")
+    parser.add_argument("--positions", type=int, default=20, help="Open positions at any time")
+    parser.add_argument("--trade-rate", type=float, default=0.5, help="Positions opened and closed per second")
+    parser.add_argument("--mt5-latency", type=float, default=0.0, help="Seconds each fake MT5 call takes")
+    parser.add_argument("--trades", action="store_true", help="Subscribe the clients to trade updates")
+    parser.add_argument("--protocol", choices=[JSON_PROTOCOL, BINARY_PROTOCOL], default=JSON_PROTOCOL)
+    parser.add_argument("--batch", action="store_true", help="Ask for one batch frame per poll")
+    parser.add_argument("--capture-mode", choices=["snapshot", "ticks"], default="snapshot")
+    parser.add_argument("--interval", type=float, default=1.0, help="Initial poll interval in snapshot mode")
+    parser.add_argument("--min-poll-interval", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=0, help="Fan-out worker processes (0: single process)")
+    parser.add_argument("--port", type=int, default=8865)
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds after connecting before measuring")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to measure")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the server's INFO logs")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    # The server process inherits the fake module and its settings
+    sys.path.insert(0, FAKE_MT5_DIR)
+    import MetaTrader5 as mt5
+    mt5.configure(symbols=args.symbols, tick_rate=args.tick_rate, positions=args.positions,
+                  trade_rate=args.trade_rate, latency=args.mt5_latency)
+    mt5.initialize()
+    symbols = [info.name for info in mt5.symbols_get()]
+    mt5.shutdown()
+    for name in ("MT5_USER", "MT5_PASSWORD", "MT5_SERVER", "MT5_PATH"):
+        os.environ[name] = "1" if name == "MT5_USER" else "fake"
+
+    server_kwargs = dict(
+        host="127.0.0.1", port=args.port, update_interval=args.interval, capture_mode=args.capture_mode,
+        min_poll_interval=args.min_poll_interval, deal_cursor_file=None,
+    )
+    server = multiprocessing.Process(target=_server_main, args=(server_kwargs, args.workers, args.verbose),
+                                     name="mt5-load-test-server")
+    server.start()
+    try:
+        if not _wait_for_port(args.port, timeout=30):
+            logger.error(f"Server did not start listening on port {args.port}")
+            return 1
+
+        per_client = args.symbols_per_client or len(symbols)
+        subscriptions = []
+        for i in range(args.clients):
+            # Rotate the symbol window so every symbol gets subscribers
+            watched = [symbols[(i + j) % len(symbols)] for j in range(min(per_client, len(symbols)))]
+            subscription = {"type": "subscription", "action": "subscribe", "symbols": watched,
+                            "include_trades": args.trades, "batch": args.batch}
+            if args.protocol != JSON_PROTOCOL:
+                subscription["protocol"] = args.protocol
+            subscriptions.append(subscription)
+
+        url = f"ws://127.0.0.1:{args.port}"
+        measure_from = time.time() + args.warmup
+        measure_until = measure_from + args.duration
+        results = multiprocessing.Queue()
+        processes = args.client_processes
+        clients = [
+            multiprocessing.Process(target=_client_main, name=f"mt5-load-test-clients-{i}",
+                                    args=(url, subscriptions[i::processes], measure_from, measure_until, results))
+            for i in range(processes)
+        ]
+        for process in clients:
+            process.start()
+        # Read results before joining so a full queue cannot block the clients' exit
+        collected = [results.get(timeout=args.warmup + args.duration + 60) for _ in clients]
+        for process in clients:
+            process.join()
+
+        report = summarize(collected, args.duration)
+        report["settings"] = {key: value for key, value in vars(args).items() if key not in ("json", "verbose")}
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+        return 0
+    finally:
+        # SIGINT lets the server (and the fan-out workers) shut down cleanly
+        if server.is_alive():
+            os.kill(server.pid, signal.SIGINT)
+        server.join(timeout=15)
+        if server.is_alive():
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed-interval sleep
+
+    Anything that blocks the loop (a synchronous MT5 call, a large JSON dump)
+    shows up directly as lag, so this is the number to watch when moving work
+    off the loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        window: int = 600,
+        warn_threshold: float = 0.1,
+        log_interval: float = 60.0,
+    ):
+        """
+        Args:
+            interval: Seconds between samples
+            window: Number of recent samples kept for the statistics
+            warn_threshold: Lag in seconds above which a warning is logged
+            log_interval: Seconds between summary log lines (0 disables them)
+        """
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.log_interval = log_interval
+        self.samples = deque(maxlen=window)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    async def run(self) -> None:
+        """Sample loop lag until cancelled"""
+        loop = asyncio.get_running_loop()
+        last_log = loop.time()
+
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+
+            lag = max(0.0, now - start - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.samples.append(lag)
+
+            if lag > self.warn_threshold:
+                logger.warning(f"Event loop blocked for {lag * 1000:.1f} ms")
+
+            if self.log_interval and now - last_log >= self.log_interval:
+                stats = self.stats()
+                logger.info(
+                    f"Event loop lag: avg={stats['avg_ms']:.2f} ms, "
+                    f"p99={stats['p99_ms']:.2f} ms, max={stats['max_ms']:.2f} ms"
+                )
+                last_log = now
+
+    def stats(self) -> Dict[str, float]:
+        """Lag statistics over the recent window, in milliseconds"""
+        if not self.samples:
+            return {"last_ms": 0.0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "last_ms": self.last_lag * 1000,
+            "avg_ms": sum(ordered) / len(ordered) * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": self.max_lag * 1000,
+        }
@@ -0,0 +1,236 @@
+"""Counters, gauges and latency histograms in the Prometheus text format
+
+A small stand-in for prometheus_client, cheap enough for the hot paths:
+label values are bound once up front with ``labels()``, and updating a
+bound child is a few attribute operations with no allocation. Gauges and
+counters whose value already lives elsewhere (client counts, queue depths)
+take a function that is only called when the metrics are scraped.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond encodes up to multi-second MT5 calls
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """One metric family; ``labels()`` returns the child for a set of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names; children are created with labels()
+            function: Compute the value at scrape time instead (unlabelled metrics only)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """The child for these label values; bind it once and keep it"""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        return _Value()
+
+    def samples(self, const_labels: str) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name}{_format_labels((), (), const_labels)} {_format_value(self.function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key, const_labels)} {_format_value(child.value)}"
+            for key, child in self.children.items()
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def samples(self, const_labels: str) -> List[str]:
+        lines = []
+        for key, child in self.children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ','.join(filter(None, (const_labels, le))))} {cumulative}")
+            labels = _format_labels(self.labelnames, key, const_labels)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for a scrape"""
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            const_labels: Labels added to every sample, e.g. to tell processes apart
+        """
+        self.metrics: List[Metric] = []
+        self.const_labels = ",".join(f'{name}="{value}"' for name, value in (const_labels or {}).items())
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def exposition(self) -> bytes:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(self.const_labels))
+        return ("\n".join(lines) + "\n").encode()
+
+
+class ServerMetrics:
+    """The MT5 WebSocket server's metrics, with every label child bound up front
+
+    The server times its stages with ``time.perf_counter()`` pairs and calls
+    ``observe``/``inc`` on the attributes below; nothing is looked up by
+    label on the hot path.
+    """
+
+    def __init__(self, server, const_labels: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            server: MT5WebSocketServer whose state the scrape-time gauges read
+            const_labels: Labels added to every sample
+        """
+        registry = self.registry = MetricsRegistry(const_labels)
+        # Totals of disconnected clients, so the per-client counters stay monotonic
+        self.closed_sent = 0
+        self.closed_dropped = 0
+
+        mt5_call = registry.histogram("mt5_call_seconds", "Latency of MT5 calls made by the polling loops", ["call"])
+        self.get_prices = mt5_call.labels("get_prices")
+        self.copy_ticks = mt5_call.labels("copy_ticks")
+        self.positions = mt5_call.labels("positions")
+        self.history_deals = mt5_call.labels("history_deals")
+        self.account_info = mt5_call.labels("account_info")
+
+        stage = registry.histogram("stage_seconds", "Time spent per poll in each stage after the MT5 call", ["loop", "stage"])
+        self.price_encode = stage.labels("prices", "encode")
+        self.price_fanout = stage.labels("prices", "fanout")
+        self.trade_process = stage.labels("trades", "process")
+
+        cycle = registry.histogram("poll_cycle_seconds", "Duration of one polling loop iteration", ["loop"])
+        self.price_cycle = cycle.labels("prices")
+        self.trade_cycle = cycle.labels("trades")
+
+        self.client_send = registry.histogram(
+            "client_send_seconds", "Time to write one queued frame to a client that is behind; broadcast frames are not timed").labels()
+
+        events = registry.counter("events_total", "Events produced for clients", ["kind"])
+        self.price_events = events.labels("price")
+        self.trade_events = events.labels("trade")
+        self.bar_events = events.labels("bar")
+
+        self.poll_errors = registry.counter("poll_errors_total", "Failed polling loop iterations", ["loop"])
+        self.price_errors = self.poll_errors.labels("prices")
+        self.trade_errors = self.poll_errors.labels("trades")
+
+        registry.gauge("connected_clients", "Open WebSocket connections",
+                       function=lambda: len(server.connected_clients))
+        registry.gauge("watched_symbols", "Symbols with a price or bar subscriber",
+                       function=lambda: len(server._active_symbols()))
+        registry.gauge("trade_subscribers", "Clients subscribed to trade updates",
+                       function=lambda: len(server.trade_subscribers))
+        registry.gauge("client_queue_depth_max", "Deepest outbound client queue",
+                       function=lambda: max((client.queue_depth for client in server.client_queues.values()), default=0))
+        registry.counter("client_frames_sent_total", "Frames written to connected clients",
+                         function=lambda: self.closed_sent + sum(client.sent for client in server.client_queues.values()))
+        registry.counter("client_updates_dropped_total", "Price updates dropped for slow clients",
+                         function=lambda: self.closed_dropped + sum(client.dropped for client in server.client_queues.values()))
+        registry.counter("price_updates_suppressed_total", "Price updates not sent because the quote had not moved",
+                         function=lambda: server.quote_filter.suppressed_total)
+        registry.gauge("event_loop_lag_seconds", "Latest measured event loop lag",
+                       function=lambda: server.loop_monitor.stats()["last_ms"] / 1000)
+        registry.gauge("trade_journal_seq", "Sequence number of the latest trade update",
+                       function=lambda: server.trade_journal.next_seq - 1)
+
+    def client_closed(self, client) -> None:
+        """Carry a disconnected client's totals over into the counters"""
+        self.closed_sent += client.sent
+        self.closed_dropped += client.dropped
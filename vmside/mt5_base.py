@@ -5,6 +5,7 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from dotenv import load_dotenv
 import MetaTrader5 as mt5
+from mt5_session import MT5Session
 
 # Configure logging
 logging.basicConfig(
@@ -19,6 +20,7 @@ class SymbolPrice:
 
     bid: float
     ask: float
+    time_msc: int = 0
 
     @property
     def spread(self) -> float:
@@ -42,6 +44,7 @@ class MT5Base:
         self.path = path or os.getenv("MT5_PATH")
         self.is_connected = False
         self._validate_credentials()
+        self.session = MT5Session.get(self.user, self.password, self.server, self.path)
 
     def _validate_credentials(self) -> None:
         """Validate that all required credentials are present"""
@@ -60,37 +63,26 @@ class MT5Base:
             raise ValueError(f"Missing required credentials: {', '.join(missing)}")
 
     def login(self) -> bool:
-        """Establish connection to MT5 terminal"""
-        if self.is_connected:
-            return True
-
-        try:
-            if not mt5.initialize(self.path):
-                logger.error(f"MT5 initialization failed: {mt5.last_error()}")
-                return False
-
-            if not mt5.login(self.user, password=self.password, server=self.server):
-                logger.error(f"Login failed: {mt5.last_error()}")
-                return False
-
-            self.is_connected = True
-            logger.info("Successfully connected to MT5")
-            return True
-        except Exception as e:
-            logger.error(f"Login error: {str(e)}")
-            return False
+        """Make sure the shared MT5 session is connected and logged in"""
+        self.is_connected = self.session.ensure()
+        return self.is_connected
 
     @contextmanager
     def connection(self) -> Generator[Optional["MT5Base"], None, None]:
-        """Context manager for MT5 connection with proper resource cleanup"""
-        if not self.login():
-            yield None
-        else:
-            try:
+        """Context manager giving exclusive use of the shared MT5 session
+
+        The session is kept alive between calls; use close() to shut it down.
+        """
+        with self.session.lock:
+            if not self.login():
+                yield None
+            else:
                 yield self
-            finally:
-                mt5.shutdown()
-                self.is_connected = False
+
+    def close(self) -> None:
+        """Shut down the shared MT5 session"""
+        self.session.shutdown()
+        self.is_connected = False
 
     def get_symbol_info(self, symbol: str) -> Dict[str, Any]:
         """Get information about a symbol"""
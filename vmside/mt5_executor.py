@@ -0,0 +1,67 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import MetaTrader5 as mt5
+from mt5_base import SymbolPrice
+from mt5_trading import MT5Trading
+
+logger = logging.getLogger(__name__)
+
+
+class MT5Executor:
+    """Runs blocking MT5 calls on a dedicated thread so the event loop never waits on the terminal
+
+    Every terminal call goes through one thread that owns the shared MT5
+    session. Price polling through the price worker process gets its own
+    thread, so a slow history query does not hold up price updates.
+    """
+
+    def __init__(self, client: MT5Trading):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5")
+        self._price_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5-prices")
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run an MT5 function on the terminal thread
+
+        Raises:
+            ConnectionError: If the MT5 session is not available
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self._call, func, *args, **kwargs)
+        )
+
+    def _call(self, func: Callable, *args, **kwargs) -> Any:
+        with self.client.connection() as client:
+            if not client:
+                raise ConnectionError("MT5 client not connected")
+            return func(*args, **kwargs)
+
+    async def positions_get(self, **kwargs) -> tuple:
+        """Current open positions"""
+        return await self.call(mt5.positions_get, **kwargs) or ()
+
+    async def history_deals_get(self, date_from: datetime, date_to: datetime) -> tuple:
+        """Deals in the given time range"""
+        return await self.call(mt5.history_deals_get, date_from, date_to) or ()
+
+    async def symbol_info(self, symbol: str):
+        """Symbol properties such as point and digits, or None if unknown"""
+        return await self.call(mt5.symbol_info, symbol)
+
+    async def get_prices(self, symbols: List[str]) -> Dict[str, SymbolPrice]:
+        """Latest prices for the given symbols"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._price_executor, self.client.get_prices, symbols
+        )
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for in-flight calls to finish"""
+        self._price_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+import MetaTrader5 as mt5
+
+logger = logging.getLogger(__name__)
+
+
+class MT5Session:
+    """Process-wide, logged-in MT5 session shared by every MT5Base instance
+
+    The MetaTrader5 package keeps a single terminal connection per process, so
+    initialize/login/shutdown must not be driven independently by each caller.
+    The session stays logged in, re-checks its health at most once per
+    ``health_check_interval`` and only reconnects (with exponential backoff)
+    after a failure.
+    """
+
+    _sessions: Dict[Tuple, "MT5Session"] = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(
+        self,
+        user: int,
+        password: str,
+        server: str,
+        path: str,
+        health_check_interval: float = 5.0,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.user = user
+        self.password = password
+        self.server = server
+        self.path = path
+        self.health_check_interval = health_check_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        # Held by callers for the whole duration of their MT5 calls
+        self.lock = threading.RLock()
+        self.is_connected = False
+        self._last_check = 0.0
+        self._failures = 0
+        self._next_attempt = 0.0
+
+    @classmethod
+    def get(
+        cls, user: int, password: str, server: str, path: str, **kwargs
+    ) -> "MT5Session":
+        """Return the shared session for these credentials, creating it if needed"""
+        key = (user, server, path)
+        with cls._sessions_lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                session = cls(user, password, server, path, **kwargs)
+                cls._sessions[key] = session
+            return session
+
+    def ensure(self) -> bool:
+        """Make sure the session is usable, reconnecting if it is not"""
+        with self.lock:
+            now = time.monotonic()
+
+            if self.is_connected:
+                if now - self._last_check < self.health_check_interval:
+                    return True
+                self._last_check = now
+                if self._is_healthy():
+                    return True
+                logger.warning("MT5 session is unhealthy, reconnecting")
+                self._disconnect()
+
+            if now < self._next_attempt:
+                return False
+
+            if self._connect():
+                self._failures = 0
+                self._next_attempt = 0.0
+                self._last_check = now
+                return True
+
+            self._failures += 1
+            delay = min(self.base_backoff * 2 ** (self._failures - 1), self.max_backoff)
+            self._next_attempt = now + delay
+            logger.error(f"MT5 connection attempt {self._failures} failed, retrying in {delay:.1f}s")
+            return False
+
+    def invalidate(self) -> None:
+        """Force a health check on the next ensure(), e.g. after a failed MT5 call"""
+        with self.lock:
+            self._last_check = 0.0
+
+    def shutdown(self) -> None:
+        """Close the terminal connection"""
+        with self.lock:
+            if self.is_connected:
+                self._disconnect()
+                logger.info("MT5 session closed")
+
+    def _is_healthy(self) -> bool:
+        terminal = mt5.terminal_info()
+        if terminal is None or not terminal.connected:
+            return False
+        account = mt5.account_info()
+        return account is not None and account.login == self.user
+
+    def _connect(self) -> bool:
+        try:
+            if not mt5.initialize(self.path):
+                logger.error(f"MT5 initialization failed: {mt5.last_error()}")
+                return False
+
+            if not mt5.login(self.user, password=self.password, server=self.server):
+                logger.error(f"Login failed: {mt5.last_error()}")
+                mt5.shutdown()
+                return False
+
+            self.is_connected = True
+            logger.info("Successfully connected to MT5")
+            return True
+        except Exception as e:
+            logger.error(f"Login error: {str(e)}")
+            return False
+
+    def _disconnect(self) -> None:
+        try:
+            mt5.shutdown()
+        finally:
+            self.is_connected = False
+
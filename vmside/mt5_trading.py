@@ -3,7 +3,8 @@ from dataclasses import dataclass
 import logging
 from multiprocessing import Process, Queue, freeze_support
 import MetaTrader5 as mt5
-from .mt5_base import MT5Base, SymbolPrice
+from mt5_base import MT5Base, SymbolPrice
+from price_worker import PriceWorker
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +23,10 @@ class Position:
 class MT5Trading(MT5Base):
     """Trading operations for MT5"""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, use_price_worker: bool = True, **kwargs):
         super().__init__(*args, **kwargs)
         freeze_support()
+        self.price_worker = PriceWorker(self.path) if use_price_worker else None
 
     def _fetch_symbol_price(self, symbol: str, queue: Queue) -> None:
         """Worker process for fetching symbol prices"""
@@ -37,16 +39,28 @@ class MT5Trading(MT5Base):
             if ticker is None:
                 queue.put((symbol, None))
             else:
-                price = SymbolPrice(bid=ticker.bid, ask=ticker.ask)
+                price = SymbolPrice(
+                    bid=ticker.bid, ask=ticker.ask, time_msc=ticker.time_msc
+                )
                 queue.put((symbol, price))
         finally:
             mt5.shutdown()
 
     def get_prices(self, symbols: List[str]) -> Dict[str, SymbolPrice]:
-        """Fetch prices for multiple symbols concurrently using multiprocessing"""
+        """Fetch prices for multiple symbols, preferring the persistent price worker"""
         if not symbols:
             return {}
 
+        if self.price_worker is not None:
+            prices = self.price_worker.fetch(symbols)
+            if prices is not None:
+                return prices
+            logger.warning("Price worker unavailable, falling back to per-symbol processes")
+
+        return self._get_prices_per_process(symbols)
+
+    def _get_prices_per_process(self, symbols: List[str]) -> Dict[str, SymbolPrice]:
+        """Fetch prices for multiple symbols concurrently using one process per symbol"""
         queue = Queue()
         processes = [
             Process(target=self._fetch_symbol_price, args=(symbol, queue))
@@ -84,6 +98,12 @@ class MT5Trading(MT5Base):
                 except Exception as e:
                     logger.error(f"Error cleaning up process: {e}")
 
+    def close(self) -> None:
+        """Stop the price worker and shut down the MT5 sessions"""
+        if self.price_worker is not None:
+            self.price_worker.stop()
+        super().close()
+
     def get_position_summary(
         self, symbol: str = "USDTHB"
     ) -> Dict[str, Union[float, List[Position]]]:
@@ -0,0 +1,126 @@
+import time
+import zlib
+from typing import Dict, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Only needed for the zstd encoding
+    zstandard = None
+
+ZLIB = "zlib"
+ZSTD = "zstd"
+ENCODINGS = (ZLIB, ZSTD)
+
+# Message attributes telling the subscriber how the data was compressed
+ENCODING_ATTRIBUTE = "encoding"
+DICTIONARY_ATTRIBUTE = "dictionary"
+
+# Preset dictionary shared with src/processors/payload_codec.py; both must stay
+# byte-for-byte identical, so change DICTIONARY_ID along with the contents.
+# Typical message text, with the most frequent strings last, where they are
+# cheapest for zlib to refer to.
+DICTIONARY_ID = "1"
+DICTIONARY = (
+    b'{"type": "trade_update", "update_type": "position_delta", "timestamp": "2024-01-01T00:00:00.000000", '
+    b'"trade_id": 100000001, "symbol": "EURUSD", "changes": {"profit": -1.25, "sl": 0.0, "tp": 0.0}}'
+    b'{"type": "close_sell", "update_type": "transaction", "timestamp": "2024-01-01T00:00:00", '
+    b'"transaction_id": 200000003, "symbol": "USDJPY", "volume": 0.1, "price": 150.123, "profit": 12.5}'
+    b'{"type": "buy", "update_type": "position", "timestamp": "2024-01-01T00:00:00.000000", '
+    b'"trade_id": 100000002, "symbol": "XAUUSD", "volume": 0.01, "price": 2345.67, "profit": -3.2, "sl": 0.0, "tp": 0.0}'
+    b'{"type": "envelope", "version": 1, "records": ['
+    b'{"type": "price_update", "symbol": "GBPUSD", "bid": 1.27345, "ask": 1.27361, "spread": 0.00016000000000004899, '
+    b'"timestamp": "2024-01-01T00:00:00.123000+00:00"}, '
+    b'{"type": "price_update", "symbol": "EURUSD", "bid": 1.10234, "ask": 1.10254, "spread": 0.00019999999999997797, '
+    b'"timestamp": "2024-01-01T00:00:00.123000+00:00"}, '
+)
+
+
+class PayloadEncoder:
+    """Compresses Pub/Sub message data at or above min_size bytes
+
+    ``encode`` returns the data to publish and the message attributes that
+    tell the pubsub_function how to decompress it; smaller data is sent as
+    is, without attributes, since compressing it saves little.
+    """
+
+    def __init__(self, encoding: str = ZLIB, min_size: int = 512, level: int = 6, use_dictionary: bool = True):
+        """
+        Args:
+            encoding: "zlib" or "zstd" (needs the zstandard package)
+            min_size: Smallest data, in bytes, that is compressed
+            level: Compression level
+            use_dictionary: Prime the compressor with the shared preset dictionary
+
+        Raises:
+            ValueError: If the encoding is unknown or zstd is not installed
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding!r}; expected one of {', '.join(ENCODINGS)}")
+        if encoding == ZSTD and zstandard is None:
+            raise ValueError("The zstd encoding needs the zstandard package")
+        self.encoding = encoding
+        self.min_size = min_size
+        self.level = level
+        self.use_dictionary = use_dictionary
+        self.attributes = {ENCODING_ATTRIBUTE: encoding}
+        if use_dictionary:
+            self.attributes[DICTIONARY_ATTRIBUTE] = DICTIONARY_ID
+        if encoding == ZSTD:
+            dict_data = zstandard.ZstdCompressionDict(DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT) if use_dictionary else None
+            self._zstd = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+        self.compressed = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def encode(self, data: bytes) -> Tuple[bytes, Dict[str, str]]:
+        """The data to publish and its message attributes"""
+        if len(data) < self.min_size:
+            self.skipped += 1
+            return data, {}
+        start = time.perf_counter()
+        if self.encoding == ZLIB:
+            compressor = (zlib.compressobj(self.level, zdict=DICTIONARY) if self.use_dictionary
+                          else zlib.compressobj(self.level))
+            encoded = compressor.compress(data) + compressor.flush()
+        else:
+            encoded = self._zstd.compress(data)
+        self.seconds += time.perf_counter() - start
+        self.compressed += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(encoded)
+        return encoded, self.attributes
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "compressed": self.compressed,
+            "skipped": self.skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+            "seconds": self.seconds,
+        }
+
+
+def decode_payload(data: bytes, attributes: Dict[str, str]) -> bytes:
+    """Undo PayloadEncoder.encode given the message attributes
+
+    Raises:
+        ValueError: If the encoding or dictionary is unknown, or zstd is not installed
+    """
+    encoding = attributes.get(ENCODING_ATTRIBUTE)
+    if encoding is None:
+        return data
+    dictionary = attributes.get(DICTIONARY_ATTRIBUTE)
+    if dictionary not in (None, DICTIONARY_ID):
+        raise ValueError(f"Unknown compression dictionary {dictionary!r}")
+    if encoding == ZLIB:
+        decompressor = zlib.decompressobj(zdict=DICTIONARY) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+    if encoding == ZSTD:
+        if zstandard is None:
+            raise ValueError("The zstd encoding needs the zstandard package")
+        dict_data = zstandard.ZstdCompressionDict(DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    raise ValueError(f"Unknown encoding {encoding!r}")
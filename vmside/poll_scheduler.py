@@ -0,0 +1,156 @@
+import math
+import time
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+
+class PollScheduler:
+    """Per-symbol poll intervals that follow each symbol's tick rate
+
+    A symbol is polled about ``oversample`` times per expected tick, within
+    [min_interval, max_interval], so busy symbols are sampled faster and quiet
+    ones back off. The tick rate is a time-weighted moving average over
+    roughly ``rate_window`` seconds. A symbol is never polled less often than
+    the fastest interval one of its subscribers asked for, but never more
+    often than min_interval.
+    """
+
+    def __init__(self, initial_interval: float = 1.0, min_interval: float = 0.1, max_interval: float = 5.0,
+                 oversample: float = 2.0, rate_window: float = 10.0):
+        """
+        Args:
+            initial_interval: Interval of a symbol until its tick rate is known
+            min_interval: Shortest interval between two polls of a symbol
+            max_interval: Longest interval between two polls of a symbol
+            oversample: Polls per expected tick
+            rate_window: Seconds of history the tick rate is averaged over
+        """
+        self.initial_interval = min(max(initial_interval, min_interval), max_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.oversample = oversample
+        self.rate_window = rate_window
+
+        self.intervals: Dict[str, float] = {}
+        self.next_poll: Dict[str, float] = {}
+        self.last_poll: Dict[str, float] = {}
+        self.tick_rate: Dict[str, float] = {}  # Ticks per second, moving average
+        self.last_tick_msc: Dict[str, int] = {}
+        self.polls: Dict[str, int] = defaultdict(int)
+        self.ticks: Dict[str, int] = defaultdict(int)
+        self.requests: Dict[str, Dict[Hashable, float]] = {}  # Symbol to each subscriber's interval
+        self.requested_by_client: Dict[Hashable, Set[str]] = {}  # Reverse index, so release() skips other symbols
+        self.requested: Dict[str, float] = {}  # Fastest requested interval per symbol
+
+    def due(self, symbols: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """The symbols whose next poll is due"""
+        now = time.monotonic() if now is None else now
+        next_poll = self.next_poll
+        return [symbol for symbol in symbols if next_poll.get(symbol, now) <= now]
+
+    def delay(self, symbols: Iterable[str], now: Optional[float] = None) -> float:
+        """Seconds until the first of the symbols is due"""
+        now = time.monotonic() if now is None else now
+        next_due = min((self.next_poll.get(symbol, now) for symbol in symbols), default=now + self.max_interval)
+        return max(0.0, next_due - now)
+
+    def record(self, symbol: str, ticks: int, now: Optional[float] = None) -> None:
+        """Account for a poll of a symbol that found ``ticks`` new ticks and schedule the next one"""
+        now = time.monotonic() if now is None else now
+        self.polls[symbol] += 1
+        self.ticks[symbol] += ticks
+
+        last = self.last_poll.get(symbol)
+        if last is not None:
+            elapsed = max(now - last, 1e-3)
+            rate = self.tick_rate.get(symbol)
+            if rate is None:
+                self.tick_rate[symbol] = ticks / elapsed
+            else:
+                weight = 1.0 - math.exp(-elapsed / self.rate_window)
+                self.tick_rate[symbol] = rate + weight * (ticks / elapsed - rate)
+        self.last_poll[symbol] = now
+
+        interval = self.intervals[symbol] = self._interval(symbol)
+        self.next_poll[symbol] = now + interval
+
+    def record_tick_time(self, symbol: str, time_msc: Optional[int], now: Optional[float] = None) -> None:
+        """Record a snapshot poll; it found a new tick if the tick time moved"""
+        new_tick = bool(time_msc) and time_msc != self.last_tick_msc.get(symbol)
+        if new_tick:
+            self.last_tick_msc[symbol] = time_msc
+        self.record(symbol, int(new_tick), now)
+
+    def request(self, symbol: str, client: Hashable, interval: Optional[float]) -> bool:
+        """Set (or with None, clear) a subscriber's requested interval for a symbol
+
+        Returns:
+            Whether the fastest requested interval of the symbol changed
+        """
+        requests = self.requests.get(symbol)
+        if interval is None:
+            if not requests or requests.pop(client, None) is None:
+                return False
+            if not requests:
+                del self.requests[symbol]
+            client_symbols = self.requested_by_client[client]
+            client_symbols.discard(symbol)
+            if not client_symbols:
+                del self.requested_by_client[client]
+        else:
+            self.requests.setdefault(symbol, {})[client] = interval
+            self.requested_by_client.setdefault(client, set()).add(symbol)
+
+        previous = self.requested.get(symbol)
+        fastest = min(self.requests[symbol].values()) if symbol in self.requests else None
+        if fastest == previous:
+            return False
+        if fastest is None:
+            del self.requested[symbol]
+        else:
+            self.requested[symbol] = fastest
+        # Apply a faster request right away instead of after the current interval
+        if fastest is not None and symbol in self.next_poll and (previous is None or fastest < previous):
+            self.next_poll[symbol] = min(self.next_poll[symbol], self.last_poll[symbol] + max(fastest, self.min_interval))
+        return True
+
+    def release(self, client: Hashable) -> List[str]:
+        """Clear every request of a client; returns the symbols whose fastest interval changed"""
+        changed = []
+        for symbol in list(self.requested_by_client.get(client, ())):
+            if self.request(symbol, client, None):
+                changed.append(symbol)
+        return changed
+
+    def forget(self, symbol: str) -> None:
+        """Drop the timing state of a symbol that is no longer polled"""
+        for state in (self.intervals, self.next_poll, self.last_poll, self.tick_rate, self.last_tick_msc):
+            state.pop(symbol, None)
+
+    def stats(self) -> Dict[str, dict]:
+        """Current interval, tick rate and totals per polled symbol"""
+        return {
+            symbol: {
+                "interval": interval,
+                "tick_rate": self.tick_rate.get(symbol, 0.0),
+                "requested_interval": self.requested.get(symbol),
+                "polls": self.polls[symbol],
+                "ticks": self.ticks[symbol],
+            }
+            for symbol, interval in self.intervals.items()
+        }
+
+    def _interval(self, symbol: str) -> float:
+        rate = self.tick_rate.get(symbol)
+        if rate is None:
+            interval = self.initial_interval
+        elif rate > 0:
+            interval = 1.0 / (rate * self.oversample)
+        else:
+            interval = self.max_interval
+        interval = min(max(interval, self.min_interval), self.max_interval)
+
+        requested = self.requested.get(symbol)
+        if requested is not None:
+            interval = max(min(interval, requested), self.min_interval)
+        return interval
@@ -0,0 +1,177 @@
+import operator
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Field order of the TradePosition named tuples returned by mt5.positions_get
+POSITION_FIELDS = (
+    "ticket", "time", "time_msc", "time_update", "time_update_msc", "type",
+    "magic", "identifier", "reason", "volume", "price_open", "sl", "tp",
+    "price_current", "swap", "profit", "symbol", "comment", "external_id",
+)
+
+# Fields that can be diffed; everything except the string fields
+NUMERIC_POSITION_FIELDS = {
+    "time": "<i8", "time_msc": "<i8", "time_update": "<i8", "time_update_msc": "<i8",
+    "type": "<i8", "magic": "<i8", "identifier": "<i8", "reason": "<i8",
+    "volume": "<f8", "price_open": "<f8", "sl": "<f8", "tp": "<f8",
+    "price_current": "<f8", "swap": "<f8", "profit": "<f8",
+}
+
+DEFAULT_TRACKED_FIELDS = ("volume", "sl", "tp", "profit")
+
+# Fields that follow the market and change on nearly every cycle
+THROTTLED_FIELDS = ("profit", "price_current", "swap")
+
+
+@dataclass
+class PositionDiff:
+    """Result of comparing two position snapshots"""
+
+    new: List = field(default_factory=list)
+    changed: List[Tuple[object, Dict[str, object]]] = field(default_factory=list)
+    closed: List[int] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.new or self.changed or self.closed)
+
+
+class PositionDiffer:
+    """Finds new, changed and closed positions with vectorized comparisons
+
+    Each cycle loads the ticket and the tracked fields of every position into
+    a NumPy structured array sorted by ticket. Matching against the previous
+    snapshot is a searchsorted and each field is compared in one vector op,
+    so Python-level work is only done for the positions that actually changed.
+
+    Profit moves with every tick, so with it tracked nearly every position
+    changes each cycle. Changes confined to THROTTLED_FIELDS are therefore
+    held back and reported together at most once per throttle_interval;
+    any other tracked change is reported at once, along with the position's
+    current profit.
+    """
+
+    def __init__(self, fields: Sequence[str] = DEFAULT_TRACKED_FIELDS, throttle_interval: float = 5.0):
+        """
+        Args:
+            fields: Numeric position fields whose changes produce an update
+            throttle_interval: Seconds between reports of changes only in
+                THROTTLED_FIELDS (0: report them every cycle)
+        """
+        unknown = [f for f in fields if f not in NUMERIC_POSITION_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown or non-numeric position fields: {', '.join(unknown)}")
+
+        self.fields = tuple(fields)
+        self.dtype = np.dtype(
+            [("ticket", "<i8")] + [(name, NUMERIC_POSITION_FIELDS[name]) for name in self.fields]
+        )
+        self._getters = [
+            (name, operator.itemgetter(POSITION_FIELDS.index(name))) for name in self.dtype.names
+        ]
+        self.previous = np.empty(0, dtype=self.dtype)
+        self.throttle_interval = throttle_interval
+        self._throttled = [name for name in self.fields if name in THROTTLED_FIELDS]
+        self._urgent_columns = [i for i, name in enumerate(self.fields) if name not in THROTTLED_FIELDS]
+        self._next_throttled = 0.0
+
+    def to_array(self, positions: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """Load positions into a structured array sorted by ticket
+
+        Returns:
+            The sorted array and, for each row, the index of its source position
+        """
+        if not positions:
+            return np.empty(0, dtype=self.dtype), np.empty(0, dtype=np.intp)
+
+        # Filling column by column is much cheaper than building a tuple per position
+        rows = np.empty(len(positions), dtype=self.dtype)
+        for name, getter in self._getters:
+            rows[name] = np.fromiter(map(getter, positions), dtype=rows.dtype[name], count=len(positions))
+
+        tickets = rows["ticket"]
+        if len(tickets) < 2 or np.all(tickets[1:] > tickets[:-1]):
+            # positions_get normally returns positions in ticket order already
+            return rows, np.arange(len(rows))
+        order = np.argsort(tickets, kind="stable")
+        return rows[order], order
+
+    def update(self, positions: Sequence, now: float = None) -> PositionDiff:
+        """Compare positions with the previous snapshot and remember them
+
+        Args:
+            positions: Current open positions
+            now: time.monotonic() timestamp, for throttling
+        """
+        now = time.monotonic() if now is None else now
+        current, order = self.to_array(positions)
+        previous = self.previous
+
+        cur_tickets = current["ticket"]
+        prev_tickets = previous["ticket"]
+
+        # Locate every current ticket in the previous snapshot
+        if np.array_equal(cur_tickets, prev_tickets):
+            # Same set of positions as last cycle, rows already line up
+            idx = np.arange(len(current))
+            found = np.ones(len(current), dtype=bool)
+        elif len(previous):
+            idx = np.minimum(np.searchsorted(prev_tickets, cur_tickets), len(previous) - 1)
+            found = prev_tickets[idx] == cur_tickets
+        else:
+            idx = np.zeros(len(current), dtype=np.intp)
+            found = np.zeros(len(current), dtype=bool)
+
+        common_rows = np.flatnonzero(found)
+        if len(common_rows) and self.fields:
+            if len(common_rows) == len(current) == len(previous):
+                common_cur, common_prev = current, previous
+            else:
+                common_cur = current[common_rows]
+                common_prev = previous[idx[common_rows]]
+            mask = np.column_stack(
+                [common_cur[name] != common_prev[name] for name in self.fields]
+            )
+            hit = mask.any(axis=1)
+            if self._throttled and self.throttle_interval:
+                if now >= self._next_throttled:
+                    self._next_throttled = now + self.throttle_interval
+                else:
+                    hit = self._defer_throttled(current, previous, common_rows, idx, mask, hit)
+            changed_rows = common_rows[hit]
+            changed_mask = mask[hit]
+        else:
+            changed_rows = np.empty(0, dtype=np.intp)
+            changed_mask = np.empty((0, len(self.fields)), dtype=bool)
+
+        closed = prev_tickets[~np.isin(prev_tickets, cur_tickets, assume_unique=True)]
+        self.previous = current
+
+        # Only the positions that differ are turned back into Python objects
+        diff = PositionDiff(
+            new=[positions[i] for i in order[~found].tolist()],
+            closed=closed.tolist(),
+        )
+        for row, mask in zip(changed_rows.tolist(), changed_mask.tolist()):
+            position = positions[order[row]]
+            diff.changed.append((
+                position,
+                {name: getattr(position, name) for name, hit in zip(self.fields, mask) if hit},
+            ))
+        return diff
+
+    def _defer_throttled(self, current: np.ndarray, previous: np.ndarray, common_rows: np.ndarray,
+                         idx: np.ndarray, mask: np.ndarray, hit: np.ndarray) -> np.ndarray:
+        """Drop changes confined to throttled fields from this cycle's report
+
+        Their old values are carried over into the stored snapshot, so the
+        changes still show up once the throttle interval has passed.
+        """
+        urgent = mask[:, self._urgent_columns].any(axis=1)
+        deferred = common_rows[hit & ~urgent]
+        if len(deferred):
+            for name in self._throttled:
+                current[name][deferred] = previous[name][idx[deferred]]
+        return hit & urgent
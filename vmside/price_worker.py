@@ -0,0 +1,142 @@
+import logging
+import threading
+from multiprocessing import Pipe, Process
+from typing import Dict, List, Optional
+
+import MetaTrader5 as mt5
+from mt5_base import SymbolPrice
+
+logger = logging.getLogger(__name__)
+
+
+def _price_worker_main(path: str, conn) -> None:
+    """Worker process loop: keep one terminal session open and answer price requests"""
+    initialized = False
+    try:
+        while True:
+            try:
+                symbols = conn.recv()
+            except (EOFError, OSError):
+                break
+            if symbols is None:
+                break
+
+            if not initialized:
+                initialized = bool(mt5.initialize(path))
+                if not initialized:
+                    conn.send((False, f"MT5 initialization failed: {mt5.last_error()}"))
+                    continue
+
+            results = {}
+            for symbol in symbols:
+                tick = mt5.symbol_info_tick(symbol)
+                if tick is not None:
+                    results[symbol] = (tick.bid, tick.ask, tick.time_msc)
+
+            # Nothing came back: re-initialize on the next request if the terminal went away
+            if symbols and not results and mt5.terminal_info() is None:
+                mt5.shutdown()
+                initialized = False
+
+            conn.send((True, results))
+    finally:
+        if initialized:
+            mt5.shutdown()
+
+
+class PriceWorker:
+    """Long-lived process that holds one initialized MT5 session for price polling"""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        """
+        Args:
+            path: Path to the MT5 terminal executable
+            timeout: Seconds to wait for a reply before treating the worker as dead
+        """
+        self.path = path
+        self.timeout = timeout
+        self._process: Optional[Process] = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> bool:
+        """Start the worker process if it is not already running"""
+        if self.is_alive:
+            return True
+
+        self._cleanup()
+        try:
+            parent_conn, child_conn = Pipe()
+            process = Process(
+                target=_price_worker_main,
+                args=(self.path, child_conn),
+                name="mt5-price-worker",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._process = process
+            self._conn = parent_conn
+            logger.info(f"MT5 price worker started (pid={process.pid})")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start MT5 price worker: {e}")
+            self._cleanup()
+            return False
+
+    def fetch(self, symbols: List[str]) -> Optional[Dict[str, SymbolPrice]]:
+        """
+        Fetch the latest tick for every symbol in one round trip
+
+        Returns:
+            Mapping of symbol to price, or None if the worker could not answer
+        """
+        with self._lock:
+            if not self.start():
+                return None
+
+            try:
+                self._conn.send(list(symbols))
+                if not self._conn.poll(self.timeout):
+                    logger.error("MT5 price worker timed out, restarting it")
+                    self._cleanup()
+                    return None
+                ok, payload = self._conn.recv()
+            except (EOFError, OSError, BrokenPipeError) as e:
+                logger.error(f"MT5 price worker connection lost: {e}")
+                self._cleanup()
+                return None
+
+        if not ok:
+            logger.error(payload)
+            return None
+
+        return {
+            symbol: SymbolPrice(bid=bid, ask=ask, time_msc=time_msc)
+            for symbol, (bid, ask, time_msc) in payload.items()
+        }
+
+    def stop(self) -> None:
+        """Ask the worker to shut down its MT5 session and exit"""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+            if self._process is not None:
+                self._process.join(timeout=5)
+            self._cleanup()
+
+    def _cleanup(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
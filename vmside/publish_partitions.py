@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import zlib
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY = 5  # Seconds before a publisher that exited is started again
+
+
+def symbol_partition(symbol: str, partitions: int) -> int:
+    """Partition that owns a symbol; unlike hash(), stable across processes and runs"""
+    return zlib.crc32(symbol.encode("utf-8")) % partitions
+
+
+def partition_symbols(symbols: List[str], partitions: int, partition: int) -> List[str]:
+    """The symbols owned by one partition, in their original order"""
+    return [symbol for symbol in symbols if symbol_partition(symbol, partitions) == partition]
+
+
+def partition_publisher_kwargs(publisher_kwargs: dict, partitions: int, partition: int,
+                               trade_partition: int = 0) -> Optional[dict]:
+    """MT5PubSubPublisher arguments for one partition, or None if it owns no symbols
+
+    Only the trade partition publishes trade updates. Each partition gets a
+    spool directory of its own under spool_dir.
+    """
+    symbols = partition_symbols(publisher_kwargs.get("symbols") or [], partitions, partition)
+    if not symbols:
+        return None
+    kwargs = dict(publisher_kwargs, symbols=symbols, include_trades=partition == trade_partition)
+    if kwargs.get("spool_dir"):
+        kwargs["spool_dir"] = os.path.join(kwargs["spool_dir"], f"partition-{partition}")
+    return kwargs
+
+
+def run_partition(partition: int, partitions: int, trade_partition: int, publisher_kwargs: dict,
+                  stop_event=None) -> bool:
+    """Run the publisher of one partition until a shutdown signal or stop_event is set
+
+    Returns:
+        False if the partition has nothing to publish or the publisher could not start
+    """
+    from pubsub_publisher import MT5PubSubPublisher, run_publisher
+
+    # Every line this process logs, including its publish statistics, names the partition
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(logging.Formatter(
+            f"%(asctime)s - partition {partition}/{partitions} - %(levelname)s - %(message)s"
+        ))
+
+    kwargs = partition_publisher_kwargs(publisher_kwargs, partitions, partition, trade_partition)
+    if kwargs is None:
+        logger.error(f"Partition {partition} of {partitions} owns none of the symbols")
+        return False
+    trades = " and trade updates" if kwargs["include_trades"] else ""
+    logger.info(f"Publishing {len(kwargs['symbols'])} symbols{trades}")
+    publisher = MT5PubSubPublisher(**kwargs)
+    if stop_event is not None:
+        threading.Thread(target=_stop_when_set, args=(stop_event, publisher), name="partition-stop", daemon=True).start()
+    return asyncio.run(run_publisher(publisher))
+
+
+def _stop_when_set(stop_event, publisher) -> None:
+    stop_event.wait()
+    logger.info("Stop requested by the supervisor")
+    publisher.stop()
+
+
+def _interrupt(signum, frame) -> None:
+    # A process manager stops the supervisor with SIGTERM; shut down as on Ctrl+C
+    raise KeyboardInterrupt
+
+
+def _partition_main(partition: int, partitions: int, trade_partition: int, publisher_kwargs: dict,
+                    stop_event) -> None:
+    # Ctrl+C reaches the whole process group and run_partitions follows by setting
+    # stop_event; the publisher drains and exits on either. A shared event rather
+    # than SIGTERM, since on Windows terminate() kills the process outright.
+    if not run_partition(partition, partitions, trade_partition, publisher_kwargs, stop_event):
+        sys.exit(1)
+
+
+def run_partitions(partitions: int, trade_partition: int, publisher_kwargs: dict) -> bool:
+    """Run one publisher process per symbol partition until interrupted
+
+    Partitions that own none of the symbols are not started; the trade
+    partition must own at least one, since the server only accepts
+    subscriptions with symbols. Publishers that exit are restarted.
+
+    Returns:
+        False if the trade partition owns none of the symbols
+    """
+    workers = []
+    for partition in range(partitions):
+        kwargs = partition_publisher_kwargs(publisher_kwargs, partitions, partition, trade_partition)
+        if kwargs is not None:
+            workers.append(partition)
+            logger.info(f"Partition {partition}: {', '.join(kwargs['symbols'])}")
+        else:
+            logger.warning(f"Partition {partition} owns none of the symbols; not starting it")
+    if trade_partition not in workers:
+        logger.error(f"Trade partition {trade_partition} owns none of the symbols; choose another --trade-partition")
+        return False
+
+    stop_event = multiprocessing.Event()
+
+    def start_worker(partition: int) -> multiprocessing.Process:
+        process = multiprocessing.Process(
+            target=_partition_main,
+            args=(partition, partitions, trade_partition, publisher_kwargs, stop_event),
+            name=f"mt5-publisher-{partition}",
+        )
+        process.start()
+        return process
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    processes = {partition: start_worker(partition) for partition in workers}
+    started = {partition: time.monotonic() for partition in workers}
+    logger.info(f"Started {len(processes)} publisher processes")
+
+    try:
+        while True:
+            time.sleep(1)
+            for partition, process in list(processes.items()):
+                if process.is_alive() or time.monotonic() - started[partition] < RESTART_DELAY:
+                    continue
+                logger.error(f"Publisher of partition {partition} exited with code {process.exitcode}, restarting")
+                processes[partition] = start_worker(partition)
+                started[partition] = time.monotonic()
+    except KeyboardInterrupt:
+        logger.info("Stopping publishers")
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        # Publishers drain their in-flight messages before exiting
+        stop_event.set()
+        for process in processes.values():
+            process.join(timeout=60)
+            if process.is_alive():
+                logger.error(f"{process.name} did not stop in time, killing it")
+                process.kill()
+    return True
@@ -0,0 +1,319 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Payload length, CRC-32 of the payload, sequence number; a zero length marks the end of a segment
+RECORD_HEADER = struct.Struct("<IIQ")
+
+# Per-record states, one byte each
+UNSENT = 0
+IN_FLIGHT = 1
+ACKED = 2
+
+SEGMENT_SUFFIX = ".seg"
+STATE_FILE = "acked.json"
+
+
+class _Segment:
+    """One preallocated, memory-mapped spool file holding consecutive sequence numbers"""
+
+    def __init__(self, path: str, base_seq: int, size: int, create: bool = False):
+        self.path = path
+        self.base_seq = base_seq
+        with open(path, "w+b" if create else "r+b") as f:
+            if create:
+                f.truncate(size)
+            self.size = os.fstat(f.fileno()).st_size
+            self.mm = mmap.mmap(f.fileno(), self.size)
+        self.end = 0  # Offset where the next record goes
+        self.status = bytearray()  # State of each record, by seq - base_seq
+        self.acked = 0
+        self.unsent = 0
+        self.first_unacked = 0
+        self.scan_index = 0  # Where take() resumes looking for unsent records
+        self.scan_offset = 0
+        self.dirty = False
+        self.torn = False  # Recovery stopped at an incomplete or corrupt record
+
+    def recover(self) -> None:
+        """Find the records of an existing segment, up to the first incomplete or corrupt one"""
+        offset = 0
+        while offset + RECORD_HEADER.size <= self.size:
+            length, crc, seq = RECORD_HEADER.unpack_from(self.mm, offset)
+            start = offset + RECORD_HEADER.size
+            if length == 0:
+                break
+            if start + length > self.size or seq != self.base_seq + len(self.status):
+                self.torn = True
+                break
+            if zlib.crc32(self.mm[start:start + length]) != crc:
+                logger.warning(f"Corrupt record {seq} in {self.path}; dropping it and everything after it")
+                self.torn = True
+                break
+            self.status.append(UNSENT)
+            offset = start + length
+        self.end = offset
+
+    def fits(self, length: int) -> bool:
+        return self.end + RECORD_HEADER.size + length <= self.size
+
+    def append(self, data: bytes, state: int) -> int:
+        seq = self.base_seq + len(self.status)
+        offset = self.end
+        RECORD_HEADER.pack_into(self.mm, offset, len(data), zlib.crc32(data), seq)
+        start = offset + RECORD_HEADER.size
+        self.mm[start:start + len(data)] = data
+        self.end = start + len(data)
+        # Keep the end marker explicit in case the space was used before a crash
+        if self.end + 4 <= self.size:
+            self.mm[self.end:self.end + 4] = b"\0\0\0\0"
+        self.status.append(state)
+        self.dirty = True
+        return seq
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+class PublishSpool:
+    """Disk-backed append-only log of the messages being published to Pub/Sub
+
+    Every message is appended before it is published and acknowledged once
+    Pub/Sub has it. Records live in fixed-size memory-mapped segment files;
+    a segment is deleted as soon as all of its records are acknowledged.
+    Appends are plain memory copies; ``sync`` (called periodically) flushes
+    the written pages and persists the sequence number below which every
+    record was acknowledged. After a crash or restart, records from that
+    point on are sent again, so delivery is at least once.
+
+    Memory use is one byte per spooled record; payloads stay on disk.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024,
+                 max_bytes: int = 8 * 1024 * 1024 * 1024):
+        """
+        Args:
+            directory: Where segment files and the acknowledgement state are kept
+            segment_size: Size of each segment file
+            max_bytes: Most disk space the segments may take; appends fail beyond it
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.segments: List[_Segment] = []
+        self.next_seq = 0
+        self.acked_below = 0  # Persisted low watermark
+        self.unsent = 0
+        self.in_flight = 0
+        self.appended = 0
+        self.acknowledged = 0
+        self.returned = 0  # Records that failed to publish and wait to be sent again
+        self.full = 0  # Appends refused because the spool was full
+
+    def open(self) -> int:
+        """Recover the spool from disk; returns the number of records waiting to be sent"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.acked_below = self._load_state()
+        self.next_seq = self.acked_below
+
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        previous = None  # The previous segment file, kept or not
+        for name in names:
+            segment = _Segment(os.path.join(self.directory, name), int(name[:-len(SEGMENT_SUFFIX)]), 0)
+            segment.recover()
+            # Segments acknowledged in full are deleted even while older ones are not,
+            # so a range missing between two files is normal. Records are only lost
+            # when the file before the range was cut short.
+            if previous is not None and previous.torn and segment.base_seq != previous.base_seq + len(previous.status):
+                logger.warning(f"Gap in spool before {segment.path}: sequence "
+                               f"{previous.base_seq + len(previous.status)} to {segment.base_seq}")
+            previous = segment
+            if segment.base_seq + len(segment.status) <= self.acked_below or not segment.status:
+                # Entirely acknowledged (or empty) before the restart
+                self._delete(segment)
+                continue
+            for index in range(len(segment.status)):
+                if segment.base_seq + index < self.acked_below:
+                    segment.status[index] = ACKED
+                    segment.acked += 1
+            segment.unsent = len(segment.status) - segment.acked
+            self.unsent += segment.unsent
+            self.segments.append(segment)
+            self.next_seq = segment.base_seq + len(segment.status)
+
+        if self.unsent:
+            logger.info(f"Spool has {self.unsent} unacknowledged records in {len(self.segments)} segments to replay")
+        return self.unsent
+
+    def append(self, data: bytes, sending: bool) -> Optional[int]:
+        """Write a message to the spool
+
+        Args:
+            data: Message payload
+            sending: Whether the caller publishes it now; otherwise take() hands it out later
+
+        Returns:
+            The record's sequence number, or None if the spool is full
+        """
+        segment = self.segments[-1] if self.segments else None
+        if segment is None or not segment.fits(len(data)):
+            segment = self._rotate(len(data))
+            if segment is None:
+                self.full += 1
+                return None
+        seq = segment.append(data, IN_FLIGHT if sending else UNSENT)
+        self.next_seq = seq + 1
+        self.appended += 1
+        if sending:
+            self.in_flight += 1
+        else:
+            segment.unsent += 1
+            self.unsent += 1
+        return seq
+
+    def take(self, limit: int) -> List[Tuple[int, bytes]]:
+        """Up to ``limit`` unsent records, oldest first, marked as in flight"""
+        records = []
+        for segment in self.segments:
+            if len(records) >= limit:
+                break
+            if not segment.unsent:
+                continue
+            index, offset, mm = segment.scan_index, segment.scan_offset, segment.mm
+            while index < len(segment.status) and len(records) < limit:
+                length, _, seq = RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + RECORD_HEADER.size
+                if segment.status[index] == UNSENT:
+                    segment.status[index] = IN_FLIGHT
+                    segment.unsent -= 1
+                    records.append((seq, mm[start:start + length]))
+                index += 1
+                offset = start + length
+            segment.scan_index, segment.scan_offset = index, offset
+        self.unsent -= len(records)
+        self.in_flight += len(records)
+        return records
+
+    def ack(self, seq: int) -> None:
+        """Pub/Sub has the record; its segment is deleted once every record in it is acknowledged"""
+        segment, index = self._locate(seq)
+        if segment is None or segment.status[index] != IN_FLIGHT:
+            return
+        segment.status[index] = ACKED
+        segment.acked += 1
+        self.in_flight -= 1
+        self.acknowledged += 1
+        if segment.acked == len(segment.status) and segment is not self.segments[-1]:
+            self.segments.remove(segment)
+            self._delete(segment)
+
+    def nack(self, seq: int) -> None:
+        """Publishing the record failed; take() will hand it out again"""
+        segment, index = self._locate(seq)
+        if segment is None or segment.status[index] != IN_FLIGHT:
+            return
+        segment.status[index] = UNSENT
+        segment.unsent += 1
+        self.unsent += 1
+        self.in_flight -= 1
+        self.returned += 1
+        if index < segment.scan_index:
+            segment.scan_index = segment.scan_offset = 0
+
+    def sync(self) -> None:
+        """Flush written records to disk and persist the acknowledged watermark"""
+        for segment in self.segments:
+            if segment.dirty:
+                segment.mm.flush()
+                segment.dirty = False
+        acked_below = self._low_watermark()
+        if acked_below != self.acked_below:
+            self.acked_below = acked_below
+            self._save_state()
+
+    def close(self) -> None:
+        self.sync()
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self.segments),
+            "bytes": sum(segment.size for segment in self.segments),
+            "unsent": self.unsent,
+            "in_flight": self.in_flight,
+            "appended": self.appended,
+            "acknowledged": self.acknowledged,
+            "returned": self.returned,
+            "full": self.full,
+        }
+
+    def _rotate(self, length: int) -> Optional[_Segment]:
+        """Start a new segment, dropping the current one if it is already fully acknowledged"""
+        size = max(self.segment_size, RECORD_HEADER.size + length + 4)
+        if sum(segment.size for segment in self.segments) + size > self.max_bytes:
+            return None
+        if self.segments:
+            current = self.segments[-1]
+            current.mm.flush()
+            current.dirty = False
+            if current.acked == len(current.status):
+                self.segments.pop()
+                self._delete(current)
+        path = os.path.join(self.directory, f"{self.next_seq:020d}{SEGMENT_SUFFIX}")
+        segment = _Segment(path, self.next_seq, size, create=True)
+        self.segments.append(segment)
+        return segment
+
+    def _locate(self, seq: int) -> Tuple[Optional[_Segment], int]:
+        for segment in reversed(self.segments):
+            if seq >= segment.base_seq:
+                index = seq - segment.base_seq
+                return (segment, index) if index < len(segment.status) else (None, 0)
+        return None, 0
+
+    def _low_watermark(self) -> int:
+        for segment in self.segments:
+            status = segment.status
+            index = segment.first_unacked
+            while index < len(status) and status[index] == ACKED:
+                index += 1
+            segment.first_unacked = index
+            if index < len(status):
+                return segment.base_seq + index
+        return self.next_seq
+
+    def _delete(self, segment: _Segment) -> None:
+        segment.close()
+        try:
+            os.remove(segment.path)
+        except OSError as e:
+            logger.error(f"Could not delete spool segment {segment.path}: {e}")
+
+    def _load_state(self) -> int:
+        path = os.path.join(self.directory, STATE_FILE)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as f:
+                return int(json.load(f)["acked_below"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not read spool state from {path}: {e}")
+            return 0
+
+    def _save_state(self) -> None:
+        path = os.path.join(self.directory, STATE_FILE)
+        tmp_file = f"{path}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump({"acked_below": self.acked_below}, f)
+            os.replace(tmp_file, path)
+        except OSError as e:
+            logger.error(f"Could not persist spool state to {path}: {e}")
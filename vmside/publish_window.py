@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightWindow:
+    """Bounds the publishes that are awaiting their acknowledgement
+
+    ``acquire`` only waits while the window is full (by message count or by
+    bytes), so a reader feeding the publisher keeps going as long as there
+    is room. Futures complete on the Pub/Sub client's threads; their
+    callbacks hand the result back to the event loop, where slots are freed
+    and successes and failures are counted.
+    """
+
+    def __init__(self, max_messages: int = 1000, max_bytes: int = 10 * 1024 * 1024):
+        """
+        Args:
+            max_messages: Most publishes awaiting an acknowledgement at once
+            max_bytes: Most payload bytes awaiting an acknowledgement at once
+        """
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.messages = 0
+        self.bytes = 0
+        self.published = 0
+        self.failed = 0
+        self.waits = 0  # Times a publish had to wait for room
+        self.wait_seconds = 0.0
+        self._room = asyncio.Event()
+        self._empty = asyncio.Event()
+        self._empty.set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def full(self, size: int = 0) -> bool:
+        # A message larger than max_bytes still goes out once the window is empty
+        return self.messages >= self.max_messages or (self.messages > 0 and self.bytes + size > self.max_bytes)
+
+    async def acquire(self, size: int) -> None:
+        """Wait until a message of ``size`` bytes fits, then take its slot"""
+        if self.full(size):
+            self.waits += 1
+            start = time.perf_counter()
+            while self.full(size):
+                self._room.clear()
+                await self._room.wait()
+            self.wait_seconds += time.perf_counter() - start
+        self._loop = self._loop or asyncio.get_running_loop()
+        self.messages += 1
+        self.bytes += size
+        self._empty.clear()
+
+    def track(self, future: Future, size: int, on_done: Optional[Callable[[Future], None]] = None) -> None:
+        """Free the slot taken by ``acquire`` once ``future`` completes
+
+        Args:
+            future: Publish future; may complete on any thread
+            size: Size passed to acquire
+            on_done: Called on the event loop with the completed future
+        """
+        loop = self._loop
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._release, done, size, on_done))
+
+    def cancel(self, size: int) -> None:
+        """Give back a slot whose publish could not be started"""
+        self.failed += 1
+        self._free(size)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every outstanding publish to complete; False on timeout"""
+        try:
+            await asyncio.wait_for(self._empty.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.messages} publishes still unacknowledged after {timeout}s")
+            return False
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.messages,
+            "in_flight_bytes": self.bytes,
+            "published": self.published,
+            "failed": self.failed,
+            "waits": self.waits,
+            "wait_seconds": self.wait_seconds,
+        }
+
+    def _release(self, future: Future, size: int, on_done: Optional[Callable[[Future], None]]) -> None:
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+        else:
+            self.published += 1
+        self._free(size)
+        if on_done is not None:
+            try:
+                on_done(future)
+            except Exception as e:
+                logger.error(f"Publish completion callback failed: {e}")
+
+    def _free(self, size: int) -> None:
+        self.messages -= 1
+        self.bytes -= size
+        self._room.set()
+        if self.messages == 0:
+            self._empty.set()
@@ -4,10 +4,19 @@ import logging
 import websockets
 import argparse
 import os
+from google.api_core.exceptions import InvalidArgument
 from google.cloud import pubsub_v1
 from dotenv import load_dotenv
 import time
 from datetime import datetime
+from functools import partial
+
+from conflation import Conflator, parse_policies
+from envelope import EnvelopePacker
+from payload_codec import ENCODINGS, PayloadEncoder
+from publish_spool import PublishSpool
+from publish_window import InFlightWindow
+from wire_protocol import JSON_PROTOCOL, PROTOCOLS, decode_frame
 
 # Configure logging
 logging.basicConfig(
@@ -20,9 +29,48 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 class MT5PubSubPublisher:
-    """Connects to MT5 WebSocket server and publishes data to Google Cloud Pub/Sub"""
+    """Connects to MT5 WebSocket server and publishes data to Google Cloud Pub/Sub
+
+    Publishing is pipelined: each message is handed to the Pub/Sub client,
+    which batches it, and the next WebSocket message is read without waiting
+    for the acknowledgement. Up to max_in_flight messages (and
+    max_in_flight_bytes) may be unacknowledged; only when that window is full
+    does reading from the WebSocket pause. Messages can therefore be
+    acknowledged out of order.
+
+    With envelope_max_records above 1, records are packed into envelope
+    messages ({"type": "envelope", "version": 1, "records": [...]}) of up to
+    that many records, sent at the latest envelope_max_delay seconds after
+    their first record. The pubsub_function unpacks them.
+
+    With a spool_dir, every message is first appended to a PublishSpool on
+    disk and removed once Pub/Sub acknowledges it. Reading from the WebSocket
+    then never waits for Pub/Sub: while the window is full, or older spooled
+    messages are still waiting, new messages only go to the spool, and a
+    replay task sends them in order with at most replay_max_in_flight
+    outstanding. Failed publishes go back to the spool and are retried with
+    backoff, and messages left over from a previous run are replayed on start.
+
+    With conflate (a spec for conflation.parse_policies, for example
+    "*=bucket:0.25"), price updates are downsampled per symbol before they
+    are published; trade updates always pass.
+
+    With compression ("zlib" or "zstd"), message data of at least
+    compression_min_bytes is compressed with a preset dictionary and carries
+    "encoding" and "dictionary" attributes, which the pubsub_function uses
+    to decompress it. Spooled messages are stored uncompressed.
+
+    To spread the work over several processes, run one publisher per symbol
+    partition (see publish_partitions) with include_trades set for only one.
+    """
     
-    def __init__(self, websocket_url, project_id, topic_name, symbols=None):
+    def __init__(self, websocket_url, project_id, topic_name, symbols=None, include_trades=True, protocol=JSON_PROTOCOL,
+                 max_in_flight=1000, max_in_flight_bytes=10 * 1024 * 1024, batch_max_messages=100,
+                 batch_max_bytes=1024 * 1024, batch_max_latency=0.01, envelope_max_records=1,
+                 envelope_max_delay=0.1, envelope_max_bytes=512 * 1024, spool_dir=None,
+                 spool_segment_size=64 * 1024 * 1024, spool_max_bytes=8 * 1024 * 1024 * 1024,
+                 spool_sync_interval=0.05, replay_max_in_flight=100, conflate=None,
+                 compression=None, compression_min_bytes=512, compression_level=6, stats_interval=60):
         """
         Initialize the publisher
         
@@ -31,59 +79,297 @@ class MT5PubSubPublisher:
             project_id: Google Cloud project ID
             topic_name: Pub/Sub topic name
             symbols: List of symbols to subscribe to
+            include_trades: Whether to subscribe to and publish trade updates
+            protocol: WebSocket wire protocol, "json" or "binary-v1"
+            max_in_flight: Most unacknowledged publishes before reading pauses
+            max_in_flight_bytes: Most unacknowledged payload bytes before reading pauses
+            batch_max_messages: Pub/Sub client batch size in messages
+            batch_max_bytes: Pub/Sub client batch size in bytes
+            batch_max_latency: Seconds the Pub/Sub client waits to fill a batch
+            envelope_max_records: Records packed per Pub/Sub message (1: one record per message)
+            envelope_max_delay: Seconds the first record of an envelope may wait for more
+            envelope_max_bytes: Approximate size at which an envelope is sent
+            spool_dir: Directory of the on-disk spool; None publishes without one
+            spool_segment_size: Size of each spool segment file
+            spool_max_bytes: Most disk space the spool may take
+            spool_sync_interval: Seconds between flushes of the spool to disk
+            replay_max_in_flight: Most spooled messages being sent again at once
+            conflate: Per-symbol conflation policies for price updates, e.g. "*=bucket:0.25"
+            compression: "zlib" or "zstd" to compress message data; None sends it as is
+            compression_min_bytes: Smallest message data that is compressed
+            compression_level: zlib or zstd compression level
+            stats_interval: Seconds between publish statistics log lines
         """
         self.websocket_url = websocket_url
         self.project_id = project_id
         self.topic_name = topic_name
         self.symbols = symbols or ["EURUSD", "GBPUSD", "USDJPY", "XAUUSD"]
+        self.include_trades = include_trades
+        self.protocol = protocol
+        self.symbol_names = {}  # Symbol id to name, from the server's symbol_table
         self.publisher = None
         self.topic_path = None
         self.running = False
+        self.loop = None
+        self.websocket = None
         self.reconnect_delay = 5  # seconds
+        self.window = InFlightWindow(max_in_flight, max_in_flight_bytes)
+        self.batch_max_messages = batch_max_messages
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_max_latency = batch_max_latency
+        self.envelope = (EnvelopePacker(envelope_max_records, envelope_max_delay, envelope_max_bytes)
+                         if envelope_max_records > 1 else None)
+        self.envelope_pending = asyncio.Event()  # Set when the envelope has records waiting for the timer
+        self.spool = (PublishSpool(spool_dir, spool_segment_size, spool_max_bytes)
+                      if spool_dir else None)
+        self.spool_sync_interval = spool_sync_interval
+        self.spool_pending = asyncio.Event()  # Set when the spool has messages for the replay task
+        self.replay_slots = asyncio.Semaphore(replay_max_in_flight)
+        self.replay_backoff = 0.0
+        self.replay_failing = False  # A publish failed since the replay task last backed off
+        self.conflator = Conflator(parse_policies(conflate)) if conflate else None
+        self.conflated_pending = asyncio.Event()  # Set when the conflator holds quotes for the timer
+        self.encoder = (PayloadEncoder(compression, compression_min_bytes, compression_level)
+                        if compression else None)
+        self.stats_interval = stats_interval
         
     def setup_publisher(self):
         """Set up the Pub/Sub publisher client"""
         try:
-            self.publisher = pubsub_v1.PublisherClient()
+            batch_settings = pubsub_v1.types.BatchSettings(
+                max_messages=self.batch_max_messages,
+                max_bytes=self.batch_max_bytes,
+                max_latency=self.batch_max_latency,
+            )
+            # The in-flight window is the flow control. The client's own counts
+            # serialized sizes, so it would block the event loop before the window
+            # fills and reject any message over its byte limit outright.
+            flow_control = pubsub_v1.types.PublishFlowControl(
+                limit_exceeded_behavior=pubsub_v1.types.LimitExceededBehavior.IGNORE,
+            )
+            self.publisher = pubsub_v1.PublisherClient(
+                batch_settings=batch_settings,
+                publisher_options=pubsub_v1.types.PublisherOptions(flow_control=flow_control),
+            )
             self.topic_path = self.publisher.topic_path(self.project_id, self.topic_name)
             logger.info(f"Pub/Sub publisher initialized for topic: {self.topic_path}")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize Pub/Sub publisher: {e}")
             return False
+
+    def setup_spool(self):
+        """Open the on-disk spool, picking up messages a previous run left unacknowledged"""
+        if self.spool is None:
+            return True
+        try:
+            if self.spool.open():
+                self.spool_pending.set()
+            logger.info(f"Spooling messages to {self.spool.directory}")
+            return True
+        except OSError as e:
+            logger.error(f"Failed to open spool at {self.spool.directory}: {e}")
+            return False
         
     async def publish_message(self, message):
-        """Publish a message to Pub/Sub"""
+        """Publish a message to Pub/Sub unless conflation drops or holds it"""
+        if self.conflator is not None and message.get("type") == "price_update" and "update_type" not in message:
+            message = self.conflator.add(message)
+            if message is None:
+                if self.conflator.held:
+                    self.conflated_pending.set()
+                return True
+        return await self._publish_record(message)
+
+    async def _publish_record(self, message):
+        """Publish a message on its own or in the pending envelope"""
+        # Convert message to JSON string
+        record = json.dumps(message)
+        if self.envelope is None:
+            return await self._publish(record.encode("utf-8"), f"{message.get('type')} - {message.get('symbol', '')}")
+
+        envelope = self.envelope.add(record)
+        if envelope is not None:
+            return await self._publish(envelope, f"envelope of {self.envelope.last_count} records")
+        self.envelope_pending.set()
+        return True
+
+    async def flush_envelopes(self):
+        """Send the pending envelope once its first record has waited envelope_max_delay"""
+        while self.running:
+            delay = self.envelope.due()
+            if delay is None:
+                self.envelope_pending.clear()
+                await self.envelope_pending.wait()
+            elif delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                await self._publish(self.envelope.flush(), f"envelope of {self.envelope.last_count} records")
+
+    async def flush_conflated(self):
+        """Publish the quotes the conflator held once their window closes"""
+        while self.running:
+            delay = self.conflator.due()
+            if delay is None:
+                self.conflated_pending.clear()
+                await self.conflated_pending.wait()
+            elif delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                for message in self.conflator.flush():
+                    await self._publish_record(message)
+
+    async def _publish(self, data, description):
+        """Hand encoded data to the Pub/Sub client, spooling it first if there is a spool
+
+        Without a spool this waits while the in-flight window is full. With
+        one it never waits: the data stays in the spool for the replay task.
+        """
+        seq = None
+        if self.spool is not None:
+            # Stay behind older spooled messages so they are sent in order
+            sending = not self.spool.unsent and not self.window.full(len(data))
+            seq = self.spool.append(data, sending)
+            if seq is None:
+                logger.warning(f"Spool is full, publishing {description} without it")
+            elif not sending:
+                self.spool_pending.set()
+                return True
+        await self.window.acquire(len(data))
+        return self._send(data, description, seq)
+
+    def _send(self, data, description, seq=None, replayed=False):
+        """Publish data the window has room for; seq is its spool record, if any"""
         try:
-            # Convert message to JSON string and encode as bytes
-            data = json.dumps(message).encode("utf-8")
-            
-            # Publish the message
-            future = self.publisher.publish(self.topic_path, data)
-            
-            # Log after successful publish
-            msg_id = await asyncio.wrap_future(future)
-            logger.info(f"Published message {msg_id} for {message.get('type')} - {message.get('symbol', '')}")
-            return True
+            if self.encoder is None:
+                future = self.publisher.publish(self.topic_path, data)
+            else:
+                payload, attributes = self.encoder.encode(data)
+                future = self.publisher.publish(self.topic_path, payload, **attributes)
         except Exception as e:
-            logger.error(f"Error publishing message: {e}")
+            self.window.cancel(len(data))
+            logger.error(f"Error publishing {description}: {e}")
+            if seq is not None:
+                self._spool_failed(seq, e)
+            if replayed:
+                self.replay_slots.release()
             return False
+
+        self.window.track(future, len(data), partial(self._publish_done, description, seq, replayed))
+        return True
+
+    def _publish_done(self, description, seq, replayed, future):
+        """Log the outcome of a publish and settle its spool record; runs on the event loop"""
+        if replayed:
+            self.replay_slots.release()
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            logger.error(f"Error publishing {description}: {error or 'cancelled'}")
+            if seq is not None:
+                self._spool_failed(seq, error)
+        else:
+            logger.debug(f"Published message {future.result()} for {description}")
+            if seq is not None:
+                self.spool.ack(seq)
+                self.replay_backoff = 0.0
+                self.replay_failing = False
+
+    def _spool_failed(self, seq, error=None):
+        """Return a record to the spool and slow down the replay task while publishing fails
+
+        A record that can never be published, such as one over the size limit,
+        is dropped instead; retrying it would hold back every record after it.
+        """
+        if isinstance(error, (TypeError, ValueError, InvalidArgument)):
+            logger.error(f"Dropping spooled message {seq}, which Pub/Sub will not accept: {error}")
+            self.spool.ack(seq)
+            return
+        self.spool.nack(seq)
+        self.replay_failing = True
+        self.spool_pending.set()
+
+    async def replay_spool(self):
+        """Send spooled messages oldest first, at most replay_max_in_flight at a time"""
+        while self.running:
+            if not self.spool.unsent:
+                self.spool_pending.clear()
+                await self.spool_pending.wait()
+                continue
+            if self.replay_failing:
+                # Probe with one message per backoff period until publishing succeeds again
+                self.replay_failing = False
+                self.replay_backoff = min(max(2 * self.replay_backoff, 1.0), 30.0)
+                logger.warning(f"Publishing is failing; retrying {self.spool.unsent} spooled messages in {self.replay_backoff:.0f}s")
+                await asyncio.sleep(self.replay_backoff)
+            await self.replay_slots.acquire()
+            records = self.spool.take(1)
+            if not records:
+                self.replay_slots.release()
+                continue
+            seq, data = records[0]
+            await self.window.acquire(len(data))
+            self._send(data, f"spooled message {seq}", seq, replayed=True)
+
+    async def sync_spool(self):
+        """Flush the spool to disk every spool_sync_interval seconds"""
+        while self.running:
+            await asyncio.sleep(self.spool_sync_interval)
+            self.spool.sync()
+
+    async def log_stats(self):
+        """Periodically log publish throughput, failures and window usage"""
+        last_published, last_time = self.window.published, time.monotonic()
+        while self.running:
+            await asyncio.sleep(self.stats_interval)
+            stats = self.window.stats()
+            now = time.monotonic()
+            rate = (stats["published"] - last_published) / (now - last_time)
+            last_published, last_time = stats["published"], now
+            packed = f", {self.envelope.packed} records in {self.envelope.envelopes} envelopes" if self.envelope else ""
+            conflated = ""
+            if self.conflator is not None:
+                counts = self.conflator.stats()
+                conflated = f", conflated {counts['in']} price updates to {counts['out']}"
+            compressed = ""
+            if self.encoder is not None:
+                codec = self.encoder.stats()
+                compressed = (f", compressed {codec['compressed']} messages {codec['ratio']:.1f}x "
+                              f"in {codec['seconds']:.1f}s ({codec['skipped']} below the threshold)")
+            spooled = ""
+            if self.spool is not None:
+                spool = self.spool.stats()
+                spooled = (f", spool {spool['unsent']} waiting in {spool['segments']} segments "
+                           f"({spool['bytes'] / 1024 / 1024:.0f} MB), {spool['returned']} returned after failures")
+            logger.info(
+                f"Published {stats['published']} ({rate:.1f}/s), failed {stats['failed']}, "
+                f"in flight {stats['in_flight']}, waited for the window {stats['waits']} times "
+                f"({stats['wait_seconds']:.1f}s){conflated}{packed}{compressed}{spooled}"
+            )
         
     async def connect_and_publish(self):
         """Connect to MT5 WebSocket server and publish messages to Pub/Sub"""
         self.running = True
+        self.loop = asyncio.get_running_loop()
+        stats_task = asyncio.create_task(self.log_stats())
+        flush_task = asyncio.create_task(self.flush_envelopes()) if self.envelope else None
+        conflate_task = asyncio.create_task(self.flush_conflated()) if self.conflator else None
+        spool_tasks = ([asyncio.create_task(self.replay_spool()), asyncio.create_task(self.sync_spool())]
+                       if self.spool else [])
         
         while self.running:
             try:
                 logger.info(f"Connecting to WebSocket server at {self.websocket_url}")
                 async with websockets.connect(self.websocket_url) as websocket:
+                    self.websocket = websocket
                     # Subscribe to symbols and trade updates
                     subscription = {
                         "type": "subscription",
                         "action": "subscribe",
                         "symbols": self.symbols,
-                        "include_trades": True
+                        "include_trades": self.include_trades
                     }
+                    if self.protocol != JSON_PROTOCOL:
+                        subscription["protocol"] = self.protocol
                     await websocket.send(json.dumps(subscription))
                     logger.info(f"Subscription request sent for symbols: {self.symbols}")
                     
@@ -91,18 +377,27 @@ class MT5PubSubPublisher:
                     while self.running:
                         try:
                             message = await websocket.recv()
-                            data = json.loads(message)
-                            
-                            # Log message type for debugging
-                            msg_type = data.get("type", "unknown")
-                            
-                            # Only publish price_update and trade_update messages
-                            if msg_type in ["price_update", "trade_update"]:
-                                await self.publish_message(data)
-                            elif msg_type == "subscription_confirmation":
-                                logger.info(f"Successfully subscribed to {data.get('symbols')}")
-                            elif msg_type == "error":
-                                logger.error(f"WebSocket server error: {data.get('message')}")
+
+                            if isinstance(message, bytes):
+                                # Binary frame with one or more price updates
+                                for update in decode_frame(message, self.symbol_names):
+                                    await self.publish_message(update)
+                            else:
+                                data = json.loads(message)
+
+                                # Log message type for debugging
+                                msg_type = data.get("type", "unknown")
+
+                                # Only publish price updates and trade updates; the latter
+                                # carry the trade side in "type", so go by update_type
+                                if msg_type == "price_update" or "update_type" in data:
+                                    await self.publish_message(data)
+                                elif msg_type == "symbol_table":
+                                    self.symbol_names.update({symbol_id: symbol for symbol, symbol_id in data["symbols"].items()})
+                                elif msg_type == "subscription_confirmation":
+                                    logger.info(f"Successfully subscribed to {data.get('symbols')} using {data.get('protocol', JSON_PROTOCOL)}")
+                                elif msg_type == "error":
+                                    logger.error(f"WebSocket server error: {data.get('message')}")
                                 
                             # Send heartbeat to keep connection alive
                             if time.time() % 30 < 1:
@@ -110,27 +405,87 @@ class MT5PubSubPublisher:
                                 
                         except asyncio.CancelledError:
                             break
+                        except websockets.exceptions.ConnectionClosed:
+                            raise
                         except json.JSONDecodeError:
                             logger.error("Received invalid JSON from WebSocket")
+                        except ValueError as e:
+                            logger.error(f"Received invalid binary frame from WebSocket: {e}")
                         except Exception as e:
                             logger.error(f"Error processing WebSocket message: {e}")
                             break
                             
             except websockets.exceptions.ConnectionClosed:
-                logger.warning("WebSocket connection closed")
+                if self.running:
+                    logger.warning("WebSocket connection closed")
             except Exception as e:
                 logger.error(f"WebSocket connection error: {e}")
                 
             if self.running:
                 logger.info(f"Reconnecting in {self.reconnect_delay} seconds...")
                 await asyncio.sleep(self.reconnect_delay)
+
+        stats_task.cancel()
+        if conflate_task:
+            conflate_task.cancel()
+            for message in self.conflator.flush(force=True):
+                await self._publish_record(message)
+        if flush_task:
+            flush_task.cancel()
+            if len(self.envelope):
+                await self._publish(self.envelope.flush(), f"envelope of {self.envelope.last_count} records")
+        for task in spool_tasks:
+            task.cancel()
+        # Let the messages already handed to the client be acknowledged before exiting
+        await self.window.drain(timeout=30)
+        if self.spool is not None:
+            # Whatever is still unacknowledged is sent on the next start
+            self.spool.close()
+            logger.info(f"Spool closed with {self.spool.unsent + self.spool.in_flight} messages left to send")
+        logger.info(f"Publisher stopped: {self.window.published} published, {self.window.failed} failed")
                 
     def stop(self):
-        """Stop the publisher"""
+        """Stop the publisher; may be called from any thread"""
         logger.info("Stopping MT5 PubSub publisher...")
         self.running = False
+        # Closing the WebSocket wakes the loop even when no messages arrive
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close_websocket)
+
+    def _close_websocket(self):
+        if self.websocket is not None:
+            asyncio.ensure_future(self.websocket.close())
+
+async def run_publisher(publisher):
+    """Set up a publisher and run it until a shutdown signal"""
+    # Set up the Pub/Sub publisher
+    if not publisher.setup_publisher():
+        logger.error("Failed to set up Pub/Sub publisher. Exiting.")
+        return False
+    if not publisher.setup_spool():
+        logger.error("Failed to open the spool. Exiting.")
+        return False
+    
+    try:
+        # Register cleanup handler
+        import signal
+        def signal_handler(sig, frame):
+            logger.info("Received shutdown signal")
+            publisher.stop()
+        
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        
+        # Start the publisher
+        logger.info(f"Starting MT5 PubSub publisher for symbols: {publisher.symbols}")
+        await publisher.connect_and_publish()
+        
+    except KeyboardInterrupt:
+        logger.info("Publisher stopped by user")
+        publisher.stop()
+    return True
 
-async def main():
+def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="MT5 WebSocket to Pub/Sub Publisher")
     parser.add_argument("--url", default="ws://localhost:8765", 
@@ -141,42 +496,102 @@ async def main():
                        help="Pub/Sub topic name")
     parser.add_argument("--symbols", default="EURUSD,GBPUSD,USDJPY,XAUUSD",
                        help="Comma-separated list of symbols to subscribe to")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default=JSON_PROTOCOL,
+                       help="WebSocket wire protocol; binary-v1 sends prices as compact binary frames")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                       help="Unacknowledged publishes allowed before reading from the WebSocket pauses")
+    parser.add_argument("--max-in-flight-bytes", type=int, default=10 * 1024 * 1024,
+                       help="Unacknowledged payload bytes allowed before reading from the WebSocket pauses")
+    parser.add_argument("--batch-max-messages", type=int, default=100,
+                       help="Messages per Pub/Sub batch")
+    parser.add_argument("--batch-max-bytes", type=int, default=1024 * 1024,
+                       help="Bytes per Pub/Sub batch")
+    parser.add_argument("--batch-max-latency", type=float, default=0.01,
+                       help="Seconds to wait for a Pub/Sub batch to fill")
+    parser.add_argument("--envelope-max-records", type=int, default=1,
+                       help="Records packed per Pub/Sub message; above 1 needs a pubsub_function that reads envelopes")
+    parser.add_argument("--envelope-max-delay", type=float, default=0.1,
+                       help="Seconds the first record of an envelope may wait for more")
+    parser.add_argument("--envelope-max-bytes", type=int, default=512 * 1024,
+                       help="Approximate envelope size at which it is sent")
+    parser.add_argument("--spool-dir", default=None,
+                       help="Directory for the on-disk spool that keeps messages until Pub/Sub acknowledges them")
+    parser.add_argument("--spool-segment-size", type=int, default=64 * 1024 * 1024,
+                       help="Size of each spool segment file")
+    parser.add_argument("--spool-max-bytes", type=int, default=8 * 1024 * 1024 * 1024,
+                       help="Most disk space the spool may take")
+    parser.add_argument("--spool-sync-interval", type=float, default=0.05,
+                       help="Seconds between flushes of the spool to disk")
+    parser.add_argument("--replay-max-in-flight", type=int, default=100,
+                       help="Spooled messages sent again concurrently")
+    parser.add_argument("--conflate", default=None,
+                       help="Per-symbol price update conflation, as SYMBOL=POLICY:VALUE entries separated by commas; "
+                            "POLICY is bucket (first quote per VALUE seconds), min-move (quotes moving VALUE points) "
+                            "or last (latest quote per VALUE seconds), and * matches other symbols, "
+                            "e.g. \"XAUUSD=min-move:50,*=bucket:0.25\"")
+    parser.add_argument("--compression", choices=ENCODINGS, default=None,
+                       help="Compress message data; needs a pubsub_function that decompresses, and zstd needs the zstandard package")
+    parser.add_argument("--compression-min-bytes", type=int, default=512,
+                       help="Message data smaller than this is sent uncompressed")
+    parser.add_argument("--compression-level", type=int, default=6,
+                       help="zlib (1-9) or zstd (1-22) compression level")
+    parser.add_argument("--partitions", type=int, default=1,
+                       help="Split the symbols into this many partitions by a stable hash; "
+                            "without --partition, run one publisher process per partition")
+    parser.add_argument("--partition", type=int, default=None,
+                       help="Run only the publisher of this partition (0-based)")
+    parser.add_argument("--trade-partition", type=int, default=0,
+                       help="Partition whose publisher also publishes trade updates")
     
     args = parser.parse_args()
+    try:
+        # Reject bad settings here rather than in every partition's process
+        if args.conflate:
+            parse_policies(args.conflate)
+        if args.compression:
+            PayloadEncoder(args.compression)
+    except ValueError as e:
+        parser.error(str(e))
     
     # Convert symbols string to list
     symbols = args.symbols.split(",")
     
-    # Create and start the publisher
-    publisher = MT5PubSubPublisher(
+    publisher_kwargs = dict(
         websocket_url=args.url,
         project_id=args.project,
         topic_name=args.topic,
-        symbols=symbols
+        symbols=symbols,
+        protocol=args.protocol,
+        max_in_flight=args.max_in_flight,
+        max_in_flight_bytes=args.max_in_flight_bytes,
+        batch_max_messages=args.batch_max_messages,
+        batch_max_bytes=args.batch_max_bytes,
+        batch_max_latency=args.batch_max_latency,
+        envelope_max_records=args.envelope_max_records,
+        envelope_max_delay=args.envelope_max_delay,
+        envelope_max_bytes=args.envelope_max_bytes,
+        spool_dir=args.spool_dir,
+        spool_segment_size=args.spool_segment_size,
+        spool_max_bytes=args.spool_max_bytes,
+        spool_sync_interval=args.spool_sync_interval,
+        replay_max_in_flight=args.replay_max_in_flight,
+        conflate=args.conflate,
+        compression=args.compression,
+        compression_min_bytes=args.compression_min_bytes,
+        compression_level=args.compression_level
     )
-    
-    # Set up the Pub/Sub publisher
-    if not publisher.setup_publisher():
-        logger.error("Failed to set up Pub/Sub publisher. Exiting.")
+
+    if args.partitions > 1:
+        from publish_partitions import run_partition, run_partitions
+        if args.partition is None:
+            # Supervisor: one publisher process per partition
+            run_partitions(args.partitions, args.trade_partition, publisher_kwargs)
+        else:
+            run_partition(args.partition, args.partitions, args.trade_partition, publisher_kwargs)
         return
-    
-    try:
-        # Register cleanup handler
-        import signal
-        def signal_handler(sig, frame):
-            logger.info("Received shutdown signal")
-            publisher.stop()
-        
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
-        
-        # Start the publisher
-        logger.info(f"Starting MT5 PubSub publisher for symbols: {symbols}")
-        await publisher.connect_and_publish()
-        
-    except KeyboardInterrupt:
-        logger.info("Publisher stopped by user")
-        publisher.stop()
+
+    # Create and start the publisher
+    asyncio.run(run_publisher(MT5PubSubPublisher(**publisher_kwargs)))
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
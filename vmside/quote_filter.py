@@ -0,0 +1,88 @@
+import time
+from typing import Dict, Optional, Tuple
+
+
+class QuoteFilter:
+    """Per-symbol last-quote cache that only lets changed quotes through
+
+    A quote is emitted when its bid or ask moved by at least
+    ``min_move_points`` points since the last emitted quote, or when the
+    symbol has been silent for ``heartbeat_interval`` seconds. With the
+    defaults, only exact repeats are suppressed.
+    """
+
+    def __init__(self, min_move_points: float = 0.0, heartbeat_interval: Optional[float] = None):
+        """
+        Args:
+            min_move_points: Minimum bid or ask move, in points, for a quote to be emitted
+            heartbeat_interval: Emit an unchanged quote after this many seconds of silence
+        """
+        self.min_move_points = min_move_points
+        self.heartbeat_interval = heartbeat_interval
+        self.points: Dict[str, float] = {}  # Symbol point size, needed for min_move_points
+        self.last: Dict[str, Tuple[float, float, float]] = {}  # Symbol to (bid, ask, emitted_at)
+        self.emitted: Dict[str, int] = {}
+        self.suppressed: Dict[str, int] = {}
+        # Across all symbols, including forgotten ones
+        self.emitted_total = 0
+        self.suppressed_total = 0
+
+    def needs_point(self, symbol: str) -> bool:
+        """True if the symbol's point size must be set before filtering by move size"""
+        return self.min_move_points > 0 and symbol not in self.points
+
+    def set_point(self, symbol: str, point: float) -> None:
+        self.points[symbol] = point
+
+    def should_emit(self, symbol: str, bid: float, ask: float, now: Optional[float] = None) -> bool:
+        """Decide whether a quote is emitted and remember it if so"""
+        now = time.monotonic() if now is None else now
+        last = self.last.get(symbol)
+
+        if last is None:
+            emit = True
+        else:
+            last_bid, last_ask, emitted_at = last
+            if self.min_move_points > 0:
+                threshold = self.min_move_points * self.points.get(symbol, 0.0)
+                emit = abs(bid - last_bid) >= threshold or abs(ask - last_ask) >= threshold
+                # A zero threshold (point unknown) still suppresses exact repeats
+                emit = emit and (bid != last_bid or ask != last_ask)
+            else:
+                emit = bid != last_bid or ask != last_ask
+            if not emit and self.heartbeat_interval is not None:
+                emit = now - emitted_at >= self.heartbeat_interval
+
+        if emit:
+            self.last[symbol] = (bid, ask, now)
+            self.emitted[symbol] = self.emitted.get(symbol, 0) + 1
+            self.emitted_total += 1
+        else:
+            self.suppressed[symbol] = self.suppressed.get(symbol, 0) + 1
+            self.suppressed_total += 1
+        return emit
+
+    def heartbeat_due(self, symbol: str, now: Optional[float] = None) -> bool:
+        """True if the symbol's last emitted quote is at least heartbeat_interval old"""
+        last = self.last.get(symbol)
+        if self.heartbeat_interval is None or last is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - last[2] >= self.heartbeat_interval
+
+    def forget(self, symbol: str) -> None:
+        """Drop the cached quote, point and counters of a symbol nobody watches anymore"""
+        self.last.pop(symbol, None)
+        self.points.pop(symbol, None)
+        self.emitted.pop(symbol, None)
+        self.suppressed.pop(symbol, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Emitted and suppressed quote counts per symbol"""
+        return {
+            symbol: {
+                "emitted": self.emitted.get(symbol, 0),
+                "suppressed": self.suppressed.get(symbol, 0),
+            }
+            for symbol in set(self.emitted) | set(self.suppressed)
+        }
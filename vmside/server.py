@@ -5,10 +5,10 @@ import websockets
 import argparse
 import os
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
 import time
 import threading
-from datetime import timedelta , datetime
+from datetime import timedelta , datetime, timezone
 from dotenv import load_dotenv
 import asyncio
 import json
@@ -33,6 +33,21 @@ from mt5_trading import MT5Trading
 # Import your MT5 classes
 from mt5_base import MT5Base, SymbolPrice
 from mt5_trading import MT5Trading
+from mt5_executor import MT5Executor
+from loop_monitor import EventLoopLagMonitor
+from tick_capture import TickCapture
+from deal_cursor import DealHistoryCursor
+from position_diff import DEFAULT_TRACKED_FIELDS, PositionDiff, PositionDiffer
+from trade_journal import TradeJournal
+from client_queue import OVERFLOW_POLICIES, ClientConnection
+from broadcast import Broadcaster, encode_batch
+from quote_filter import QuoteFilter
+from subscriptions import SubscriptionRegistry
+from wire_protocol import PROTOCOLS, SymbolTable, encode_price_frame, encode_price_record
+from bar_aggregator import TIMEFRAMES, Bar, BarAggregator
+from poll_scheduler import PollScheduler
+from http_snapshot import SnapshotEndpoints, http_response
+from metrics import ServerMetrics
 
 # Configure logging
 logging.basicConfig(
@@ -56,33 +71,80 @@ import MetaTrader5 as mt5
 from collections import defaultdict
 
 class MT5WebSocketServer:
-    def __init__(self, host: str = "0.0.0.0", port: int = 8765, update_interval: int = 1):
+    def __init__(self, host: str = "0.0.0.0", port: int = 8765, update_interval: int = 1,
+                 capture_mode: str = "snapshot", tick_idle_interval: float = 0.05,
+                 position_fields: List[str] = DEFAULT_TRACKED_FIELDS, profit_interval: float = 5.0,
+                 journal_size: int = 10000,
+                 queue_size: int = 1000, overflow_policy: str = "conflate",
+                 min_move_points: float = 0.0, heartbeat_interval: float = None,
+                 bar_update_interval: float = 1.0, min_poll_interval: float = 0.1,
+                 max_poll_interval: float = 5.0, http_snapshots: bool = False,
+                 account_interval: float = 5.0,
+                 deal_cursor_file: Optional[str] = os.path.join(current_dir, "deal_cursor.json")):
         """
         Initialize the MT5 WebSocket Server
         
         Args:
             host: Host address to bind the server to (0.0.0.0 allows external connections)
             port: Port number for the WebSocket server
-            update_interval: Time in seconds between price updates
+            update_interval: Time in seconds between price updates of a symbol until
+                its tick rate is known; afterwards each symbol's interval adapts to it
+            capture_mode: "snapshot" polls the latest tick every update_interval,
+                "ticks" streams every tick via copy_ticks_from
+            tick_idle_interval: Seconds to wait in "ticks" mode when no new ticks arrived
+            position_fields: Position fields whose changes trigger a trade update
+            profit_interval: Minimum seconds between trade updates of positions whose
+                only change is in profit (or price_current/swap)
+            journal_size: Number of recent trade updates kept for reconnecting clients
+            queue_size: Maximum pending price updates per client
+            overflow_policy: Default handling of a full client queue
+                ("conflate", "drop_oldest" or "disconnect")
+            min_move_points: Minimum bid/ask move in points for a price update to be sent
+            heartbeat_interval: Resend an unchanged price after this many seconds (None: never)
+            bar_update_interval: Minimum seconds between two updates of the same bar in progress
+            min_poll_interval: Shortest adaptive interval between two polls of a symbol
+            max_poll_interval: Longest adaptive interval between two polls of a symbol
+            http_snapshots: Serve read-only HTTP GET endpoints (/prices, /positions,
+                /net_volume, /account) from memory on the WebSocket port
+            account_interval: Seconds between account info refreshes for /account
+            deal_cursor_file: Where the deal history cursor is kept across restarts (None: not kept)
         """
         self.host = host
         self.port = port
         self.update_interval = update_interval
+        self.capture_mode = capture_mode
+        self.tick_idle_interval = tick_idle_interval
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
         
-        # Load environment variables for MT5 credentials
-        load_dotenv()
-        
-        # Initialize MT5 client with credentials from environment variables
-        self.mt5_client = MT5Trading(
-            user=int(os.getenv("MT5_USER")),
-            password=os.getenv("MT5_PASSWORD"),
-            server=os.getenv("MT5_SERVER"), 
-            path=os.getenv("MT5_PATH")
-        )
+        # All MT5 calls run on the executor's thread, never on the event loop
+        self.mt5_client, self.mt5_executor = self._create_mt5_client()
+        self.loop_monitor = EventLoopLagMonitor()
+        self.loop_monitor_task = None
+        self.tick_capture = TickCapture()
+        # Only changed quotes are sent; repeats are counted as suppressed
+        self.quote_filter = QuoteFilter(min_move_points, heartbeat_interval)
+        # Snapshot polling interval per symbol, following its tick rate
+        self.poll_scheduler = PollScheduler(update_interval, min_poll_interval, max_poll_interval)
+        self.poll_wakeup = asyncio.Event()  # Set when a symbol needs polling sooner than scheduled
+        self.last_quotes: Dict[str, SymbolPrice] = {}  # Latest quote per polled symbol, for snapshots
+        self.quotes_version = 0  # Bumped whenever last_quotes changes
         
         self.connected_clients = set()
-        self.watched_symbols = {}  # Symbol to set of WebSocket clients
+        self.client_queues: Dict[object, ClientConnection] = {}  # Outbound queue per client
+        self.client_stats_task = None
+        self.broadcaster = Broadcaster(self.client_queues)
+        # Symbol <-> client subscriptions; only symbols with a subscriber are polled
+        self.subscriptions = SubscriptionRegistry(
+            on_activate=self._price_stream_added, on_deactivate=self._price_stream_removed)
+        # (symbol, timeframe) <-> client subscriptions to OHLC bars
+        self.bar_subscriptions = SubscriptionRegistry(
+            on_activate=self._bar_stream_added, on_deactivate=self._bar_stream_removed)
+        self.bar_aggregator = BarAggregator(update_interval=bar_update_interval)
+        self.stale_tick_cursors = set()  # Inactive symbols whose tick cursor is still held
+        self.symbol_table = SymbolTable()  # Symbol ids used by the binary protocol
         self.trade_subscribers = set()  # Clients subscribed to trade updates
+        self.position_delta_subscribers = set()  # Trade subscribers that want per-field deltas
         self.running = False
         self.price_update_task = None
         self.trade_update_task = None
@@ -90,32 +152,64 @@ class MT5WebSocketServer:
         # Store last known positions to detect changes
         self.last_positions = {}
         self.last_history_positions = {}
-        self.last_deals = set()
-    # Store trade history for new clients requesting missed data
-        self.trade_history = {}
-        self.transaction_history = {}
+        self.position_messages = {}  # Ticket to the encoded latest full update
+        self.positions_version = 0  # Bumped whenever position_messages changes
+        self.positions_refreshed_at = None  # Monotonic time of the last position diff
+        self.positions_lock = asyncio.Lock()  # One position diff at a time
+        self.account_info = None  # Latest account summary, refreshed for the HTTP endpoints
+        self.account_version = 0
+        self.account_interval = account_interval
+        self.account_task = None
+        self.http_endpoints = SnapshotEndpoints(self) if http_snapshots else None
+        # Counters, gauges and stage timings served on /metrics
+        self.metrics = ServerMetrics(self)
+        self.position_differ = PositionDiffer(position_fields, throttle_interval=profit_interval)
+        # Incremental deal history reader; the cursor survives restarts
+        self.deal_cursor = DealHistoryCursor(state_file=deal_cursor_file)
+        # Recent trade updates for clients reconnecting with last_seq/last_transaction_id
+        self.trade_journal = TradeJournal(capacity=journal_size)
         
+    def _create_mt5_client(self):
+        """MT5 client and the executor its calls run on"""
+        # Load environment variables for MT5 credentials
+        load_dotenv()
+
+        # Initialize MT5 client with credentials from environment variables
+        mt5_client = MT5Trading(
+            user=int(os.getenv("MT5_USER")),
+            password=os.getenv("MT5_PASSWORD"),
+            server=os.getenv("MT5_SERVER"),
+            path=os.getenv("MT5_PATH")
+        )
+        return mt5_client, MT5Executor(mt5_client)
+
     async def register_client(self, websocket):
         """Register a new client connection"""
         self.connected_clients.add(websocket)
+        client = ClientConnection(websocket, max_queue=self.queue_size, overflow_policy=self.overflow_policy,
+                                  send_latency=self.metrics.client_send)
+        client.start()
+        self.client_queues[websocket] = client
         logger.info(f"Client connected. Total clients: {len(self.connected_clients)}")
         
     async def unregister_client(self, websocket):
         """Unregister a client connection"""
         self.connected_clients.remove(websocket)
+        client = self.client_queues.pop(websocket, None)
+        if client:
+            await client.close()
+            self.metrics.client_closed(client)
         
-        # Remove client from all watched symbols
-        for symbol in list(self.watched_symbols.keys()):
-            if websocket in self.watched_symbols[symbol]:
-                self.watched_symbols[symbol].remove(websocket)
-                
-            # Clean up empty symbol subscriptions
-            if not self.watched_symbols[symbol]:
-                del self.watched_symbols[symbol]
-                
+        # Remove client from the symbols and bar streams it watched
+        self.subscriptions.remove_client(websocket)
+        self.bar_subscriptions.remove_client(websocket)
+        for symbol in self.poll_scheduler.release(websocket):
+            self._requested_interval_changed(symbol)
+
         # Remove from trade subscribers
         if websocket in self.trade_subscribers:
             self.trade_subscribers.remove(websocket)
+        self.position_delta_subscribers.discard(websocket)
                 
         logger.info(f"Client disconnected. Total clients: {len(self.connected_clients)}")
 
@@ -126,148 +220,264 @@ class MT5WebSocketServer:
         include_trades = message.get("include_trades", False)
         last_trade_id = message.get("last_trade_id", 0)
         last_transaction_id = message.get("last_transaction_id", 0)
+        position_deltas = message.get("position_deltas", False)
+        last_seq = message.get("last_seq")
+        journal_epoch = message.get("journal_epoch")
+        overflow_policy = message.get("overflow_policy")
+        batch = message.get("batch", False)
+        protocol = message.get("protocol")
+        bars = message.get("bars")
+        update_interval = message.get("update_interval")
 
         if not symbols or not isinstance(symbols, list):
-            await websocket.send(json.dumps({
+            self._send(websocket, json.dumps({
                 "type": "error",
                 "message": "Invalid symbols format. Expected a list."
             }))
             return
 
+        if overflow_policy is not None and overflow_policy not in OVERFLOW_POLICIES:
+            self._send(websocket, json.dumps({
+                "type": "error",
+                "message": f"Invalid overflow_policy. Expected one of: {', '.join(OVERFLOW_POLICIES)}"
+            }))
+            return
+
+        if protocol is not None and protocol not in PROTOCOLS:
+            self._send(websocket, json.dumps({
+                "type": "error",
+                "message": f"Unsupported protocol. Expected one of: {', '.join(PROTOCOLS)}"
+            }))
+            return
+
+        if bars is not None and (not isinstance(bars, list) or not bars or not set(bars) <= TIMEFRAMES.keys()):
+            self._send(websocket, json.dumps({
+                "type": "error",
+                "message": f"Invalid bars. Expected a list of timeframes from: {', '.join(TIMEFRAMES)}"
+            }))
+            return
+
+        if update_interval is not None and (
+                isinstance(update_interval, bool) or not isinstance(update_interval, (int, float)) or update_interval <= 0):
+            self._send(websocket, json.dumps({
+                "type": "error",
+                "message": "Invalid update_interval. Expected a positive number of seconds."
+            }))
+            return
+
         if action == "subscribe":
-            # Add client to each symbol's subscription list
-            for symbol in symbols:
-                if symbol not in self.watched_symbols:
-                    self.watched_symbols[symbol] = set()
-                self.watched_symbols[symbol].add(websocket)
+            client = self.client_queues[websocket]
+            if protocol and protocol != client.protocol:
+                # Pending prices were queued in the old encoding
+                client.clear_prices()
+                client.protocol = protocol
+            if overflow_policy:
+                client.set_overflow_policy(overflow_policy)
+            client.batch = bool(batch)
+
+            # A bars subscription replaces the symbols' price updates with OHLC bars
+            if bars:
+                self.bar_subscriptions.subscribe(websocket, self._bar_streams(symbols, bars))
+            else:
+                # Add client to each symbol's subscription list
+                self.subscriptions.subscribe(websocket, symbols)
+                self._request_interval(websocket, symbols, update_interval)
 
             # Add to trade subscribers if requested
+            new_trade_subscriber = include_trades and websocket not in self.trade_subscribers
+            resuming = last_trade_id > 0 or last_transaction_id > 0 or last_seq is not None
+            if new_trade_subscriber and not resuming:
+                # Before the client is a trade subscriber, so it does not also get the
+                # refresh as live updates. If they cannot be refreshed, the client
+                # gets the changes once update_trades next diffs them
+                await self._refresh_positions()
             if include_trades:
                 self.trade_subscribers.add(websocket)
+                if position_deltas:
+                    self.position_delta_subscribers.add(websocket)
+                else:
+                    self.position_delta_subscribers.discard(websocket)
 
                 # If client provides last trade/transaction IDs, send missed updates
-                if last_trade_id > 0 or last_transaction_id > 0:
-                    logger.info(f"Client requesting missed trades since trade_id: {last_trade_id}, transaction_id: {last_transaction_id}")
-                    await self.send_missed_trades(websocket, last_trade_id, last_transaction_id)
+                if resuming:
+                    logger.info(f"Client requesting missed trades since trade_id: {last_trade_id}, transaction_id: {last_transaction_id}, seq: {last_seq}")
+                    await self.send_missed_trades(websocket, last_trade_id, last_transaction_id, last_seq, journal_epoch)
+                elif new_trade_subscriber:
+                    # No resume point: start the client from the current open positions
+                    for message in list(self.position_messages.values()):
+                        self._send(websocket, message)
 
-            logger.info(f"Client subscribed to: {symbols}. Total watched symbols: {len(self.watched_symbols)}")
+            logger.info(f"Client subscribed to: {symbols}{f' bars {bars}' if bars else ''}. Total watched symbols: {len(self._active_symbols())}")
 
             # Send confirmation
-            await websocket.send(json.dumps({
+            self._send(websocket, json.dumps({
                 "type": "subscription_confirmation",
                 "symbols": symbols,
                 "trades_included": include_trades,
+                "position_deltas": include_trades and position_deltas,
+                "journal_epoch": self.trade_journal.epoch,
+                "overflow_policy": client.overflow_policy,
+                "batch": client.batch,
+                "protocol": client.protocol,
+                "bars": bars or [],
+                "update_interval": update_interval,
                 "message": "Successfully subscribed"
             }))
+            if bars:
+                # Bars already in progress, so the client need not wait for the next update
+                for symbol, timeframe in self._bar_streams(symbols, bars):
+                    bar = self.bar_aggregator.current(symbol, timeframe)
+                    if bar is not None:
+                        self._send(websocket, self._bar_message(bar))
+            else:
+                if client.binary:
+                    # Ids for every symbol the client watches, before any frame uses them
+                    self._send(websocket, json.dumps(self.symbol_table.message(sorted(self.subscriptions.symbols_of(websocket)))))
+                # Latest known quotes, so the client need not wait for the next poll
+                self._send_cached_quotes(websocket, client, symbols)
 
         elif action == "unsubscribe":
             # Remove client from each symbol's subscription list
-            for symbol in symbols:
-                if symbol in self.watched_symbols and websocket in self.watched_symbols[symbol]:
-                    self.watched_symbols[symbol].remove(websocket)
-
-                    # Clean up empty symbol subscriptions
-                    if not self.watched_symbols[symbol]:
-                        del self.watched_symbols[symbol]
+            if bars:
+                self.bar_subscriptions.unsubscribe(websocket, self._bar_streams(symbols, bars))
+            else:
+                self.subscriptions.unsubscribe(websocket, symbols)
+                self._request_interval(websocket, symbols, None)
 
             # Remove from trade subscribers if explicitly specified
             if message.get("unsubscribe_trades", False) and websocket in self.trade_subscribers:
                 self.trade_subscribers.remove(websocket)
+                self.position_delta_subscribers.discard(websocket)
 
-            logger.info(f"Client unsubscribed from: {symbols}. Total watched symbols: {len(self.watched_symbols)}")
+            logger.info(f"Client unsubscribed from: {symbols}{f' bars {bars}' if bars else ''}. Total watched symbols: {len(self._active_symbols())}")
 
             # Send confirmation
-            await websocket.send(json.dumps({
+            self._send(websocket, json.dumps({
                 "type": "unsubscription_confirmation",
                 "symbols": symbols,
+                "bars": bars or [],
                 "message": "Successfully unsubscribed"
             }))
 
         else:
-            await websocket.send(json.dumps({
+            self._send(websocket, json.dumps({
                 "type": "error",
                 "message": f"Unknown action: {action}"
             }))
 
-    async def send_missed_trades(self, websocket, last_trade_id, last_transaction_id):
-        """Send missed trades to a newly connected client"""
+    def _send_cached_quotes(self, websocket, client: ClientConnection, symbols: List[str]) -> None:
+        """Send the cached quote of each symbol in the client's protocol"""
+        quotes = [(symbol, self.last_quotes[symbol]) for symbol in symbols if symbol in self.last_quotes]
+        if not quotes:
+            return
+        if client.binary:
+            records = [self._price_record(symbol, quote.bid, quote.ask, quote.time_msc)
+                       for symbol, quote in quotes if self.symbol_table.id_for(symbol) is not None]
+            if records:
+                self._send(websocket, encode_price_frame(records))
+            return
+
+        messages = [self._quote_message(symbol, quote) for symbol, quote in quotes]
+        if client.batch and len(messages) > 1:
+            self._send(websocket, encode_batch(messages))
+        else:
+            for message in messages:
+                self._send(websocket, message)
+
+    async def handle_snapshot(self, websocket, message):
+        """Reply with the cached quotes and open positions without subscribing
+
+        Quotes come from memory and are known for symbols that some client is
+        subscribed to; other requested symbols are listed as missing. Positions
+        are kept current while there is a trade subscriber or the HTTP
+        endpoints are on; otherwise they are refreshed from MT5 first, and if
+        that fails the reply has positions_stale set. The reply's seq and
+        journal_epoch can be passed as last_seq in a later subscription to
+        continue from the snapshot without a gap.
+        """
+        symbols = message.get("symbols")
+        include_trades = message.get("include_trades", True)
+
+        if symbols is None:
+            symbols = sorted(self.last_quotes)
+        elif not isinstance(symbols, list):
+            self._send(websocket, json.dumps({
+                "type": "error",
+                "message": "Invalid symbols format. Expected a list."
+            }))
+            return
+
+        positions_stale = include_trades and not await self._refresh_positions()
+        quotes = [self._quote_message(symbol, self.last_quotes[symbol]) for symbol in symbols if symbol in self.last_quotes]
+        positions = list(self.position_messages.values()) if include_trades else []
+        header = json.dumps({
+            "type": "snapshot",
+            "journal_epoch": self.trade_journal.epoch,
+            "seq": self.trade_journal.next_seq - 1,
+            "missing": [symbol for symbol in symbols if symbol not in self.last_quotes],
+            "positions_stale": positions_stale,
+        })
+        # Splice the already-encoded messages in rather than decoding and re-encoding them
+        self._send(websocket, header[:-1] + ', "prices": [' + ", ".join(quotes) + '], "positions": [' + ", ".join(positions) + "]}")
+
+    async def send_missed_trades(self, websocket, last_trade_id, last_transaction_id, last_seq=None, journal_epoch=None):
+        """Send missed trades to a reconnecting client
+
+        Missed updates come from the in-memory trade journal and position map. MT5
+        history is only queried when the gap reaches past what the journal holds.
+        """
         try:
-            # Connect to MT5 to get history
-            with self.mt5_client.connection() as client:
-                if not client:
-                    logger.error("Could not connect to MT5 to retrieve missed trades")
+            # Exact replay by sequence number when the client tracks it
+            if last_seq is not None:
+                messages = self.trade_journal.since_seq(last_seq, journal_epoch)
+                if messages is not None:
+                    for message in messages:
+                        self._send(websocket, message)
+                    logger.info(f"Replayed {len(messages)} trade updates since seq {last_seq} from the journal")
                     return
+                logger.info(f"seq {last_seq} cannot be served from the trade journal, falling back to trade ids")
 
-                # Get current open positions
-                positions = mt5.positions_get() or []
-                current_positions = {p.ticket: p._asdict() for p in positions}
-
-                # Send all current positions that the client hasn't seen yet
-                for ticket, position in current_positions.items():
-                    if int(ticket) > last_trade_id:
-                        timestamp = datetime.now().isoformat()
-                        update = {
-                            "type": "trade_update",
-                            "update_type": "position",
-                            "timestamp": timestamp,
-                            "trade_id": ticket,
-                            "symbol": position['symbol'],
-                            "type": "buy" if position['type'] == mt5.ORDER_TYPE_BUY else "sell",
-                            "volume": position['volume'],
-                            "price": position['price_open'],
-                            "profit": position['profit'],
-                            "sl": position['sl'],
-                            "tp": position['tp']
-                        }
-
-                        try:
-                            await websocket.send(json.dumps(update))
-                            logger.info(f"Sent missed position update for trade_id: {ticket}")
-                        except Exception as e:
-                            logger.error(f"Error sending missed trade update: {e}")
-
-                # Get recent history for transactions
-                from_date = datetime.now() - timedelta(days=7)  # Get last week's history
-                history_deals = mt5.history_deals_get(from_date, datetime.now()) or []
-
-                # Keep track of sent deals to avoid duplicates
-                sent_deals = set()
-
-                # Send closed positions that the client hasn't seen yet
-                for deal in history_deals:
-                    if deal.entry == mt5.DEAL_ENTRY_OUT and deal.ticket > last_transaction_id:
-                        if deal.ticket in sent_deals:
-                            continue
-                        
-                        sent_deals.add(deal.ticket)
-                        deal_dict = deal._asdict()
-
-                        # Prepare transaction update
-                        timestamp = datetime.fromtimestamp(deal_dict['time']).isoformat()
-                        update = {
-                            "type": "trade_update",
-                            "update_type": "transaction",
-                            "timestamp": timestamp,
-                            "transaction_id": deal_dict['ticket'],
-                            "symbol": deal_dict['symbol'],
-                            "type": "close_buy" if deal_dict['type'] == mt5.DEAL_TYPE_SELL else "close_sell",
-                            "volume": deal_dict['volume'],
-                            "price": deal_dict['price'],
-                            "commission": deal_dict['commission'],
-                            "swap": deal_dict['swap'],
-                            "profit": deal_dict['profit']
-                        }
-
-                        try:
-                            await websocket.send(json.dumps(update))
-                            logger.info(f"Sent missed transaction update for transaction_id: {deal_dict['ticket']}")
-                        except Exception as e:
-                            logger.error(f"Error sending missed transaction update: {e}")
-
-                logger.info(f"Finished sending missed trade updates")
+            # Send all current positions that the client hasn't seen yet, as
+            # encoded when they were broadcast
+            for ticket, message in list(self.position_messages.items()):
+                if int(ticket) > last_trade_id:
+                    self._send(websocket, message)
+                    logger.info(f"Sent missed position update for trade_id: {ticket}")
+
+            # Closed positions the client hasn't seen yet
+            messages = self.trade_journal.transactions_since(last_transaction_id)
+            if messages is None:
+                logger.info(f"transaction_id {last_transaction_id} is older than the trade journal, querying MT5 history")
+                messages = await self._missed_transactions_from_history(last_transaction_id)
+
+            for message in messages:
+                self._send(websocket, message)
+            logger.info(f"Finished sending missed trade updates ({len(messages)} transactions)")
 
+        except ConnectionError:
+            logger.error("Could not connect to MT5 to retrieve missed trades")
         except Exception as e:
-            logger.error(f"Error retrieving missed trades: {e}")
+            logger.error(f"Error sending missed trades: {e}")
+
+    async def _missed_transactions_from_history(self, last_transaction_id) -> List[str]:
+        """Encoded transaction updates after last_transaction_id, read from MT5 history"""
+        # Get recent history for transactions
+        from_date = datetime.now() - timedelta(days=7)  # Get last week's history
+        history_deals = await self.mt5_executor.history_deals_get(from_date, datetime.now())
+
+        # Keep track of sent deals to avoid duplicates
+        sent_deals = set()
+        messages = []
+
+        for deal in history_deals:
+            if deal.entry == mt5.DEAL_ENTRY_OUT and deal.ticket > last_transaction_id:
+                if deal.ticket in sent_deals:
+                    continue
+
+                sent_deals.add(deal.ticket)
+                messages.append(json.dumps(self._transaction_update(deal._asdict())))
+
+        return messages
 
     async def handle_client(self, websocket):
         """Handle client WebSocket connections"""
@@ -281,18 +491,20 @@ class MT5WebSocketServer:
                     
                     if message_type == "subscription":
                         await self.handle_subscription(websocket, data)
+                    elif message_type == "snapshot":
+                        await self.handle_snapshot(websocket, data)
                     elif message_type == "ping":
-                        await websocket.send(json.dumps({"type": "pong", "time": datetime.now().isoformat()}))
+                        self._send(websocket, json.dumps({"type": "pong", "time": datetime.now().isoformat()}))
                     else:
                         logger.warning(f"Unknown message type: {message_type}")
-                        await websocket.send(json.dumps({
+                        self._send(websocket, json.dumps({
                             "type": "error",
                             "message": f"Unknown message type: {message_type}"
                         }))
                         
                 except json.JSONDecodeError:
                     logger.warning("Received invalid JSON")
-                    await websocket.send(json.dumps({
+                    self._send(websocket, json.dumps({
                         "type": "error",
                         "message": "Invalid JSON format"
                     }))
@@ -306,188 +518,560 @@ class MT5WebSocketServer:
         """Fetch and broadcast trade updates to subscribed clients"""
         logger.info("Starting trade update task")
 
-        # Store trades by ID for efficient lookups and history tracking
-        trade_history = {}
-        transaction_history = {}
-
         while self.running:
-            if not self.trade_subscribers:
+            # Positions are also kept current for the HTTP endpoints
+            if not self.trade_subscribers and not self.http_endpoints:
                 await asyncio.sleep(self.update_interval)
                 continue
 
+            cycle_start = time.perf_counter()
             try:
-                # Get current positions from MT5
-                with self.mt5_client.connection() as client:
-                    if not client:
-                        await asyncio.sleep(self.update_interval)
-                        logger.warning("MT5 client not connected")
-                        continue
-                    
-                    # Get current open positions
-                    positions = mt5.positions_get() or []
-                    current_positions = {p.ticket: p._asdict() for p in positions}
-
-                    # Check for new or updated positions
-                    for ticket, position in current_positions.items():
-                        # New position or position was updated
-                        if ticket not in self.last_positions or position['profit'] != self.last_positions[ticket]['profit']:
-                            logger.info(f"Position updated: {ticket}")
-
-                            # Prepare position update
-                            timestamp = datetime.now().isoformat()
-                            update = {
-                                "type": "trade_update",
-                                "update_type": "position",
-                                "timestamp": timestamp,
-                                "trade_id": ticket,
-                                "symbol": position['symbol'],
-                                "type": "buy" if position['type'] == mt5.ORDER_TYPE_BUY else "sell",
-                                "volume": position['volume'],
-                                "price": position['price_open'],
-                                "profit": position['profit'],
-                                "sl": position['sl'],
-                                "tp": position['tp']
-                            }
-
-                            # Store in our trade history for future reference
-                            trade_history[ticket] = update
-
-                            # Send to all trade subscribers
-                            message = json.dumps(update)
-                            subscribers = list(self.trade_subscribers)  # Create copy to avoid modification during iteration
-                            for client in subscribers:
-                                try:
-                                    await client.send(message)
-                                except Exception as e:
-                                    logger.error(f"Error sending trade update to client: {e}")
-
-                    # Check for closed positions
-                    closed_positions = set(self.last_positions.keys()) - set(current_positions.keys())
-                    for ticket in closed_positions:
-                        # Position was closed, get from history
-                        from_date = datetime.now() - timedelta(hours=24)  # Get last 24 hours
-                        history_orders = mt5.history_orders_get(from_date, datetime.now()) or []
-                        history_deals = mt5.history_deals_get(from_date, datetime.now()) or []
-
-                        # Find the closed position in history
-                        for deal in history_deals:
-                            if deal.position_id == ticket and deal.entry == mt5.DEAL_ENTRY_OUT:
-                                # This is a closing deal for our position
-                                deal_dict = deal._asdict()
-
-                                # Skip if already processed
-                                if deal.ticket in self.last_deals:
-                                    continue
-
-                                # Add to processed deals
-                                self.last_deals.add(deal.ticket)
-
-                                # Prepare transaction update
-                                timestamp = datetime.fromtimestamp(deal_dict['time']).isoformat()
-                                update = {
-                                    "type": "trade_update",
-                                    "update_type": "transaction",
-                                    "timestamp": timestamp,
-                                    "transaction_id": deal_dict['ticket'],
-                                    "symbol": deal_dict['symbol'],
-                                    "type": "close_buy" if deal_dict['type'] == mt5.DEAL_TYPE_SELL else "close_sell",
-                                    "volume": deal_dict['volume'],
-                                    "price": deal_dict['price'],
-                                    "commission": deal_dict['commission'],
-                                    "swap": deal_dict['swap'],
-                                    "profit": deal_dict['profit']
-                                }
-
-                                # Store in our transaction history
-                                transaction_history[deal_dict['ticket']] = update
-
-                                # Send to all trade subscribers
-                                message = json.dumps(update)
-                                subscribers = list(self.trade_subscribers)  # Create copy to avoid modification during iteration
-                                for client in subscribers:
-                                    try:
-                                        await client.send(message)
-                                    except Exception as e:
-                                        logger.error(f"Error sending trade update to client: {e}")
-
-                    # Update last positions
-                    self.last_positions = current_positions
-
-                    # Store the most recent 1000 trades each for positions and transactions
-                    if len(trade_history) > 1000:
-                        # Keep the most recent entries
-                        trade_history = {k: v for k, v in sorted(trade_history.items(), reverse=True)[:1000]}
-
-                    if len(transaction_history) > 1000:
-                        # Keep the most recent entries
-                        transaction_history = {k: v for k, v in sorted(transaction_history.items(), reverse=True)[:1000]}
-
-                    # Limit the size of the last deals set to prevent memory growth
-                    if len(self.last_deals) > 1000:
-                        # Keep only the most recent 500 deals
-                        self.last_deals = set(sorted(list(self.last_deals))[-500:])
+                # Get current open positions from MT5 and diff them against the last cycle
+                async with self.positions_lock:
+                    diff = await self.mt5_executor.call(self._diff_positions)
+                    mt5_time = time.perf_counter() - cycle_start
+                    self.metrics.positions.observe(mt5_time)
+                    self._apply_position_diff(diff)
+
+                # Everything after the cursor we start from will be in the journal
+                if self.trade_journal.transaction_floor is None and self.deal_cursor.cursor is not None:
+                    self.trade_journal.transaction_floor = self.deal_cursor.cursor[1]
+
+                # Closing deals since the previous cycle, from one incremental history query
+                call_start = time.perf_counter()
+                new_deals = await self.mt5_executor.call(self.deal_cursor.fetch_new)
+                call_time = time.perf_counter() - call_start
+                self.metrics.history_deals.observe(call_time)
+                mt5_time += call_time
+                for deal in self.deal_cursor.closing_deals(new_deals):
+                    # Prepare transaction update
+                    update = self._transaction_update(deal._asdict())
+
+                    # Send to all trade subscribers
+                    self._broadcast_trade(update)
+
+                # Closed positions whose closing deal has not reached the history yet
+                # are picked up by the cursor on a later cycle
+                for ticket in diff.closed:
+                    if self.deal_cursor.closing_deal(ticket) is None:
+                        logger.info(f"Position {ticket} closed, waiting for its closing deal")
+                # Everything but the two MT5 calls: diffing, encoding, journaling and fan-out
+                self.metrics.trade_process.observe(time.perf_counter() - cycle_start - mt5_time)
 
+            except ConnectionError:
+                logger.warning("MT5 client not connected")
+                self.metrics.trade_errors.inc()
             except Exception as e:
                 logger.error(f"Error updating trade data: {e}", exc_info=True)
+                self.metrics.trade_errors.inc()
 
+            self.metrics.trade_cycle.observe(time.perf_counter() - cycle_start)
             await asyncio.sleep(self.update_interval)
+
+    def _apply_position_diff(self, diff: PositionDiff) -> None:
+        """Broadcast new and changed positions and forget closed ones"""
+        # New positions
+        for position in diff.new:
+            position = position._asdict()
+            ticket = position['ticket']
+            self.last_positions[ticket] = position
+            logger.info(f"Position opened: {ticket}")
+
+            # Prepare position update
+            update = self._position_update(position)
+
+            # Send to all trade subscribers
+            self._store_position(ticket, self._broadcast_trade(update))
+
+        # Positions where one of the tracked fields changed
+        for position, changes in diff.changed:
+            position = position._asdict()
+            ticket = position['ticket']
+            self.last_positions[ticket] = position
+            logger.debug(f"Position updated: {ticket} {changes}")
+
+            update = self._position_update(position)
+
+            # Clients that asked for deltas only get the fields that changed
+            self._store_position(ticket, self._broadcast_trade(
+                update, delta=self._position_delta(position, changes)
+            ))
+
+        for ticket in diff.closed:
+            self._position_closed(ticket)
+        self.positions_refreshed_at = time.monotonic()
+
+    async def _refresh_positions(self) -> bool:
+        """Diff the open positions now unless update_trades keeps them current
+
+        Returns:
+            False if they may be out of date because MT5 is not available
+        """
+        async with self.positions_lock:
+            refreshed_at = self.positions_refreshed_at
+            if refreshed_at is not None and time.monotonic() - refreshed_at <= 2 * self.update_interval:
+                return True
+            try:
+                diff = await self.mt5_executor.call(self._diff_positions)
+            except Exception as e:
+                logger.warning(f"Could not refresh open positions: {e}")
+                return False
+            self._apply_position_diff(diff)
+            return True
+
+    def _diff_positions(self) -> PositionDiff:
+        """Read open positions and diff them; runs on the MT5 executor thread"""
+        return self.position_differ.update(mt5.positions_get() or ())
+
+    @staticmethod
+    def _position_delta(position: dict, changes: dict) -> dict:
+        """Compact trade_update carrying only the position fields that changed"""
+        return {
+            "type": "trade_update",
+            "update_type": "position_delta",
+            "timestamp": datetime.now().isoformat(),
+            "trade_id": position['ticket'],
+            "symbol": position['symbol'],
+            "changes": changes
+        }
+
+    @staticmethod
+    def _position_update(position: dict) -> dict:
+        """trade_update message for an open position"""
+        return {
+            "type": "trade_update",
+            "update_type": "position",
+            "timestamp": datetime.now().isoformat(),
+            "trade_id": position['ticket'],
+            "symbol": position['symbol'],
+            "type": "buy" if position['type'] == mt5.ORDER_TYPE_BUY else "sell",
+            "volume": position['volume'],
+            "price": position['price_open'],
+            "profit": position['profit'],
+            "sl": position['sl'],
+            "tp": position['tp']
+        }
+
+    @staticmethod
+    def _transaction_update(deal: dict) -> dict:
+        """trade_update message for a deal closing a position"""
+        return {
+            "type": "trade_update",
+            "update_type": "transaction",
+            "timestamp": datetime.fromtimestamp(deal['time']).isoformat(),
+            "transaction_id": deal['ticket'],
+            "symbol": deal['symbol'],
+            "type": "close_buy" if deal['type'] == mt5.DEAL_TYPE_SELL else "close_sell",
+            "volume": deal['volume'],
+            "price": deal['price'],
+            "commission": deal['commission'],
+            "swap": deal['swap'],
+            "profit": deal['profit']
+        }
+
+    def _send(self, websocket, message: str):
+        """Queue a control message or trade update for one client; never dropped"""
+        client = self.client_queues.get(websocket)
+        if client:
+            client.send_reliable(message)
+
+    def _broadcast_trade(self, update: dict, delta: dict = None) -> str:
+        """Send one trade update to every trade subscriber
+
+        If a delta is given, clients subscribed with position_deltas get it instead
+        of the full update.
+
+        Returns:
+            The encoded full update
+        """
+        # Journal first so the update carries its sequence number; the journal
+        # encodes it once for live clients and for later replays
+        message = self.trade_journal.append(update)
+        delta_message = None
+        if delta:
+            delta["seq"] = update["seq"]
+            delta_message = json.dumps(delta)
+        self._fan_out_trade(message, delta_message)
+        return message
+
+    def _fan_out_trade(self, message: str, delta_message: str = None):
+        """Send an encoded trade update, or its delta where asked for, to trade subscribers"""
+        self.metrics.trade_events.inc()
+        if delta_message:
+            self.broadcaster.send_reliable(self.trade_subscribers - self.position_delta_subscribers, message)
+            self.broadcaster.send_reliable(self.trade_subscribers & self.position_delta_subscribers, delta_message)
+        else:
+            self.broadcaster.send_reliable(self.trade_subscribers, message)
+
+    def _store_position(self, ticket: int, message: str):
+        """Remember the latest encoded update of an open position"""
+        self.position_messages[ticket] = message
+        self.positions_version += 1
+
+    def _position_closed(self, ticket: int):
+        """Forget a position that is no longer open"""
+        self.last_positions.pop(ticket, None)
+        if self.position_messages.pop(ticket, None) is not None:
+            self.positions_version += 1
+
     async def update_prices(self):
-        """Fetch and broadcast price updates to subscribed clients"""
+        """Fetch and broadcast price updates to subscribed clients
+
+        Each symbol is polled on its own interval from the poll scheduler, so
+        busy symbols are sampled more often than quiet ones.
+        """
         while self.running:
-            if not self.watched_symbols:
+            if not self.subscriptions and not self.bar_subscriptions:
                 await asyncio.sleep(self.update_interval)
                 continue
                 
+            delay = None
+            cycle_start = time.perf_counter()
             try:
-                # Get all symbols that have at least one subscriber
-                symbols_to_fetch = list(self.watched_symbols.keys())
-                
-                # Fetch prices from MT5
-                prices = self.mt5_client.get_prices(symbols_to_fetch)
+                # Get the subscribed symbols that are due a poll
+                symbols_to_fetch = self.poll_scheduler.due(self._active_symbols())
                 
-                timestamp = datetime.now().isoformat()
-                
-                # Send updates to each client based on their subscriptions
-                for symbol, price_data in prices.items():
-                    if symbol in self.watched_symbols:
-                        price_update = {
-                            "type": "price_update",
-                            "symbol": symbol,
-                            "bid": price_data.bid,
-                            "ask": price_data.ask,
-                            "spread": price_data.spread,
-                            "timestamp": timestamp
-                        }
-                        
-                        message = json.dumps(price_update)
-                        
-                        # Send to all clients subscribed to this symbol
-                        for client in list(self.watched_symbols[symbol]):
-                            try:
-                                await client.send(message)
-                            except Exception as e:
-                                logger.error(f"Error sending to client: {e}")
-                                # Client will be removed during next message handling
+                if symbols_to_fetch:
+                    # Fetch prices from MT5
+                    prices = await self.mt5_executor.get_prices(symbols_to_fetch)
+                    encode_start = time.perf_counter()
+                    self.metrics.get_prices.observe(encode_start - cycle_start)
+                    polled_at = time.monotonic()
+                    for symbol in symbols_to_fetch:
+                        price_data = prices.get(symbol)
+                        self.poll_scheduler.record_tick_time(symbol, price_data.time_msc if price_data else None, polled_at)
+                    await self._load_points(prices)
+                    
+                    now = datetime.now().isoformat()
+                    now_msc = int(time.time() * 1000)
+                    
+                    # Encode each symbol once, then fan the whole poll out together
+                    events = []
+                    for symbol, price_data in prices.items():
+                        self._cache_quote(symbol, price_data if price_data.time_msc else SymbolPrice(price_data.bid, price_data.ask, now_msc))
+                        # Bars only take ticks with a real time, and each tick once
+                        if (self.bar_aggregator.watches(symbol) and price_data.time_msc
+                                and price_data.time_msc > self.bar_aggregator.last_time_msc.get(symbol, 0)):
+                            self.bar_aggregator.update(symbol, price_data.bid, price_data.time_msc)
+                        if symbol in self.subscriptions and self.quote_filter.should_emit(symbol, price_data.bid, price_data.ask):
+                            # Prefer the tick's own time over the time we polled it
+                            if price_data.time_msc:
+                                time_msc, timestamp = price_data.time_msc, self._tick_timestamp(price_data.time_msc)
+                            else:
+                                time_msc, timestamp = now_msc, now
+                            events.append(self._price_event(symbol, price_data.bid, price_data.ask, time_msc, timestamp))
+                    self._fan_out_prices(events, encode_start)
+                self._send_bars()
                 
             except Exception as e:
                 logger.error(f"Error updating prices: {e}")
+                self.metrics.price_errors.inc()
+                delay = self.update_interval
+            self.metrics.price_cycle.observe(time.perf_counter() - cycle_start)
                 
-            await asyncio.sleep(self.update_interval)
+            if delay is None:
+                delay = min(self.poll_scheduler.delay(self._active_symbols()), self.update_interval)
+            # Sleep until the next symbol is due, or until a new subscription needs a poll
+            try:
+                await asyncio.wait_for(self.poll_wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self.poll_wakeup.clear()
+
+    async def capture_ticks(self):
+        """Broadcast every tick since the last poll, using copy_ticks_from cursors"""
+        while self.running:
+            if not self.subscriptions and not self.bar_subscriptions:
+                await asyncio.sleep(self.update_interval)
+                continue
+
+            # Safe here: no poll is running on the MT5 thread between iterations
+            while self.stale_tick_cursors:
+                self.tick_capture.forget(self.stale_tick_cursors.pop())
+
+            got_ticks = False
+            cycle_start = time.perf_counter()
+            try:
+                symbols_to_fetch = self._active_symbols()
+                ticks_by_symbol = await self.mt5_executor.call(self.tick_capture.poll_many, symbols_to_fetch)
+                self.metrics.copy_ticks.observe(time.perf_counter() - cycle_start)
+                await self._load_points(ticks_by_symbol)
+                encode_start = time.perf_counter()
+
+                events = []
+                for symbol, ticks in ticks_by_symbol.items():
+                    wants_prices = symbol in self.subscriptions
+                    wants_bars = self.bar_aggregator.watches(symbol)
+                    if not wants_prices and not wants_bars:
+                        continue
+                    got_ticks = True
+                    bids, asks, times_msc = ticks["bid"].tolist(), ticks["ask"].tolist(), ticks["time_msc"].tolist()
+                    self._cache_quote(symbol, SymbolPrice(bids[-1], asks[-1], times_msc[-1]))
+                    for bid, ask, time_msc in zip(bids, asks, times_msc):
+                        if wants_bars:
+                            self.bar_aggregator.update(symbol, bid, time_msc)
+                        if not wants_prices or not self.quote_filter.should_emit(symbol, bid, ask):
+                            continue
+                        events.append(self._price_event(symbol, bid, ask, time_msc, self._tick_timestamp(time_msc)))
+                if self.quote_filter.heartbeat_interval is not None:
+                    events.extend(self._heartbeat_events(ticks_by_symbol))
+                self._fan_out_prices(events, encode_start)
+                self._send_bars()
+
+            except ConnectionError:
+                logger.warning("MT5 client not connected")
+                self.metrics.price_errors.inc()
+            except Exception as e:
+                logger.error(f"Error capturing ticks: {e}")
+                self.metrics.price_errors.inc()
+            self.metrics.price_cycle.observe(time.perf_counter() - cycle_start)
+
+            # Only wait when there was nothing new; otherwise read the next batch right away
+            await asyncio.sleep(0 if got_ticks else self.tick_idle_interval)
+
+    def _heartbeat_events(self, ticks_by_symbol: Dict) -> List:
+        """Resend the cached quote of subscribed symbols that had no ticks for heartbeat_interval"""
+        now = time.monotonic()
+        events = []
+        for symbol in self.subscriptions.active_symbols():
+            # Symbols with ticks this poll already went through should_emit
+            if symbol in ticks_by_symbol or not self.quote_filter.heartbeat_due(symbol, now):
+                continue
+            quote = self.last_quotes.get(symbol)
+            if quote is not None and self.quote_filter.should_emit(symbol, quote.bid, quote.ask, now):
+                events.append(self._price_event(
+                    symbol, quote.bid, quote.ask, quote.time_msc, self._tick_timestamp(quote.time_msc)))
+        return events
+
+    def _fan_out_prices(self, events: List, encode_start: float) -> None:
+        """Send one poll's price events, timing the encode and fan-out stages"""
+        fanout_start = time.perf_counter()
+        self.metrics.price_encode.observe(fanout_start - encode_start)
+        self.broadcaster.send_prices(events, self.subscriptions.clients_by_symbol)
+        self.metrics.price_fanout.observe(time.perf_counter() - fanout_start)
+        self.metrics.price_events.inc(len(events))
+
+    def _active_symbols(self) -> List[str]:
+        """Symbols with a price or bar subscriber"""
+        symbols = self.subscriptions.active_symbols()
+        symbols.extend(symbol for symbol in self.bar_aggregator.timeframes if symbol not in self.subscriptions)
+        return symbols
+
+    def _price_stream_added(self, symbol: str) -> None:
+        if not self.bar_aggregator.watches(symbol):
+            self._activate_symbol(symbol)
+
+    def _price_stream_removed(self, symbol: str) -> None:
+        if not self.bar_aggregator.watches(symbol):
+            self._deactivate_symbol(symbol)
+
+    def _bar_stream_added(self, stream: Tuple[str, str]) -> None:
+        symbol, timeframe = stream
+        if symbol not in self.subscriptions and not self.bar_aggregator.watches(symbol):
+            self._activate_symbol(symbol)
+        self.bar_aggregator.add(symbol, timeframe)
+
+    def _bar_stream_removed(self, stream: Tuple[str, str]) -> None:
+        symbol, timeframe = stream
+        self.bar_aggregator.remove(symbol, timeframe)
+        if symbol not in self.subscriptions and not self.bar_aggregator.watches(symbol):
+            self._deactivate_symbol(symbol)
+
+    def _activate_symbol(self, symbol: str) -> None:
+        """Called when a symbol gets its first price or bar subscriber"""
+        logger.info(f"Polling started for {symbol}")
+        self.poll_wakeup.set()
+
+    def _request_interval(self, client, symbols: List[str], interval: float = None) -> None:
+        """Record the update interval a subscriber asked for (None: no preference) on each symbol"""
+        for symbol in symbols:
+            if self.poll_scheduler.request(symbol, client, interval):
+                self._requested_interval_changed(symbol)
+
+    def _requested_interval_changed(self, symbol: str) -> None:
+        """Called when the fastest update interval asked for a symbol changes"""
+        self.poll_wakeup.set()
+
+    def _deactivate_symbol(self, symbol: str) -> None:
+        """Drop per-symbol state once the last subscriber of a symbol is gone"""
+        self.quote_filter.forget(symbol)
+        self.poll_scheduler.forget(symbol)
+        # Would go stale once the symbol is no longer polled
+        if self.last_quotes.pop(symbol, None) is not None:
+            self.quotes_version += 1
+        self.stale_tick_cursors.add(symbol)
+        logger.info(f"No subscribers left for {symbol}, polling stopped")
+
+    async def _load_points(self, symbols) -> None:
+        """Look up the point size of symbols the quote filter has not seen yet"""
+        for symbol in symbols:
+            if not self.quote_filter.needs_point(symbol):
+                continue
+            try:
+                info = await self.mt5_executor.symbol_info(symbol)
+            except ConnectionError:
+                return
+            if info is not None:
+                self.quote_filter.set_point(symbol, info.point)
+            else:
+                logger.warning(f"No symbol info for {symbol}, only exact repeats are suppressed")
+                self.quote_filter.set_point(symbol, 0.0)
+
+    @staticmethod
+    def _bar_streams(symbols: List[str], timeframes: List[str]) -> List[Tuple[str, str]]:
+        return [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+
+    def _send_bars(self) -> None:
+        """Send closed bars, and bars in progress that are due an update, to their subscribers"""
+        for bar in self.bar_aggregator.drain():
+            self.metrics.bar_events.inc()
+            self.broadcaster.send_reliable(
+                self.bar_subscriptions.subscribers((bar.symbol, bar.timeframe)), self._bar_message(bar))
+
+    @classmethod
+    def _bar_message(cls, bar: Bar) -> str:
+        """Encoded bar message"""
+        message = {"type": "bar", **bar.to_dict(), "timestamp": cls._tick_timestamp(bar.start_msc)}
+        return json.dumps(message)
+
+    @staticmethod
+    def _tick_timestamp(time_msc: int) -> str:
+        """ISO timestamp (UTC) of an MT5 tick time in milliseconds"""
+        return datetime.fromtimestamp(time_msc / 1000, tz=timezone.utc).isoformat()
+
+    def _price_event(self, symbol: str, bid: float, ask: float, time_msc: int, timestamp: str) -> Tuple[str, str, bytes]:
+        """A price update encoded once for each protocol: (symbol, JSON message, binary record)"""
+        return symbol, self._price_message(symbol, bid, ask, timestamp), self._price_record(symbol, bid, ask, time_msc)
+
+    def _cache_quote(self, symbol: str, quote: SymbolPrice) -> None:
+        """Keep the latest quote of a symbol for snapshots"""
+        if self.last_quotes.get(symbol) != quote:
+            self.last_quotes[symbol] = quote
+            self.quotes_version += 1
+
+    def _quote_message(self, symbol: str, quote: SymbolPrice) -> str:
+        """price_update message of a cached quote"""
+        return self._price_message(symbol, quote.bid, quote.ask, self._tick_timestamp(quote.time_msc))
+
+    def _price_record(self, symbol: str, bid: float, ask: float, time_msc: int) -> bytes:
+        """Binary-protocol record of a price update"""
+        return encode_price_record(self.symbol_table.id_for(symbol), bid, ask, time_msc)
+
+    @staticmethod
+    def _price_message(symbol: str, bid: float, ask: float, timestamp: str) -> str:
+        """Encoded price_update message"""
+        price_update = {
+            "type": "price_update",
+            "symbol": symbol,
+            "bid": bid,
+            "ask": ask,
+            "spread": ask - bid,
+            "timestamp": timestamp
+        }
+        
+        return json.dumps(price_update)
+
+    async def update_account(self):
+        """Refresh the cached account summary served by the HTTP endpoints"""
+        while self.running:
+            try:
+                call_start = time.perf_counter()
+                info = await self.mt5_executor.call(mt5.account_info)
+                self.metrics.account_info.observe(time.perf_counter() - call_start)
+                if info is not None:
+                    self._set_account(self._account_summary(info._asdict()))
+            except ConnectionError:
+                logger.warning("MT5 client not connected")
+            except Exception as e:
+                logger.error(f"Error updating account info: {e}")
+
+            await asyncio.sleep(self.account_interval)
+
+    def _set_account(self, account: dict):
+        if account != self.account_info:
+            self.account_info = account
+            self.account_version += 1
+
+    @staticmethod
+    def _account_summary(info: dict) -> dict:
+        """The account fields served by /account"""
+        fields = ("login", "currency", "balance", "equity", "profit", "margin", "margin_free", "margin_level", "leverage")
+        return {field: info[field] for field in fields if field in info}
+
+    def get_client_stats(self) -> List[dict]:
+        """Queue depth and drop counters of every connected client"""
+        return [client.stats() for client in self.client_queues.values()]
+
+    def get_quote_stats(self) -> Dict[str, Dict[str, int]]:
+        """Emitted and suppressed price update counts per symbol"""
+        return self.quote_filter.stats()
+
+    def get_poll_stats(self) -> Dict[str, dict]:
+        """Adaptive poll interval, tick rate and poll counts per symbol (snapshot mode)"""
+        return self.poll_scheduler.stats()
+
+    async def log_stats(self, interval: float = 60.0):
+        """Periodically log quote suppression and clients that are lagging or losing price updates"""
+        reported_drops = {}
+        reported_polls = {}
+        while self.running:
+            await asyncio.sleep(interval)
+            emitted, suppressed = self.quote_filter.emitted_total, self.quote_filter.suppressed_total
+            logger.info(f"Price updates since start: {emitted} sent, {suppressed} suppressed as unchanged")
+            poll_stats = self.get_poll_stats()
+            if poll_stats:
+                rates = []
+                for symbol, stats in sorted(poll_stats.items()):
+                    polls = stats["polls"] - reported_polls.get(symbol, 0)
+                    reported_polls[symbol] = stats["polls"]
+                    rates.append(f"{symbol} {polls / interval:.2f}/s (every {stats['interval']:.2f}s, {stats['tick_rate']:.2f} ticks/s)")
+                logger.info(f"Polls: {', '.join(rates)}")
+            for websocket, client in list(self.client_queues.items()):
+                stats = client.stats()
+                new_drops = stats["dropped"] - reported_drops.get(websocket, 0)
+                reported_drops[websocket] = stats["dropped"]
+                if new_drops or stats["queue_depth"] > self.queue_size // 2:
+                    logger.warning(
+                        f"Slow client {stats['client']}: queue depth {stats['queue_depth']} "
+                        f"(max {stats['max_depth']}), {new_drops} dropped in the last {interval:.0f}s, "
+                        f"{stats['conflated']} conflated, policy {stats['policy']}"
+                    )
+            for websocket in list(reported_drops):
+                if websocket not in self.client_queues:
+                    del reported_drops[websocket]
 
     async def start_server(self):
         """Start the WebSocket server"""
         self.running = True
+
+        # Track event loop lag so blocking work on the loop is visible
+        self.loop_monitor_task = asyncio.create_task(self.loop_monitor.run())
         
         # Start price update task
-        self.price_update_task = asyncio.create_task(self.update_prices())
+        if self.capture_mode == "ticks":
+            self.price_update_task = asyncio.create_task(self.capture_ticks())
+        else:
+            self.price_update_task = asyncio.create_task(self.update_prices())
         
         # Start trade update task
         self.trade_update_task = asyncio.create_task(self.update_trades())
+        self.client_stats_task = asyncio.create_task(self.log_stats())
+        if self.http_endpoints:
+            self.account_task = asyncio.create_task(self.update_account())
         
-        async with websockets.serve(self.handle_client, self.host, self.port):
+        # Plain HTTP GETs to /metrics and the snapshot paths are answered before the WebSocket handshake
+        async with websockets.serve(self.handle_client, self.host, self.port, process_request=self.process_http_request):
             logger.info(f"MT5 WebSocket server started on {self.host}:{self.port}")
             await asyncio.Future()  # Run forever
 
+    def process_http_request(self, connection, request):
+        """websockets process_request hook; returns None to go on with the WebSocket handshake"""
+        if request.path == "/metrics" and "websocket" not in request.headers.get("Upgrade", "").lower():
+            return http_response(200, self.metrics.registry.exposition(), "text/plain; version=0.0.4")
+        if self.http_endpoints:
+            return self.http_endpoints.process_request(connection, request)
+        return None
+
     def stop_server(self):
         """Stop the WebSocket server"""
         self.running = False
@@ -495,6 +1079,16 @@ class MT5WebSocketServer:
             self.price_update_task.cancel()
         if self.trade_update_task:
             self.trade_update_task.cancel()
+        if self.loop_monitor_task:
+            self.loop_monitor_task.cancel()
+        if self.client_stats_task:
+            self.client_stats_task.cancel()
+        if self.account_task:
+            self.account_task.cancel()
+        if self.mt5_executor:
+            self.mt5_executor.shutdown()
+        if self.mt5_client:
+            self.mt5_client.close()
         logger.info("MT5 WebSocket server stopped")
 
 def parse_arguments():
@@ -503,7 +1097,41 @@ def parse_arguments():
     parser.add_argument("--host", default="0.0.0.0", help="Host address to bind to")
     parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
     parser.add_argument("--interval", type=float, default=1.0, 
-                        help="Price update interval in seconds")
+                        help="Price update interval in seconds for symbols whose tick rate is not known yet")
+    parser.add_argument("--min-poll-interval", type=float, default=0.1,
+                        help="Shortest per-symbol poll interval in snapshot mode")
+    parser.add_argument("--max-poll-interval", type=float, default=5.0,
+                        help="Longest per-symbol poll interval in snapshot mode")
+    parser.add_argument("--capture-mode", choices=["snapshot", "ticks"], default="snapshot",
+                        help="snapshot: poll the latest tick per interval; ticks: stream every tick")
+    parser.add_argument("--tick-idle-interval", type=float, default=0.05,
+                        help="Seconds to wait in ticks mode when no new ticks arrived")
+    parser.add_argument("--position-fields", default=",".join(DEFAULT_TRACKED_FIELDS),
+                        help="Comma-separated position fields whose changes trigger a trade update")
+    parser.add_argument("--profit-interval", type=float, default=5.0,
+                        help="Minimum seconds between updates of positions whose only change is profit (0: every cycle)")
+    parser.add_argument("--journal-size", type=int, default=10000,
+                        help="Number of recent trade updates kept to serve reconnecting clients")
+    parser.add_argument("--queue-size", type=int, default=1000,
+                        help="Maximum pending price updates per client")
+    parser.add_argument("--overflow-policy", choices=OVERFLOW_POLICIES, default="conflate",
+                        help="What to do when a client's queue is full; trade updates are never dropped")
+    parser.add_argument("--min-move-points", type=float, default=0.0,
+                        help="Minimum bid/ask move in points for a price update to be sent")
+    parser.add_argument("--heartbeat-interval", type=float, default=None,
+                        help="Resend an unchanged price after this many seconds")
+    parser.add_argument("--bar-update-interval", type=float, default=1.0,
+                        help="Minimum seconds between two updates of the same OHLC bar in progress")
+    parser.add_argument("--http-snapshots", action="store_true",
+                        help="Serve GET /prices, /positions, /net_volume and /account from memory on the WebSocket port")
+    parser.add_argument("--account-interval", type=float, default=5.0,
+                        help="Seconds between account info refreshes for /account")
+    parser.add_argument("--deal-cursor-file", default=os.path.join(current_dir, "deal_cursor.json"),
+                        help="Where the deal history cursor is kept across restarts")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Serve clients from this many fan-out processes fed by one MT5 capture process (0: single process)")
+    parser.add_argument("--ring-slots", type=int, default=16384,
+                        help="Entries in the shared-memory ring between the capture process and the workers")
     return parser.parse_args()
 
 def display_connection_info():
@@ -530,7 +1158,7 @@ if __name__ == "__main__":
     args = parse_arguments()
     
     logger.info("Starting MT5 WebSocket Server")
-    logger.info(f"Configuration: host={args.host}, port={args.port}, interval={args.interval}")
+    logger.info(f"Configuration: host={args.host}, port={args.port}, interval={args.interval}, capture_mode={args.capture_mode}")
     
     # Display connection information
     display_connection_info()
@@ -541,11 +1169,34 @@ if __name__ == "__main__":
         logger.error("Please ensure MT5_USER, MT5_PASSWORD, MT5_SERVER, and MT5_PATH are set in .env file")
         exit(1)
     
-    server = MT5WebSocketServer(
+    server_kwargs = dict(
         host=args.host,
         port=args.port,
-        update_interval=args.interval
+        update_interval=args.interval,
+        capture_mode=args.capture_mode,
+        tick_idle_interval=args.tick_idle_interval,
+        position_fields=args.position_fields.split(","),
+        profit_interval=args.profit_interval,
+        journal_size=args.journal_size,
+        queue_size=args.queue_size,
+        overflow_policy=args.overflow_policy,
+        min_move_points=args.min_move_points,
+        heartbeat_interval=args.heartbeat_interval,
+        bar_update_interval=args.bar_update_interval,
+        min_poll_interval=args.min_poll_interval,
+        max_poll_interval=args.max_poll_interval,
+        http_snapshots=args.http_snapshots,
+        account_interval=args.account_interval,
+        deal_cursor_file=args.deal_cursor_file
     )
+
+    if args.workers > 0:
+        # One MT5 capture process feeding fan-out worker processes through shared memory
+        from fanout import run_fanout
+        run_fanout(args.workers, ring_slots=args.ring_slots, **server_kwargs)
+        exit(0)
+
+    server = MT5WebSocketServer(**server_kwargs)
     
     try:
         asyncio.run(server.start_server())
@@ -0,0 +1,129 @@
+import struct
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+# Ring header: last published sequence number, slot count, slot size
+RING_HEADER = struct.Struct("<QII")
+RING_HEADER_SIZE = 64
+# Slot header: sequence number of the entry in the slot (0 while it is written), payload length
+SLOT_HEADER = struct.Struct("<QI")
+SEQ = struct.Struct("<Q")
+
+
+class SharedRing:
+    """Single-writer, multi-reader ring buffer in shared memory
+
+    Entries are variable-length byte strings up to ``slot_size`` minus a small
+    header, numbered from 1. The writer never waits for readers: a reader that
+    falls more than ``capacity`` entries behind loses the overwritten entries
+    and is told how many. Each slot carries the sequence number of its entry,
+    written last and checked again after copying, so a reader never returns
+    a half-written entry.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        _, self.capacity, self.slot_size = RING_HEADER.unpack_from(self.buf, 0)
+        self.max_payload = self.slot_size - SLOT_HEADER.size
+        self.next_seq = self.head + 1
+
+    @classmethod
+    def create(cls, capacity: int = 16384, slot_size: int = 1024, name: Optional[str] = None) -> "SharedRing":
+        """Allocate a new ring; the creating process is responsible for unlinking it"""
+        size = RING_HEADER_SIZE + capacity * slot_size
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        RING_HEADER.pack_into(shm.buf, 0, 0, capacity, slot_size)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedRing":
+        """Open a ring created by another process"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the last published entry (0 if none)"""
+        return SEQ.unpack_from(self.buf, 0)[0]
+
+    def _offset(self, seq: int) -> int:
+        return RING_HEADER_SIZE + ((seq - 1) % self.capacity) * self.slot_size
+
+    def write(self, payload: bytes) -> int:
+        """Append an entry; only one process may write to a ring
+
+        Raises:
+            ValueError: If the payload does not fit in a slot
+        """
+        if len(payload) > self.max_payload:
+            raise ValueError(f"Entry of {len(payload)} bytes exceeds the ring slot size")
+
+        seq = self.next_seq
+        offset = self._offset(seq)
+        SEQ.pack_into(self.buf, offset, 0)
+        start = offset + SLOT_HEADER.size
+        self.buf[start:start + len(payload)] = payload
+        SLOT_HEADER.pack_into(self.buf, offset, seq, len(payload))
+        SEQ.pack_into(self.buf, 0, seq)
+        self.next_seq = seq + 1
+        return seq
+
+    def close(self) -> None:
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    """One reader's position in a SharedRing"""
+
+    def __init__(self, ring: SharedRing, from_oldest: bool = True):
+        """
+        Args:
+            ring: Ring to read
+            from_oldest: Start at the oldest entry still held instead of the next new one
+        """
+        self.ring = ring
+        head = ring.head
+        self.cursor = max(1, head - ring.capacity + 1) if from_oldest else head + 1
+        self.lost = 0
+
+    def read(self, max_entries: int = 1024) -> Tuple[List[bytes], int]:
+        """Entries published since the previous read, oldest first
+
+        Returns:
+            The entries and how many were overwritten before they could be read
+        """
+        ring = self.ring
+        buf = ring.buf
+        head = ring.head
+        lost = 0
+
+        oldest = head - ring.capacity + 1
+        if self.cursor < oldest:
+            lost = oldest - self.cursor
+            self.cursor = oldest
+
+        entries = []
+        last = min(head, self.cursor + max_entries - 1)
+        while self.cursor <= last:
+            seq = self.cursor
+            offset = ring._offset(seq)
+            slot_seq, length = SLOT_HEADER.unpack_from(buf, offset)
+            start = offset + SLOT_HEADER.size
+            payload = bytes(buf[start:start + length])
+            if slot_seq != seq or SEQ.unpack_from(buf, offset)[0] != seq:
+                # The writer lapped us while copying; resync on the next read
+                break
+            entries.append(payload)
+            self.cursor += 1
+
+        self.lost += lost
+        return entries, lost
@@ -0,0 +1,88 @@
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+class SubscriptionRegistry:
+    """Two-way symbol/client subscription map with reference-counted symbols
+
+    A symbol is active while at least one client watches it. Removing a client
+    only touches the symbols that client watched, so a disconnect costs
+    O(its subscriptions) instead of a scan over every symbol.
+    """
+
+    def __init__(
+        self,
+        on_activate: Optional[Callable[[str], None]] = None,
+        on_deactivate: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            on_activate: Called with a symbol when its first subscriber arrives
+            on_deactivate: Called with a symbol when its last subscriber leaves
+        """
+        self.clients_by_symbol: Dict[str, Set[Hashable]] = {}
+        self.symbols_by_client: Dict[Hashable, Set[str]] = {}
+        self.on_activate = on_activate
+        self.on_deactivate = on_deactivate
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.clients_by_symbol
+
+    def __len__(self) -> int:
+        return len(self.clients_by_symbol)
+
+    def active_symbols(self) -> List[str]:
+        """Symbols with at least one subscriber"""
+        return list(self.clients_by_symbol)
+
+    def subscribers(self, symbol: str) -> Set[Hashable]:
+        return self.clients_by_symbol.get(symbol, set())
+
+    def symbols_of(self, client: Hashable) -> Set[str]:
+        return self.symbols_by_client.get(client, set())
+
+    def subscribe(self, client: Hashable, symbols: Iterable[str]) -> List[str]:
+        """Add subscriptions; returns the symbols that became active"""
+        client_symbols = self.symbols_by_client.setdefault(client, set())
+        activated = []
+        for symbol in symbols:
+            if symbol in client_symbols:
+                continue
+            client_symbols.add(symbol)
+            clients = self.clients_by_symbol.get(symbol)
+            if clients is None:
+                clients = self.clients_by_symbol[symbol] = set()
+                activated.append(symbol)
+            clients.add(client)
+
+        for symbol in activated:
+            if self.on_activate:
+                self.on_activate(symbol)
+        return activated
+
+    def unsubscribe(self, client: Hashable, symbols: Iterable[str]) -> List[str]:
+        """Remove subscriptions; returns the symbols that became inactive"""
+        client_symbols = self.symbols_by_client.get(client)
+        if not client_symbols:
+            return []
+
+        deactivated = []
+        for symbol in symbols:
+            if symbol not in client_symbols:
+                continue
+            client_symbols.discard(symbol)
+            clients = self.clients_by_symbol[symbol]
+            clients.discard(client)
+            if not clients:
+                del self.clients_by_symbol[symbol]
+                deactivated.append(symbol)
+
+        if not client_symbols:
+            del self.symbols_by_client[client]
+        for symbol in deactivated:
+            if self.on_deactivate:
+                self.on_deactivate(symbol)
+        return deactivated
+
+    def remove_client(self, client: Hashable) -> List[str]:
+        """Drop every subscription of a client; returns the symbols that became inactive"""
+        return self.unsubscribe(client, list(self.symbols_by_client.get(client, ())))
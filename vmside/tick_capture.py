@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, List
+
+import numpy as np
+import MetaTrader5 as mt5
+
+logger = logging.getLogger(__name__)
+
+# Layout of the structured arrays returned by mt5.copy_ticks_from
+TICK_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("last", "<f8"),
+    ("volume", "<u8"),
+    ("time_msc", "<i8"),
+    ("flags", "<u4"),
+    ("volume_real", "<f8"),
+])
+
+EMPTY_TICKS = np.empty(0, dtype=TICK_DTYPE)
+
+
+class TickCapture:
+    """Reads every new tick per symbol from a time_msc cursor using copy_ticks_from
+
+    Each symbol keeps the time_msc of the last tick handed out plus how many
+    ticks at that exact millisecond were already returned, so ticks sharing a
+    timestamp are neither lost nor repeated. Must be called from the thread
+    that owns the MT5 session.
+    """
+
+    def __init__(self, max_ticks_per_poll: int = 10000, flags: int = None):
+        """
+        Args:
+            max_ticks_per_poll: Upper bound on ticks read per symbol per call
+            flags: copy_ticks_from flags, defaults to bid/ask changes only
+        """
+        self.max_ticks_per_poll = max_ticks_per_poll
+        self.flags = mt5.COPY_TICKS_INFO if flags is None else flags
+        self.cursors: Dict[str, int] = {}
+        self._seen_at_cursor: Dict[str, int] = {}
+
+    def poll(self, symbol: str) -> np.ndarray:
+        """Return the ticks for a symbol that arrived since the previous poll"""
+        cursor = self.cursors.get(symbol)
+        if cursor is None:
+            return self._seed(symbol)
+
+        # copy_ticks_from works in whole seconds, so re-read the cursor's second
+        ticks = mt5.copy_ticks_from(
+            symbol, cursor // 1000, self.max_ticks_per_poll, self.flags
+        )
+        if ticks is None or len(ticks) == 0:
+            return EMPTY_TICKS
+
+        time_msc = ticks["time_msc"]
+        at_cursor = np.flatnonzero(time_msc == cursor)
+        newer = ticks[time_msc > cursor]
+        seen = self._seen_at_cursor.get(symbol, 0)
+
+        if len(at_cursor) > seen:
+            new_ticks = np.concatenate([ticks[at_cursor[seen:]], newer])
+        else:
+            new_ticks = newer
+
+        if len(new_ticks) == 0:
+            return EMPTY_TICKS
+
+        last_msc = int(new_ticks["time_msc"][-1])
+        if last_msc == cursor:
+            self._seen_at_cursor[symbol] = seen + len(new_ticks)
+        else:
+            self.cursors[symbol] = last_msc
+            self._seen_at_cursor[symbol] = int(np.count_nonzero(time_msc == last_msc))
+        return new_ticks
+
+    def poll_many(self, symbols: List[str]) -> Dict[str, np.ndarray]:
+        """Poll several symbols in one call; symbols without new ticks are omitted"""
+        results = {}
+        for symbol in symbols:
+            ticks = self.poll(symbol)
+            if len(ticks):
+                results[symbol] = ticks
+        return results
+
+    def forget(self, symbol: str) -> None:
+        """Drop the cursor of a symbol nobody watches anymore"""
+        self.cursors.pop(symbol, None)
+        self._seen_at_cursor.pop(symbol, None)
+
+    def _seed(self, symbol: str) -> np.ndarray:
+        """Start a new symbol at its latest tick instead of replaying history"""
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            logger.warning(f"No tick available for {symbol}")
+            return EMPTY_TICKS
+
+        # Treat every tick at the seed millisecond as already seen
+        self.cursors[symbol] = tick.time_msc
+        self._seen_at_cursor[symbol] = self.max_ticks_per_poll
+        return np.array(
+            [(tick.time, tick.bid, tick.ask, tick.last, tick.volume,
+              tick.time_msc, tick.flags, tick.volume_real)],
+            dtype=TICK_DTYPE,
+        )
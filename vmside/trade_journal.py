@@ -0,0 +1,111 @@
+import json
+import time
+from collections import deque
+from typing import List, Optional
+
+
+class TradeJournal:
+    """Bounded in-memory log of emitted trade updates with increasing sequence numbers
+
+    Every trade update is stamped with a ``seq`` and stored together with its
+    encoded message, so reconnecting clients can be replayed in O(missed)
+    without touching MT5. A query that reaches back past what the ring still
+    holds returns None, and the caller falls back to the MT5 history.
+
+    Transactions are also kept in a ring of their own, bounded by transaction
+    count, so a burst of position updates cannot evict them.
+    """
+
+    def __init__(self, capacity: int = 10000, epoch: Optional[int] = None,
+                 transaction_capacity: Optional[int] = None):
+        """
+        Args:
+            capacity: Number of updates kept in memory
+            epoch: Identifies this run's sequence numbers; defaults to the start time in ms
+            transaction_capacity: Number of transactions kept in memory; defaults to capacity
+        """
+        self.capacity = capacity
+        self.epoch = epoch if epoch is not None else int(time.time() * 1000)
+        self.entries = deque(maxlen=capacity)  # (seq, update, message)
+        self.transactions = deque(maxlen=transaction_capacity or capacity)  # (transaction_id, message)
+        self.next_seq = 1
+        # Transactions with an id at or below this may be missing from the journal
+        self.transaction_floor: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest entry still held (next_seq if empty)"""
+        return self.entries[0][0] if self.entries else self.next_seq
+
+    def append(self, update: dict) -> str:
+        """Stamp the update with the next sequence number and store it
+
+        Returns:
+            The encoded message, so callers can send it without re-encoding
+        """
+        update["seq"] = self.next_seq
+        message = json.dumps(update)
+        self._store(update, message)
+        return message
+
+    def record(self, update: dict, message: str) -> bool:
+        """Store an update already stamped and encoded by another journal
+
+        Used to mirror a journal kept in another process. If sequence numbers
+        were skipped, the entries before the gap are dropped so replays never
+        silently miss an update.
+
+        Returns:
+            False if a gap was found
+        """
+        contiguous = not self.entries or update["seq"] == self.next_seq
+        if not contiguous:
+            self.entries.clear()
+            self.transactions.clear()
+            self.transaction_floor = None
+        self._store(update, message)
+        return contiguous
+
+    def _store(self, update: dict, message: str) -> None:
+        if update.get("update_type") == "transaction":
+            if len(self.transactions) == self.transactions.maxlen:
+                self.transaction_floor = max(self.transaction_floor or 0, self.transactions[0][0])
+            self.transactions.append((update["transaction_id"], message))
+
+        seq = update["seq"]
+        self.next_seq = seq + 1
+        self.entries.append((seq, update, message))
+
+    def since_seq(self, last_seq: int, epoch: Optional[int] = None) -> Optional[List[str]]:
+        """Encoded updates after last_seq, or None if the journal cannot serve them
+
+        A last_seq from another epoch (a previous server run), or one that was
+        already evicted, cannot be served.
+        """
+        if epoch is not None and epoch != self.epoch:
+            return None
+        if last_seq < self.first_seq - 1 or last_seq > self.next_seq - 1:
+            return None
+        if last_seq == self.next_seq - 1:
+            return []
+
+        # Sequence numbers are contiguous, so the start index is known directly
+        start = last_seq + 1 - self.first_seq
+        return [self.entries[i][2] for i in range(start, len(self.entries))]
+
+    def transactions_since(self, last_transaction_id: int) -> Optional[List[str]]:
+        """Encoded transaction updates with a larger id, or None if the journal cannot tell"""
+        if self.transaction_floor is None or last_transaction_id < self.transaction_floor:
+            return None
+
+        messages = []
+        # Walk back from the newest entry; transaction ids only grow
+        for transaction_id, message in reversed(self.transactions):
+            if transaction_id <= last_transaction_id:
+                break
+            messages.append(message)
+        messages.reverse()
+        return messages
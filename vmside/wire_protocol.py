@@ -0,0 +1,94 @@
+"""Compact binary encoding of price updates ("binary-v1")
+
+Clients opt in with ``"protocol": "binary-v1"`` in their subscription. Price
+updates then arrive as binary frames holding any number of fixed-size
+records, each keyed by a numeric symbol id instead of the symbol name. The
+id to name mapping is sent once per subscription as a JSON ``symbol_table``
+message. Trade updates and control messages stay JSON text frames.
+
+Frame layout (little endian)::
+
+    header:  version u8 | kind u8 | count u32
+    record:  symbol_id u16 | bid f64 | ask f64 | time_msc i64    (count times)
+"""
+import struct
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional
+
+JSON_PROTOCOL = "json"
+BINARY_PROTOCOL = "binary-v1"
+PROTOCOLS = (JSON_PROTOCOL, BINARY_PROTOCOL)
+
+WIRE_VERSION = 1
+FRAME_PRICES = 1
+
+FRAME_HEADER = struct.Struct("<BBI")
+PRICE_RECORD = struct.Struct("<Hddq")
+
+
+class SymbolTable:
+    """Server-wide symbol to id assignment; ids are never reused within a run
+
+    A table created with ``assign=False`` only mirrors ids assigned elsewhere
+    (see ``learn``), as fan-out workers do with the capture process's table.
+    """
+
+    def __init__(self, assign: bool = True):
+        self.assign = assign
+        self.ids: Dict[str, int] = {}
+
+    def id_for(self, symbol: str) -> Optional[int]:
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None and self.assign:
+            if len(self.ids) > 0xFFFF:
+                raise ValueError("Symbol table is full")
+            symbol_id = self.ids[symbol] = len(self.ids)
+        return symbol_id
+
+    def learn(self, symbol: str, symbol_id: int) -> None:
+        self.ids[symbol] = symbol_id
+
+    def message(self, symbols: List[str]) -> dict:
+        """symbol_table control message covering the given symbols that have an id"""
+        ids = {symbol: self.id_for(symbol) for symbol in symbols}
+        return {
+            "type": "symbol_table",
+            "protocol": BINARY_PROTOCOL,
+            "symbols": {symbol: symbol_id for symbol, symbol_id in ids.items() if symbol_id is not None},
+        }
+
+
+def encode_price_record(symbol_id: int, bid: float, ask: float, time_msc: int) -> bytes:
+    return PRICE_RECORD.pack(symbol_id, bid, ask, time_msc)
+
+
+def encode_price_frame(records: List[bytes]) -> bytes:
+    """Join already-encoded price records into one frame"""
+    return FRAME_HEADER.pack(WIRE_VERSION, FRAME_PRICES, len(records)) + b"".join(records)
+
+
+def decode_frame(data: bytes, symbols_by_id: Mapping[int, str]) -> List[dict]:
+    """Decode a binary frame into price_update dicts shaped like the JSON messages
+
+    Raises:
+        ValueError: If the frame is malformed or of an unknown version or kind
+    """
+    if len(data) < FRAME_HEADER.size:
+        raise ValueError("Frame too short")
+    version, kind, count = FRAME_HEADER.unpack_from(data)
+    if version != WIRE_VERSION or kind != FRAME_PRICES:
+        raise ValueError(f"Unsupported frame version {version} kind {kind}")
+    if len(data) != FRAME_HEADER.size + count * PRICE_RECORD.size:
+        raise ValueError("Frame length does not match its record count")
+
+    updates = []
+    for symbol_id, bid, ask, time_msc in PRICE_RECORD.iter_unpack(data[FRAME_HEADER.size:]):
+        updates.append({
+            "type": "price_update",
+            "symbol": symbols_by_id.get(symbol_id, str(symbol_id)),
+            "bid": bid,
+            "ask": ask,
+            "spread": ask - bid,
+            "timestamp": datetime.fromtimestamp(time_msc / 1000, tz=timezone.utc).isoformat(),
+        })
+    return updates